@@ -0,0 +1,91 @@
+"""
+⏱️ Micro-benchmark: compiled substring matchers vs. the per-value table scans they replaced.
+
+Classifies high-cardinality free text (every value distinct, so per-value memoization does not help)
+with the linear scans normalize_traffic_source / map_prospect_reason used to do and with the
+SubstringMatcher-backed column functions, checks both give the same answers, and prints timings.
+
+Usage:
+    python benchmark_normalizers.py --rows 100000 --repeat 3
+"""
+import argparse
+import logging
+import random
+import time
+
+logging.disable(logging.WARNING)  # Streamlit warns about running outside `streamlit run` on import
+
+import dashboard
+
+WORDS = [
+    "the", "student", "asked", "about", "fees", "and", "timing", "will", "join", "next", "batch", "after",
+    "exams", "parents", "need", "time", "to", "decide", "called", "twice", "busy", "office", "hours",
+    "looking", "for", "weekend", "classes", "online", "mode", "only", "salary", "loan", "emi", "option"
+]
+
+def scan_traffic_source(raw_source):
+    """The original table scan behind normalize_traffic_source."""
+    if not raw_source:
+        return "Unknown"
+    
+    source_str = str(raw_source).lower().strip()
+    for key, category in list(dashboard.TRAFFIC_SOURCE_CATEGORIES.items()) + dashboard.TRAFFIC_SOURCE_PARTIAL_MATCHES:
+        if key in source_str:
+            return category
+    return source_str.title()
+
+def scan_prospect_reason(reason):
+    """The original table scan behind map_prospect_reason."""
+    if not reason:
+        return ""
+    
+    reason_str = str(reason).strip().lower()
+    if reason_str in dashboard.PROSPECT_REASON_MAP:
+        return dashboard.PROSPECT_REASON_MAP[reason_str]
+    for key, value in dashboard.PROSPECT_REASON_MAP.items():
+        if key in reason_str:
+            return value
+    return reason_str.replace("_", " ").replace("-", " ").title()
+
+def make_free_text(rows, keys, seed=1):
+    """Distinct sentences of 5-25 words, about a third of them mentioning one of the table keys."""
+    rnd = random.Random(seed)
+    texts = []
+    for i in range(rows):
+        words = rnd.choices(WORDS, k=rnd.randint(5, 25))
+        if rnd.random() < 0.35:
+            words.insert(rnd.randrange(len(words)), rnd.choice(keys))
+        texts.append("%s #%d" % (" ".join(words), i))
+    return texts
+
+def best_of(repeat, func, values):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(values)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    cases = [
+        ("traffic source", scan_traffic_source, dashboard.normalize_traffic_sources,
+         [key for key, _ in list(dashboard.TRAFFIC_SOURCE_CATEGORIES.items()) + dashboard.TRAFFIC_SOURCE_PARTIAL_MATCHES]),
+        ("prospect reason", scan_prospect_reason, dashboard.map_prospect_reasons,
+         [key for key in dashboard.PROSPECT_REASON_MAP if key]),
+    ]
+    for name, scan, classify, keys in cases:
+        values = make_free_text(args.rows, keys)
+        scan_seconds, expected = best_of(args.repeat, lambda values: [scan(value) for value in values], values)
+        matcher_seconds, result = best_of(args.repeat, classify, values)
+        assert result == expected, "%s: matcher disagrees with the table scan" % name
+        print("%-16s %7d values   scan %7.3fs   matcher %7.3fs   %5.1fx" % (
+            name, len(values), scan_seconds, matcher_seconds, scan_seconds / matcher_seconds
+        ))
+
+if __name__ == "__main__":
+    main()
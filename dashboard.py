@@ -1,15 +1,25 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, date
 import pytz
 import time
+import threading
 import json
 import io
+import os
+import hashlib
+import random
+import uuid
 import numpy as np
-from collections import Counter
+import pyarrow as pa
+import pyarrow.compute as pc
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache, partial
 import re
 
 # Set page config
@@ -232,28 +242,174 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Constants
-HUBSPOT_API_BASE = "https://api.hubapi.com"
+HUBSPOT_DEFAULT_API_BASE = "https://api.hubapi.com"
+HUBSPOT_API_BASE = os.environ.get("HUBSPOT_API_BASE", HUBSPOT_DEFAULT_API_BASE).rstrip("/")  # Point at mock_hubspot.py to test offline
+HUBSPOT_SEARCH_PAGE_SIZE = 100  # Max per API call
+HUBSPOT_SEARCH_RESULT_CAP = 10000  # Search endpoint stops paging after 10,000 results per query
+
+# 🔥 SHARDED FETCH SETTINGS
+FETCH_MAX_WORKERS = 4
+FETCH_SHARD_TARGET_SIZE = 2000  # Bisect windows above this (must stay <= HUBSPOT_SEARCH_RESULT_CAP)
+FETCH_MIN_SHARD_SPAN_MS = 1000  # Windows narrower than this are never bisected
+
+# 🔥 HTTP SESSION SETTINGS (shared keep-alive pool for every HubSpot call)
+HTTP_POOL_SIZE = 16  # Keep >= the max fetch workers so threads never wait for a socket
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 30
+
+# 🔥 RETRIES & CIRCUIT BREAKER (5xx responses, timeouts and dropped connections)
+HTTP_MAX_RETRIES = 5
+HTTP_BACKOFF_BASE_SECONDS = 1.0
+HTTP_BACKOFF_MAX_SECONDS = 30.0
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 8  # Consecutive failed attempts (across all threads) before the circuit opens
+CIRCUIT_BREAKER_RESET_SECONDS = 60  # How long an open circuit rejects requests before letting a trial through
+
+# 🔥 RATE LIMITS (token buckets, refined at runtime from X-HubSpot-RateLimit-* headers)
+# Search endpoints allow ~5 requests/second per token and do not report their own quota,
+# so keep one request of headroom there.
+HUBSPOT_SEARCH_RATE_LIMIT = (4, 1000)  # (requests, interval ms)
+HUBSPOT_DEFAULT_RATE_LIMIT = (100, 10000)
+HUBSPOT_SECONDLY_RATE_LIMIT = (10, 1000)  # Per-second cap some apps get on top of the 10-second window
+# (max, interval ms, remaining) headers describing each bucket's quota - None where HubSpot sends no such header
+HUBSPOT_WINDOW_RATE_HEADERS = ("X-HubSpot-RateLimit-Max", "X-HubSpot-RateLimit-Interval-Milliseconds", "X-HubSpot-RateLimit-Remaining")
+HUBSPOT_SECONDLY_RATE_HEADERS = ("X-HubSpot-RateLimit-Secondly", None, "X-HubSpot-RateLimit-Secondly-Remaining")
+
+# 🔥 INCREMENTAL SYNC SETTINGS
+INCREMENTAL_SYNC_OVERLAP_MS = 5 * 60 * 1000  # Re-read this much before the mark to cover search index lag
+
+# 🔥 PERSISTENT CONTACT STORE (Parquet, shared across sessions and restarts)
+# A non-default API base (e.g. the local mock) gets its own store so test data never mixes with real contacts
+CONTACT_STORE_DIR = os.environ.get(
+    "HUBSPOT_CONTACT_STORE_DIR",
+    ".hubspot_store" if HUBSPOT_API_BASE == HUBSPOT_DEFAULT_API_BASE else ".hubspot_store_mock"
+)
+
+# 🔥 RANGE CACHE: fetched day segments per date field
+RANGE_CACHE_TTL_SECONDS = 15 * 60  # Segments older than this are re-synced before use
+RANGE_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600  # Segments older than this are evicted and fetched again in full
+
+# 🔥 PROPERTY PROJECTION: search pages only request properties that hold data in the portal
+PROPERTY_DISCOVERY_TTL_SECONDS = 24 * 3600  # Re-discover daily so newly used properties are picked up
+
+# 🔥 RESUMABLE FETCH: paging progress and fetched batches are checkpointed to disk
+FETCH_CHECKPOINT_DIR = os.path.join(CONTACT_STORE_DIR, "checkpoints")
+FETCH_CHECKPOINT_MAX_AGE_SECONDS = 6 * 3600  # Older checkpoints are discarded - their cursors may no longer line up
+
+# 🔥 BACKGROUND FETCH JOBS (shared by every session of this server process)
+FETCH_JOB_WORKERS = 2  # Jobs running at once; further jobs queue
+FETCH_JOB_POLL_SECONDS = 1.0
+FETCH_JOB_RETENTION_SECONDS = 30 * 60  # Finished jobs whose session never collected them are dropped after this
+
+# 🔥 SHARED FETCH RESULTS: identical fetches from any session reuse one result
+FETCH_RESULT_CACHE_TTL_SECONDS = 10 * 60
+FETCH_RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Total contacts DataFrame memory kept across all cached results
+
+# 🧠 ANALYSIS RESULT CACHE: session payloads keyed by dataset fingerprint, shared by every session
+ANALYSIS_CACHE_TTL_SECONDS = 60 * 60  # Fingerprints pin the contents, so this only bounds how long unused entries linger
+ANALYSIS_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Total contacts DataFrame memory kept across all cached payloads
 IST = pytz.timezone('Asia/Kolkata')
 
-# Country code mapping for phone analysis
+# Country code mapping for phone analysis: the ITU-T E.164 dialling codes. Codes shared by several
+# countries are split by their leading area digits (+1 242 Bahamas, +7 7 Kazakhstan), so a number is
+# classified by the longest code it starts with.
 COUNTRY_CODES = {
-    '+1': 'USA/Canada',
-    '+91': 'India',
-    '+44': 'United Kingdom',
-    '+61': 'Australia',
-    '+971': 'UAE',
-    '+65': 'Singapore',
-    '+60': 'Malaysia',
-    '+86': 'China',
-    '+49': 'Germany',
-    '+33': 'France',
-    '+81': 'Japan',
-    '+82': 'South Korea',
-    '+7': 'Russia',
-    '+55': 'Brazil',
-    '+34': 'Spain',
-    '+39': 'Italy'
+    # Zone 1: North American Numbering Plan
+    '+1': 'USA/Canada', '+1242': 'Bahamas', '+1246': 'Barbados', '+1264': 'Anguilla', '+1268': 'Antigua and Barbuda',
+    '+1284': 'British Virgin Islands', '+1340': 'US Virgin Islands', '+1345': 'Cayman Islands', '+1441': 'Bermuda',
+    '+1473': 'Grenada', '+1649': 'Turks and Caicos Islands', '+1658': 'Jamaica', '+1664': 'Montserrat',
+    '+1670': 'Northern Mariana Islands', '+1671': 'Guam', '+1684': 'American Samoa', '+1721': 'Sint Maarten',
+    '+1758': 'Saint Lucia', '+1767': 'Dominica', '+1784': 'Saint Vincent and the Grenadines', '+1787': 'Puerto Rico',
+    '+1809': 'Dominican Republic', '+1829': 'Dominican Republic', '+1849': 'Dominican Republic',
+    '+1868': 'Trinidad and Tobago', '+1869': 'Saint Kitts and Nevis', '+1876': 'Jamaica', '+1939': 'Puerto Rico',
+    # Zone 2: Africa and the North Atlantic
+    '+20': 'Egypt', '+211': 'South Sudan', '+212': 'Morocco', '+213': 'Algeria', '+216': 'Tunisia', '+218': 'Libya',
+    '+220': 'Gambia', '+221': 'Senegal', '+222': 'Mauritania', '+223': 'Mali', '+224': 'Guinea', '+225': 'Ivory Coast',
+    '+226': 'Burkina Faso', '+227': 'Niger', '+228': 'Togo', '+229': 'Benin', '+230': 'Mauritius', '+231': 'Liberia',
+    '+232': 'Sierra Leone', '+233': 'Ghana', '+234': 'Nigeria', '+235': 'Chad', '+236': 'Central African Republic',
+    '+237': 'Cameroon', '+238': 'Cape Verde', '+239': 'Sao Tome and Principe', '+240': 'Equatorial Guinea',
+    '+241': 'Gabon', '+242': 'Republic of the Congo', '+243': 'DR Congo', '+244': 'Angola', '+245': 'Guinea-Bissau',
+    '+246': 'British Indian Ocean Territory', '+247': 'Ascension Island', '+248': 'Seychelles', '+249': 'Sudan',
+    '+250': 'Rwanda', '+251': 'Ethiopia', '+252': 'Somalia', '+253': 'Djibouti', '+254': 'Kenya', '+255': 'Tanzania',
+    '+256': 'Uganda', '+257': 'Burundi', '+258': 'Mozambique', '+260': 'Zambia', '+261': 'Madagascar',
+    '+262': 'Reunion/Mayotte', '+263': 'Zimbabwe', '+264': 'Namibia', '+265': 'Malawi', '+266': 'Lesotho',
+    '+267': 'Botswana', '+268': 'Eswatini', '+269': 'Comoros', '+27': 'South Africa', '+290': 'Saint Helena',
+    '+291': 'Eritrea', '+297': 'Aruba', '+298': 'Faroe Islands', '+299': 'Greenland',
+    # Zones 3-4: Europe
+    '+30': 'Greece', '+31': 'Netherlands', '+32': 'Belgium', '+33': 'France', '+34': 'Spain', '+350': 'Gibraltar',
+    '+351': 'Portugal', '+352': 'Luxembourg', '+353': 'Ireland', '+354': 'Iceland', '+355': 'Albania', '+356': 'Malta',
+    '+357': 'Cyprus', '+358': 'Finland', '+359': 'Bulgaria', '+36': 'Hungary', '+370': 'Lithuania', '+371': 'Latvia',
+    '+372': 'Estonia', '+373': 'Moldova', '+374': 'Armenia', '+375': 'Belarus', '+376': 'Andorra', '+377': 'Monaco',
+    '+378': 'San Marino', '+379': 'Vatican City', '+380': 'Ukraine', '+381': 'Serbia', '+382': 'Montenegro',
+    '+383': 'Kosovo', '+385': 'Croatia', '+386': 'Slovenia', '+387': 'Bosnia and Herzegovina', '+389': 'North Macedonia',
+    '+39': 'Italy', '+40': 'Romania', '+41': 'Switzerland', '+420': 'Czech Republic', '+421': 'Slovakia',
+    '+423': 'Liechtenstein', '+43': 'Austria', '+44': 'United Kingdom', '+45': 'Denmark', '+46': 'Sweden',
+    '+47': 'Norway', '+48': 'Poland', '+49': 'Germany',
+    # Zone 5: South and Central America
+    '+500': 'Falkland Islands', '+501': 'Belize', '+502': 'Guatemala', '+503': 'El Salvador', '+504': 'Honduras',
+    '+505': 'Nicaragua', '+506': 'Costa Rica', '+507': 'Panama', '+508': 'Saint Pierre and Miquelon', '+509': 'Haiti',
+    '+51': 'Peru', '+52': 'Mexico', '+53': 'Cuba', '+54': 'Argentina', '+55': 'Brazil', '+56': 'Chile',
+    '+57': 'Colombia', '+58': 'Venezuela', '+590': 'Guadeloupe', '+591': 'Bolivia', '+592': 'Guyana',
+    '+593': 'Ecuador', '+594': 'French Guiana', '+595': 'Paraguay', '+596': 'Martinique', '+597': 'Suriname',
+    '+598': 'Uruguay', '+599': 'Curacao',
+    # Zone 6: Southeast Asia and Oceania
+    '+60': 'Malaysia', '+61': 'Australia', '+62': 'Indonesia', '+63': 'Philippines', '+64': 'New Zealand',
+    '+65': 'Singapore', '+66': 'Thailand', '+670': 'Timor-Leste', '+672': 'Norfolk Island', '+673': 'Brunei',
+    '+674': 'Nauru', '+675': 'Papua New Guinea', '+676': 'Tonga', '+677': 'Solomon Islands', '+678': 'Vanuatu',
+    '+679': 'Fiji', '+680': 'Palau', '+681': 'Wallis and Futuna', '+682': 'Cook Islands', '+683': 'Niue',
+    '+685': 'Samoa', '+686': 'Kiribati', '+687': 'New Caledonia', '+688': 'Tuvalu', '+689': 'French Polynesia',
+    '+690': 'Tokelau', '+691': 'Micronesia', '+692': 'Marshall Islands',
+    # Zone 7: Russia and Kazakhstan
+    '+7': 'Russia', '+76': 'Kazakhstan', '+77': 'Kazakhstan',
+    # Zone 8: East Asia and international services
+    '+800': 'International Freephone', '+808': 'International Shared Cost', '+81': 'Japan', '+82': 'South Korea',
+    '+84': 'Vietnam', '+850': 'North Korea', '+852': 'Hong Kong', '+853': 'Macau', '+855': 'Cambodia', '+856': 'Laos',
+    '+86': 'China', '+870': 'Inmarsat', '+881': 'Global Mobile Satellite', '+882': 'International Networks',
+    '+883': 'International Networks', '+880': 'Bangladesh', '+886': 'Taiwan',
+    # Zone 9: West, Central and South Asia
+    '+90': 'Turkey', '+91': 'India', '+92': 'Pakistan', '+93': 'Afghanistan', '+94': 'Sri Lanka', '+95': 'Myanmar',
+    '+960': 'Maldives', '+961': 'Lebanon', '+962': 'Jordan', '+963': 'Syria', '+964': 'Iraq', '+965': 'Kuwait',
+    '+966': 'Saudi Arabia', '+967': 'Yemen', '+968': 'Oman', '+970': 'Palestine', '+971': 'UAE', '+972': 'Israel',
+    '+973': 'Bahrain', '+974': 'Qatar', '+975': 'Bhutan', '+976': 'Mongolia', '+977': 'Nepal',
+    '+979': 'International Premium Rate', '+98': 'Iran', '+992': 'Tajikistan', '+993': 'Turkmenistan',
+    '+994': 'Azerbaijan', '+995': 'Georgia', '+996': 'Kyrgyzstan', '+998': 'Uzbekistan'
+}
+
+# Dialling codes without the '+', grouped by length (longest first) for the longest-prefix lookup
+PHONE_CODE_LOOKUP = {
+    size: {code[1:]: country_name for code, country_name in COUNTRY_CODES.items() if len(code) == size + 1}
+    for size in sorted({len(code) - 1 for code in COUNTRY_CODES}, reverse=True)
+}
+E164_DIGIT_RANGE = (7, 15)  # Fewest and most digits (country code included) of a valid E.164 number
+INDIA_NATIONAL_DIGITS = 10  # Subscriber digits of an Indian number after +91 or the trunk prefix 0
+PHONE_EXTENSION_PATTERN = r'(?i)\s*(?:ext(?:ension)?\.?|x|#)\s*\d+\s*$'  # Trailing "ext 12", "x12" or "#12"
+
+# 📧 EMAIL VALIDATION: addresses must match the format; domains a few edits away from a popular
+# mail domain are reported as typos of it. Values are the edits (wrong, missing or extra character,
+# swapped neighbours) still treated as a typo - none for short domains that sit too close to real ones.
+EMAIL_FORMAT_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+POPULAR_EMAIL_DOMAINS = {
+    'gmail.com': 1, 'yahoo.com': 1, 'hotmail.com': 2, 'outlook.com': 2, 'icloud.com': 1, 'rediffmail.com': 2,
+    'yahoo.co.in': 1, 'yahoo.co.uk': 1, 'ymail.com': 1, 'googlemail.com': 2, 'protonmail.com': 2,
+    'hotmail.co.uk': 2, 'live.com': 0, 'mail.com': 0, 'aol.com': 0, 'msn.com': 0, 'me.com': 0
+}
+# Real provider domains a few edits away from a popular one, never reported as typos
+KNOWN_EMAIL_DOMAINS = {
+    'email.com', 'cloud.com', 'gmx.com', 'gmx.de', 'mail.ru', 'mac.com', 'aim.com', 'zoho.com', 'yandex.com',
+    'protonmail.ch', 'proton.me', 'pm.me', 'live.in', 'live.co.uk', 'outlook.in', 'outlook.cl', 'outlook.fr',
+    'outlook.de', 'outlook.jp', 'outlook.com.au', 'hotmail.co.jp', 'hotmail.co.za', 'hotmail.fr', 'hotmail.de',
+    'hotmail.it', 'hotmail.es', 'yahoo.co.id', 'yahoo.co.jp', 'yahoo.com.au', 'yahoo.com.br', 'yahoo.fr',
+    'yahoo.de', 'yahoo.es', 'yahoo.it', 'yahoo.ca', 'yahoo.com.sg', 'yahoo.com.my', 'ymail.co.in'
 }
+# Country and generic suffixes providers register their domains under: a domain whose suffix (after
+# the first label) is one of these but differs from a popular domain's is another country's domain,
+# not a typo of it. A bare '.co' is left out - in an email it is far more often a clipped '.com'.
+EMAIL_DOMAIN_SUFFIXES = {
+    'com', 'net', 'org', 'me', 'in', 'us', 'uk', 'ca', 'au', 'nz', 'ie', 'de', 'fr', 'es', 'it', 'nl', 'be', 'ch',
+    'at', 'se', 'no', 'dk', 'fi', 'pl', 'pt', 'ru', 'jp', 'cn', 'kr', 'sg', 'my', 'id', 'ph', 'th', 'vn', 'ae',
+    'za', 'ng', 'ke', 'br', 'mx', 'ar', 'cl', 'pe', 'tr', 'co.uk', 'co.in', 'co.id', 'co.jp', 'co.za', 'co.nz',
+    'co.kr', 'co.th', 'com.au', 'com.br', 'com.mx', 'com.ar', 'com.sg', 'com.my', 'com.ph', 'com.tr', 'com.cn'
+}
+EMAIL_DOMAIN_CACHE_SIZE = 200_000  # Email domains whose typo check is remembered across datasets and sessions
 
 # 🔥 FINAL LEAD STATUS MAPPING (FORCE MERGE OLD → NEW)
 LEAD_STATUS_MAP = {
@@ -403,29 +559,366 @@ TRAFFIC_SOURCE_CATEGORIES = {
     "sms": "SMS"
 }
 
-# SECRET API KEY - LOADED FROM SECRETS
+# Checked after TRAFFIC_SOURCE_CATEGORIES, in order (first match wins)
+TRAFFIC_SOURCE_PARTIAL_MATCHES = [
+    ("google", "Google"),
+    ("facebook", "Facebook"), ("fb", "Facebook"),
+    ("linkedin", "LinkedIn"),
+    ("instagram", "Instagram"), ("ig", "Instagram"),
+    ("twitter", "Twitter"), ("x.com", "Twitter"),
+    ("email", "Email"), ("mail", "Email"),
+    ("direct", "Direct Traffic"),
+    ("organic", "Organic Search"),
+    ("referral", "Referral"),
+    ("search", "Search"),
+    ("social", "Social Media")
+]
+
+# 🎓 COURSE/PROGRAM FIELDS, IN PRIORITY ORDER
+CONTACT_COURSE_FIELDS = [
+    "course", "program", "product", "service", "offering",
+    "course_name", "program_name", "product_name",
+    "enquired_course", "interested_course", "course_interested",
+    "program_of_interest", "course_of_interest", "product_of_interest",
+    "service_of_interest", "training_program", "educational_program",
+    "learning_program", "certification_program"
+]
+
+# 🔥 HUBSPOT PROPERTIES BEHIND EACH ANALYSIS COLUMN (what process_contacts_data reads; fetches always request them)
+CONTACT_COLUMN_PROPERTIES = {
+    "ID": ["hs_object_id"],
+    "First Name": ["firstname"],
+    "Last Name": ["lastname"],
+    "Email": ["email"],
+    "Phone": ["phone"],
+    "Mobile Phone": ["mobilephone"],
+    "Company": ["company"],
+    "Job Title": ["jobtitle"],
+    "Course/Program": CONTACT_COURSE_FIELDS,
+    "Lead Status": ["hs_lead_status", "lead_status"],
+    "Sub Lead Status": ["sub_lead_status", "hs_sub_lead_status"],
+    "Lifecycle Stage": ["lifecyclestage"],
+    "Traffic Source": ["hs_analytics_source"],
+    "Campaign Name": ["hs_analytics_source_data_1", "hs_campaign_name"],
+    "Campaign Drilldown 2": ["hs_analytics_source_data_2"],
+    "UTM Source": ["hs_utm_source"],
+    "UTM Medium": ["hs_utm_medium"],
+    "UTM Campaign": ["hs_utm_campaign"],
+    "Future Prospect Reasons": ["future_prospect_reasons", "future_prospect_reason"],
+    "Hot Prospect Reason": ["hot_prospect_reason"],
+    "Neutral Prospect Reasons": ["neutral_prospect_reasons"],
+    "Not Connected Reasons": ["not_connected_reasons"],
+    "Not Interested Reasons": ["not_interested_reasons"],
+    "Other Enquiry Reasons": ["other_enquiry_reasons"],
+    "Prospect Reasons": ["prospect_reasons"],
+    "Contact Reason": ["contact_reason"],
+    "Reason for Contact": ["reason_for_contact"],
+    "Enquiry Reason": ["enquiry_reason"],
+    "Disqualification Reason": ["disqualification_reason"],
+    "Conversion Reason": ["conversion_reason"],
+    "Country": ["country"],
+    "State": ["state"],
+    "City": ["city"],
+    "Industry": ["industry"],
+    "Annual Revenue": ["annualrevenue"],
+    "Revenue": ["amount"],
+    "Employee Count": ["numemployees"],
+    "Website": ["website"],
+    "Owner ID": ["hubspot_owner_id"],
+    "Created Date": ["createdate"],
+    "Last Modified Date": ["lastmodifieddate"]
+}
+
+# 🔥 SUB LEAD STATUSES THAT OVERRIDE THE LEAD STATUS
+SUB_LEAD_STATUS_OVERRIDES = {
+    "Not Connected (NC)": ["not answering", "call back request", "disconnected by user", "out of coverage", "user busy"],
+    "Not Interested": ["casual enquiry", "not interested", "other reasons", "future prospect"],
+    "Not Qualified": ["connected unknowingly", "hr calls", "wrong course enquiry"]
+}
+SUB_LEAD_STATUS_OVERRIDE_LOOKUP = {
+    sub_status: status for status, sub_statuses in SUB_LEAD_STATUS_OVERRIDES.items() for sub_status in sub_statuses
+}
+
+# Raw values seen by the normalizers are few (hundreds), so memoize them per process
+NORMALIZATION_CACHE_SIZE = 4096
+# Below this many distinct values a plain table scan beats setting up the column-wise matcher
+SUBSTRING_MATCHER_MIN_COLUMN_SIZE = 512
+
+# 🗜️ COMPACT SCHEMA: low-cardinality text as categoricals, other text as Arrow strings, 0/1 flags as booleans
+COMPACT_CATEGORY_MAX_RATIO = 0.5  # Text columns with at most this many distinct values per row become categoricals
+CONTACT_FLAG_COLUMNS = ["Has Email", "Has Phone", "Has Course", "Has Traffic Source", "Has Campaign", "Has Drilldown 2"]
+CONTACT_CUBE_DIMENSIONS = [
+    "Traffic Source", "Campaign Name", "Campaign Drilldown 2", "Lead Status", "Sub Lead Status", "Course/Program", "Created Day"
+]
+
+# 🔁 INCREMENTAL ANALYSIS: a re-read of the loaded contacts is patched from its analysis instead of redone
+INCREMENTAL_ANALYSIS_MAX_DELTA_RATIO = 0.25  # Above this share of added/removed contacts a full rebuild is cheaper
 try:
-    if "HUBSPOT_API_KEY" in st.secrets:
-        HUBSPOT_API_KEY = st.secrets["HUBSPOT_API_KEY"]
-    else:
-        st.error("❌ HUBSPOT_API_KEY not found in secrets. Please check your .streamlit/secrets.toml file.")
+    COMPACT_TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+except TypeError:
+    COMPACT_TEXT_DTYPE = None  # pandas < 2.3: high-cardinality text stays as it is
+
+# 🔥 IMPORTANT: Added Campaign/Traffic Source properties INCLUDING DRILL-DOWN 2
+HUBSPOT_CONTACT_PROPERTIES = [
+    # Lead status and basic info
+    "hs_lead_status", "lifecyclestage", "hubspot_owner_id", "sub_lead_status", "hs_sub_lead_status",
+
+    # 🔥 CAMPAIGN & TRAFFIC SOURCE PROPERTIES (COMPLETE HIERARCHY)
+    "hs_analytics_source",                     # Original Traffic Source
+    "hs_analytics_source_data_1",              # Drill-Down 1 (Campaign/Referrer)
+    "hs_analytics_source_data_2",              # 🔥 NEW: Drill-Down 2 (Ad/Keyword/Placement)
+    "hs_campaign_name", "hs_utm_source", "hs_utm_medium",
+    "hs_utm_campaign", "hs_utm_content", "hs_utm_term",
+
+    # Prospect reason properties
+    "future_prospect_reasons", "future_prospect_reason", "hot_prospect_reason", 
+    "neutral_prospect_reasons", "not_connected_reasons",
+    "not_interested_reasons", "prospect_reasons",
+    "other_enquiry_reasons", "lead_status",
+
+    # Course/Program related properties
+    "course", "program", "product", "service", "offering",
+    "course_name", "program_name", "product_name",
+    "enquired_course", "interested_course", "course_interested",
+    "program_of_interest", "course_of_interest", "product_of_interest",
+    "service_of_interest", "training_program", "educational_program",
+    "learning_program", "certification_program",
+
+    # Additional reason fields
+    "contact_reason", "reason_for_contact", "enquiry_reason",
+    "disqualification_reason", "conversion_reason",
+
+    # Standard contact properties
+    "firstname", "lastname", "email", "phone", 
+    "createdate", "lastmodifieddate", "hs_object_id",
+    "company", "jobtitle", "country", "state", "city",
+    "industry", "annualrevenue", "numemployees",
+    "website", "mobilephone", "address", "amount"
+]
+
+# Always requested, even when property discovery finds them empty: everything an analysis column is built from
+HUBSPOT_REQUIRED_PROPERTIES = list(dict.fromkeys(
+    prop for props in CONTACT_COLUMN_PROPERTIES.values() for prop in props
+))
+
+# SECRET API KEY - LOADED FROM SECRETS (or the HUBSPOT_API_KEY environment variable, e.g. for the local mock API)
+HUBSPOT_API_KEY = os.environ.get("HUBSPOT_API_KEY")
+if not HUBSPOT_API_KEY:
+    try:
+        if "HUBSPOT_API_KEY" in st.secrets:
+            HUBSPOT_API_KEY = st.secrets["HUBSPOT_API_KEY"]
+        else:
+            st.error("❌ HUBSPOT_API_KEY not found in secrets. Please check your .streamlit/secrets.toml file.")
+            st.stop()
+    except FileNotFoundError:
+        st.error("❌ .streamlit/secrets.toml not found. Please create this file to store your API key safely.")
         st.stop()
-except FileNotFoundError:
-    st.error("❌ .streamlit/secrets.toml not found. Please create this file to store your API key safely.")
-    st.stop()
-
-def test_hubspot_connection(api_key):
-    """Test if the HubSpot API key is valid."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+
+class TokenBucketRateLimiter:
+    """
+    🔥 Thread-safe token bucket driven by HubSpot's rate-limit headers.
+    Concurrent callers draw from the same burst allowance; when the server reports
+    less quota remaining than the bucket holds, the bucket shrinks so callers slow
+    down before a 429 instead of after it. Each bucket only follows the headers of its own
+    interval (`headers`, see HUBSPOT_WINDOW_RATE_HEADERS).
+    """
+    
+    def __init__(self, max_requests, interval_ms, headers=HUBSPOT_WINDOW_RATE_HEADERS):
+        self.capacity = float(max_requests)
+        self.interval = interval_ms / 1000.0
+        self.headers = headers
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+    
+    def _refill(self, now):
+        rate = self.capacity / self.interval
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+    
+    def acquire(self):
+        """Block until a request may be sent, then consume one token."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait_for = max(self.blocked_until - now, (1 - self.tokens) * self.interval / self.capacity)
+            
+            time.sleep(wait_for)
+    
+    def update_from_headers(self, headers):
+        """Adopt the quota HubSpot reports for this bucket's interval (max, interval and remaining requests)."""
+        max_header, interval_header, remaining_header = self.headers
+        try:
+            max_requests = headers.get(max_header)
+            interval_ms = headers.get(interval_header) if interval_header else None
+            remaining = headers.get(remaining_header)
+            
+            with self.lock:
+                self._refill(time.monotonic())
+                
+                if max_requests:
+                    self.capacity = float(max_requests)
+                if interval_ms:
+                    self.interval = int(interval_ms) / 1000.0
+                
+                if remaining is not None:
+                    self.tokens = min(self.tokens, float(remaining))
+        except (TypeError, ValueError):
+            pass  # Malformed headers - keep the current bucket
+    
+    def penalize(self, retry_after):
+        """Pause every caller after a 429 for the server's Retry-After period."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.tokens = 0.0
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the HubSpot circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    🔥 Thread-safe circuit breaker shared by every caller of a client.
+    After enough consecutive failures the circuit opens and requests fail fast; once the
+    reset period has passed, trial requests go through again and the first success closes it.
+    """
+    
+    def __init__(self, failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+    
+    def before_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            wait_for = self.opened_at + self.reset_seconds - time.monotonic()
+            if wait_for > 0:
+                raise CircuitOpenError(f"HubSpot API looks unavailable - not retrying for another {wait_for:.0f}s")
+    
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()  # (Re)open - also after a failed trial request
+
+def get_backoff_delay(attempt):
+    """Exponential backoff with full jitter, so retrying workers do not hit the API in lockstep."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+class HubSpotClient:
+    """
+    🔥 Thread-safe HubSpot API client built around one pooled requests.Session.
+    Connections are kept alive between pages and responses are negotiated as gzip/deflate.
+    Every request passes through the client's shared rate limiters, so all sessions
+    using the same API key draw from one quota. 5xx responses, timeouts and dropped
+    connections are retried with backoff behind a shared circuit breaker.
+    """
+    
+    def __init__(self, api_key, base_url=HUBSPOT_API_BASE, pool_size=HTTP_POOL_SIZE,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries=HTTP_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.circuit_breaker = CircuitBreaker()
+        
+        # pool_block=True makes extra threads wait for a free connection instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
+        })
+        
+        # Every bucket of an endpoint group has to grant a request
+        self.rate_limiters = {
+            "search": [TokenBucketRateLimiter(*HUBSPOT_SEARCH_RATE_LIMIT)],
+            "default": [
+                TokenBucketRateLimiter(*HUBSPOT_DEFAULT_RATE_LIMIT),
+                TokenBucketRateLimiter(*HUBSPOT_SECONDLY_RATE_LIMIT, headers=HUBSPOT_SECONDLY_RATE_HEADERS)
+            ]
+        }
+    
+    def request(self, method, path, timeout=None, on_rate_limit=None, **kwargs):
+        """
+        Send a rate-limited request relative to the API base URL, waiting out 429 responses.
+        5xx responses, timeouts and connection errors are retried up to max_retries times; after
+        that the last 5xx response is returned (or the last exception re-raised) to the caller.
+        """
+        limiters = self.rate_limiters["search" if path.endswith("/search") else "default"]
+        attempt = 0
+        
+        while True:
+            self.circuit_breaker.before_request()
+            for limiter in limiters:
+                limiter.acquire()
+            
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", timeout=timeout or self.timeout, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                self.circuit_breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                for limiter in limiters:
+                    limiter.update_from_headers(response.headers)
+                
+                # Check for rate limiting
+                if response.status_code == 429:
+                    retry_after = int(response.headers.get('Retry-After', 10))
+                    for limiter in limiters:
+                        limiter.penalize(retry_after)
+                    if on_rate_limit:
+                        on_rate_limit(retry_after)
+                    continue
+                
+                if response.status_code < 500:
+                    self.circuit_breaker.record_success()
+                    return response
+                
+                self.circuit_breaker.record_failure()
+                if attempt >= self.max_retries:
+                    return response
+            
+            time.sleep(get_backoff_delay(attempt))
+            attempt += 1
+    
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
     
-    # Try a simple API endpoint
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts?limit=1"
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+@st.cache_resource(show_spinner=False)
+def get_hubspot_client(api_key, pool_size=HTTP_POOL_SIZE):
+    """Process-wide HubSpot client, shared by every session and rerun for the same API key."""
+    return HubSpotClient(api_key, pool_size=pool_size)
+
+def test_hubspot_connection(api_key, client=None):
+    """Test if the HubSpot API key is valid (with `client`, if already resolved)."""
+    client = client or get_hubspot_client(api_key)
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        # Try a simple API endpoint
+        response = client.get("/crm/v3/objects/contacts", params={"limit": 1}, timeout=10)
         
         if response.status_code == 200:
             return True, "✅ Connection successful! API key is valid."
@@ -462,257 +955,951 @@ def date_to_hubspot_timestamp(date_obj, is_end_date=False):
     # Convert to milliseconds
     return int(dt_utc.timestamp() * 1000)
 
-def fetch_hubspot_contacts_with_date_filter(api_key, date_field, start_date, end_date):
-    """Fetch ALL contacts from HubSpot with server-side date filtering - NO LIMIT."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+def build_date_filter_groups(date_field, start_timestamp, end_timestamp, modified_after=None):
+    """
+    Build HubSpot search filter groups for the selected date field (inclusive bounds).
+    With `modified_after`, every group is further restricted to contacts modified since that timestamp.
+    """
+    def range_filters(property_name):
+        filters = [
+            {
+                "propertyName": property_name,
+                "operator": "GTE",
+                "value": start_timestamp
+            },
+            {
+                "propertyName": property_name,
+                "operator": "LTE",
+                "value": end_timestamp
+            }
+        ]
+        if modified_after is not None:
+            filters.append({
+                "propertyName": "lastmodifieddate",
+                "operator": "GTE",
+                "value": modified_after
+            })
+        return {"filters": filters}
     
-    # Convert dates to timestamps
+    if date_field == "Created Date":
+        return [range_filters("createdate")]
+    elif date_field == "Last Modified Date":
+        return [range_filters("lastmodifieddate")]
+    else:  # Both - created OR modified in date range
+        return [range_filters("createdate"), range_filters("lastmodifieddate")]
+
+def get_date_range_timestamps(start_date, end_date):
+    """Convert the selected start/end dates to the inclusive HubSpot timestamp range."""
     start_timestamp = date_to_hubspot_timestamp(start_date, is_end_date=False)
     
     # IMPORTANT: Add one day to end date for safe boundary to ensure we get all records
     safe_end_date = end_date + timedelta(days=1)
     end_timestamp = date_to_hubspot_timestamp(safe_end_date, is_end_date=False)
     
-    all_contacts = []
-    after = None
-    page_count = 0
+    return start_timestamp, end_timestamp
+
+def search_contacts_page(client, date_field, filter_groups, after=None, limit=HUBSPOT_SEARCH_PAGE_SIZE, on_rate_limit=None, properties=None):
+    """Fetch a single page from the contacts search endpoint (rate limiting is handled by the client)."""
+    body = {
+        "filterGroups": filter_groups,
+        "properties": properties or HUBSPOT_CONTACT_PROPERTIES,
+        "limit": limit,
+        "sorts": [{
+            "propertyName": "createdate" if date_field == "Created Date" else "lastmodifieddate",
+            "direction": "ASCENDING"
+        }]
+    }
     
-    # Build filter groups based on selected date field
-    if date_field == "Created Date":
-        filter_groups = [
-            {
-                "filters": [
-                    {
-                        "propertyName": "createdate",
-                        "operator": "GTE",
-                        "value": start_timestamp
-                    },
-                    {
-                        "propertyName": "createdate",
-                        "operator": "LTE",
-                        "value": end_timestamp
-                    }
-                ]
-            }
-        ]
-    elif date_field == "Last Modified Date":
-        filter_groups = [
-            {
-                "filters": [
-                    {
-                        "propertyName": "lastmodifieddate",
-                        "operator": "GTE",
-                        "value": start_timestamp
-                    },
-                    {
-                        "propertyName": "lastmodifieddate",
-                        "operator": "LTE",
-                        "value": end_timestamp
-                    }
-                ]
-            }
-        ]
-    else:  # Both - created OR modified in date range
-        filter_groups = [
-            {
-                "filters": [
-                    {
-                        "propertyName": "createdate",
-                        "operator": "GTE",
-                        "value": start_timestamp
-                    },
-                    {
-                        "propertyName": "createdate",
-                        "operator": "LTE",
-                        "value": end_timestamp
-                    }
-                ]
-            },
-            {
-                "filters": [
-                    {
-                        "propertyName": "lastmodifieddate",
-                        "operator": "GTE",
-                        "value": start_timestamp
-                    },
-                    {
-                        "propertyName": "lastmodifieddate",
-                        "operator": "LTE",
-                        "value": end_timestamp
-                    }
-                ]
-            }
-        ]
+    if after:
+        body["after"] = after
+    
+    response = client.post("/crm/v3/objects/contacts/search", json=body, on_rate_limit=on_rate_limit)
+    response.raise_for_status()
+    data = response.json()
+    
+    if properties:
+        # HubSpot returns every requested property, null when empty - give the projected-away ones the same shape
+        requested = set(properties)
+        skipped = [prop for prop in HUBSPOT_CONTACT_PROPERTIES if prop not in requested]
+        for contact in data.get("results", []):
+            contact_properties = contact.setdefault("properties", {})
+            for prop in skipped:
+                contact_properties.setdefault(prop, None)
+    
+    return data
+
+@st.cache_data(ttl=PROPERTY_DISCOVERY_TTL_SECONDS, show_spinner=False)
+def discover_populated_properties(api_key):
+    """
+    🔥 PROPERTY DISCOVERY
+    Find which optional HUBSPOT_CONTACT_PROPERTIES hold data in this portal (HUBSPOT_REQUIRED_PROPERTIES
+    are requested anyway and never probed). Properties the portal does not define are dropped using the
+    properties API, a sample page of recently modified contacts marks the common ones as populated, and
+    the rest are checked with one-result HAS_PROPERTY searches, run concurrently under the search limiter.
+    Raises RequestException on failure - failures are not cached.
+    """
+    client = get_hubspot_client(api_key)
+    
+    response = client.get("/crm/v3/properties/contacts")
+    response.raise_for_status()
+    defined = {prop["name"] for prop in response.json().get("results", [])}
+    candidates = [prop for prop in HUBSPOT_CONTACT_PROPERTIES if prop in defined and prop not in HUBSPOT_REQUIRED_PROPERTIES]
+    if not candidates:
+        return []
+    
+    def search(filter_groups, properties, limit):
+        response = client.post("/crm/v3/objects/contacts/search", json={
+            "filterGroups": filter_groups,
+            "properties": properties,
+            "limit": limit,
+            "sorts": [{"propertyName": "lastmodifieddate", "direction": "DESCENDING"}]
+        })
+        response.raise_for_status()
+        return response.json()
+    
+    populated = set()
+    for contact in search([], candidates, HUBSPOT_SEARCH_PAGE_SIZE).get("results", []):
+        populated.update(name for name, value in contact.get("properties", {}).items() if value not in (None, ""))
+    
+    def has_data(prop):
+        probe = search([{"filters": [{"propertyName": prop, "operator": "HAS_PROPERTY"}]}], ["hs_object_id"], 1)
+        return probe.get("total", 0) > 0
+    
+    unprobed = [prop for prop in candidates if prop not in populated]
+    if unprobed:
+        with ThreadPoolExecutor(max_workers=min(FETCH_MAX_WORKERS, len(unprobed))) as executor:
+            populated.update(prop for prop, found in zip(unprobed, executor.map(has_data, unprobed)) if found)
+    
+    return [prop for prop in candidates if prop in populated]
+
+def get_fetch_properties(api_key, reporter=None):
+    """Properties to request on search pages: the populated ones plus HUBSPOT_REQUIRED_PROPERTIES (all of them if discovery fails)."""
+    try:
+        populated = set(discover_populated_properties(api_key))
+    except requests.exceptions.RequestException as e:
+        message = f"⚠️ Property discovery failed, requesting all properties: {e}"
+        if reporter:
+            reporter.warning(message)
+        else:
+            st.warning(message)
+        return HUBSPOT_CONTACT_PROPERTIES
     
-    url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts/search"
-    
-    # Create progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    status_text.text(f"📡 Fetching ALL contacts with {date_field} filter from {start_date} to {end_date}...")
-    
-    # 🔥 IMPORTANT: Added Campaign/Traffic Source properties INCLUDING DRILL-DOWN 2
-    all_properties = [
-        # Lead status and basic info
-        "hs_lead_status", "lifecyclestage", "hubspot_owner_id", "sub_lead_status", "hs_sub_lead_status",
-        
-        # 🔥 CAMPAIGN & TRAFFIC SOURCE PROPERTIES (COMPLETE HIERARCHY)
-        "hs_analytics_source",                     # Original Traffic Source
-        "hs_analytics_source_data_1",              # Drill-Down 1 (Campaign/Referrer)
-        "hs_analytics_source_data_2",              # 🔥 NEW: Drill-Down 2 (Ad/Keyword/Placement)
-        "hs_campaign_name", "hs_utm_source", "hs_utm_medium",
-        "hs_utm_campaign", "hs_utm_content", "hs_utm_term",
-        
-        # Prospect reason properties
-        "future_prospect_reasons", "hot_prospect_reason", 
-        "neutral_prospect_reasons", "not_connected_reasons",
-        "not_interested_reasons", "prospect_reasons",
-        "other_enquiry_reasons", "lead_status",
-        
-        # Course/Program related properties
-        "course", "program", "product", "service", "offering",
-        "course_name", "program_name", "product_name",
-        "enquired_course", "interested_course", "course_interested",
-        "program_of_interest", "course_of_interest", "product_of_interest",
-        "service_of_interest", "training_program", "educational_program",
-        "learning_program", "certification_program",
+    return [prop for prop in HUBSPOT_CONTACT_PROPERTIES if prop in populated or prop in HUBSPOT_REQUIRED_PROPERTIES]
+
+def get_contact_key(contact):
+    """Stable de-duplication key for a raw HubSpot contact."""
+    return contact.get("properties", {}).get("hs_object_id") or contact.get("id")
+
+class FetchCheckpoint:
+    """
+    🔥 On-disk checkpoint of an in-progress fetch, so a failed fetch resumes where it stopped.
+    Fetched contacts are appended to <key>.jsonl batch by batch; <key>.json holds the paging
+    state (cursor or pending windows) and how many contacts it covers, and is replaced
+    atomically - contacts written after the last state update are ignored on resume.
+    Only one fetch in the process writes a checkpoint at a time: a concurrent fetch of the same range
+    (e.g. one only differing in schema compaction) runs without one instead of appending to it too.
+    """
+    
+    in_use = set()  # State paths of checkpoints held by unfinished fetches
+    in_use_lock = threading.Lock()
+    
+    def __init__(self, *key_parts, root=FETCH_CHECKPOINT_DIR):
+        key = hashlib.sha1(json.dumps(key_parts, default=str).encode()).hexdigest()
+        os.makedirs(root, exist_ok=True)
+        self.state_path = os.path.join(root, f"{key}.json")
+        self.contacts_path = os.path.join(root, f"{key}.jsonl")
+        self.held = False
+    
+    def load(self):
+        """Take the checkpoint for this fetch and return (state, contacts) of a usable one, or (None, [])."""
+        with FetchCheckpoint.in_use_lock:
+            if self.state_path not in FetchCheckpoint.in_use:
+                FetchCheckpoint.in_use.add(self.state_path)
+                self.held = True
+        if not self.held or not os.path.exists(self.state_path):
+            return None, []
         
-        # Additional reason fields
-        "contact_reason", "reason_for_contact", "enquiry_reason",
-        "disqualification_reason", "conversion_reason",
-        
-        # Standard contact properties
-        "firstname", "lastname", "email", "phone", 
-        "createdate", "lastmodifieddate", "hs_object_id",
-        "company", "jobtitle", "country", "state", "city",
-        "industry", "annualrevenue", "numemployees",
-        "website", "mobilephone", "address", "amount"
-    ]
+        if time.time() - os.path.getmtime(self.state_path) > FETCH_CHECKPOINT_MAX_AGE_SECONDS:
+            self.clear()
+            return None, []
+        
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            contacts = []
+            with open(self.contacts_path) as f:
+                for line in f:
+                    if len(contacts) >= state["contact_count"]:
+                        break
+                    contacts.append(json.loads(line))
+        except (OSError, ValueError, KeyError):
+            self.clear()
+            return None, []
+        
+        if len(contacts) < state["contact_count"]:
+            self.clear()
+            return None, []
+        return state, contacts
+    
+    def save(self, new_contacts, state):
+        """Append a batch of contacts, then record the paging state that follows it."""
+        if not self.held:
+            return
+        
+        with open(self.contacts_path, "a") as f:
+            for contact in new_contacts:
+                f.write(json.dumps(contact) + "\n")
+        
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+    
+    def clear(self):
+        if not self.held:
+            return
+        
+        for path in (self.state_path, self.contacts_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def release(self):
+        """Hand the checkpoint back once the fetch has finished, failed or been cancelled; its files stay."""
+        if self.held:
+            with FetchCheckpoint.in_use_lock:
+                FetchCheckpoint.in_use.discard(self.state_path)
+            self.held = False
+
+class ContactPageCollector:
+    """
+    🔥 Collects fetched pages of contacts, de-duplicated by ID (an edit made while paging can move a contact onto a second page).
+    With stream=True each page is converted into a small processed DataFrame chunk as soon as it arrives and the raw
+    dicts are released, so a large fetch never holds raw JSON, row dicts and the final DataFrame at the same time;
+    the chunks are concatenated once in result().
+    """
+    
+    def __init__(self, stream=False):
+        self.stream = stream
+        self.contacts_by_id = {}
+        self.chunks = []
+        self.count = 0
+    
+    def add_page(self, contacts):
+        if not contacts:
+            return
+        
+        if self.stream:
+            self.chunks.append(process_contacts_data(contacts))
+            self.count += len(contacts)
+        else:
+            for contact in contacts:
+                self.contacts_by_id[get_contact_key(contact)] = contact
+            self.count = len(self.contacts_by_id)
+    
+    def result(self):
+        """Raw contact list, or the processed DataFrame in streaming mode."""
+        if not self.stream:
+            return list(self.contacts_by_id.values())
+        
+        if not self.chunks:
+            return pd.DataFrame()
+        
+        df = pd.concat(self.chunks, ignore_index=True)
+        self.chunks = []
+        return df.drop_duplicates("ID", keep="last", ignore_index=True)
+
+class FetchCancelled(Exception):
+    """Raised inside a fetch once its background job has been cancelled."""
+
+class StreamlitFetchReporter:
+    """
+    Reports fetch progress straight into the running script (progress bar + status line).
+    Background jobs use FetchJob instead, which implements the same methods.
+    """
+    
+    def __init__(self):
+        self.progress_bar = st.progress(0)
+        self.status_text = st.empty()
+    
+    def progress(self, fraction):
+        self.progress_bar.progress(fraction)
+    
+    def status(self, text):
+        self.status_text.text(text)
+    
+    def status_warning(self, text):
+        self.status_text.warning(text)
+    
+    def info(self, text):
+        st.info(text)
+    
+    def warning(self, text):
+        st.warning(text)
+    
+    def error(self, text):
+        st.error(text)
+    
+    def clear(self):
+        self.progress_bar.empty()
+        self.status_text.empty()
+    
+    def check_cancelled(self):
+        pass  # A foreground fetch cannot be cancelled
+
+def get_fetch_fraction(fetched, total):
+    """Fetch progress from the search `total`, kept below 100% until the fetch has actually finished."""
+    if not total:
+        return 0.0
+    return min(fetched / total, 0.99)
+
+def fetch_hubspot_contacts_with_date_filter(api_key, date_field, start_date, end_date, sharded=False, max_workers=FETCH_MAX_WORKERS, modified_after=None, stream=False, properties=None, reporter=None, client=None):
+    """
+    Fetch ALL contacts from HubSpot with server-side date filtering - NO LIMIT. Returns (None, 0) on failure.
+    Every page is checkpointed, so after a failure the next fetch of the same range resumes from the last good page.
+    With stream=True the contacts are returned as a processed DataFrame built page by page (see ContactPageCollector).
+    `properties` limits the requested properties (default: HUBSPOT_CONTACT_PROPERTIES).
+    Progress goes to `reporter` (default: a progress bar in the running script); FetchCancelled propagates.
+    Off the script thread, pass the `client` resolved on it (default: the shared client for `api_key`).
+    """
+    if sharded:
+        return fetch_hubspot_contacts_sharded(
+            api_key, date_field, start_date, end_date, max_workers=max_workers,
+            modified_after=modified_after, stream=stream, properties=properties, reporter=reporter, client=client
+        )
+    
+    client = client or get_hubspot_client(api_key)
+    reporter = reporter or StreamlitFetchReporter()
+    
+    # Convert dates to timestamps
+    start_timestamp, end_timestamp = get_date_range_timestamps(start_date, end_date)
+    
+    # Build filter groups based on selected date field
+    filter_groups = build_date_filter_groups(date_field, start_timestamp, end_timestamp, modified_after)
+    
+    checkpoint = FetchCheckpoint("serial", date_field, start_timestamp, end_timestamp, modified_after, properties)
+    state, saved_contacts = checkpoint.load()
+    after = state["after"] if state else None
+    page_count = state["pages"] if state else 0
+    checkpointed_count = len(saved_contacts)
+    
+    collector = ContactPageCollector(stream=stream)
+    collector.add_page(saved_contacts)
+    del saved_contacts
+    
+    if state:
+        reporter.status(f"♻️ Resuming previous fetch from page {page_count + 1} ({collector.count} contacts already fetched)...")
+    else:
+        reporter.status(f"📡 Fetching ALL contacts with {date_field} filter from {start_date} to {end_date}...")
+    
+    def show_rate_limit(retry_after):
+        reporter.status_warning(f"⚠️ Rate limited. Waiting {retry_after} seconds...")
     
     try:
         while True:  # Infinite loop - will break when no more pages
-            # Prepare request body
-            body = {
-                "filterGroups": filter_groups,
-                "properties": all_properties,
-                "limit": 100,  # Max per API call
-                "sorts": [{
-                    "propertyName": "createdate" if date_field == "Created Date" else "lastmodifieddate",
-                    "direction": "ASCENDING"
-                }]
-            }
-            
-            if after:
-                body["after"] = after
-            
-            response = requests.post(url, headers=headers, json=body, timeout=30)
-            
-            # Check for rate limiting
-            if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 10))
-                status_text.warning(f"⚠️ Rate limited. Waiting {retry_after} seconds...")
-                time.sleep(retry_after)
-                continue
-            
-            response.raise_for_status()
-            data = response.json()
+            reporter.check_cancelled()
+            data = search_contacts_page(client, date_field, filter_groups, after=after, on_rate_limit=show_rate_limit, properties=properties)
             
             batch_contacts = data.get("results", [])
             
             if batch_contacts:
-                all_contacts.extend(batch_contacts)
+                collector.add_page(batch_contacts)
                 page_count += 1
                 
-                # Update progress and status
-                if page_count <= 10:
-                    progress = page_count / 10
-                else:
-                    progress = 0.9 + (page_count / 100)
-                
-                if progress > 0.99:
-                    progress = 0.99
-                
-                progress_bar.progress(progress)
-                status_text.text(f"📥 Fetched {len(all_contacts)} contacts (Page {page_count})...")
+                # Real progress: every search page reports the query's total (the resumed part included)
+                total = data.get("total", 0)
+                reporter.progress(get_fetch_fraction(checkpointed_count + len(batch_contacts), total))
+                reporter.status(f"📥 Fetched {collector.count:,} of {total:,} contacts (Page {page_count})...")
                 
                 # Check for next page
                 paging_info = data.get("paging", {})
                 after = paging_info.get("next", {}).get("after")
                 
+                checkpointed_count += len(batch_contacts)
+                checkpoint.save(batch_contacts, {"after": after, "pages": page_count, "contact_count": checkpointed_count})
+                
                 # CRITICAL: Only break if no more pages
                 if not after:
-                    status_text.text(f"✅ No more pages. Total: {len(all_contacts)} contacts")
+                    reporter.status(f"✅ No more pages. Total: {collector.count} contacts")
                     break  # No more pages
-                
-                # Small delay to avoid rate limiting
-                time.sleep(0.2)
             else:
-                status_text.text(f"✅ No more results. Total: {len(all_contacts)} contacts")
+                reporter.status(f"✅ No more results. Total: {collector.count} contacts")
                 break  # No results
         
-        progress_bar.progress(1.0)
-        status_text.text(f"✅ Fetch complete! Total: {len(all_contacts)} contacts")
+        checkpoint.clear()
+        all_contacts = collector.result()
+        reporter.progress(1.0)
+        reporter.status(f"✅ Fetch complete! Total: {len(all_contacts)} contacts")
         
         return all_contacts, len(all_contacts)
         
+    except FetchCancelled:
+        # The checkpoint stays, so fetching the same range again resumes here
+        reporter.clear()
+        raise
     except requests.exceptions.RequestException as e:
-        progress_bar.empty()
-        status_text.empty()
+        reporter.clear()
         
-        st.error(f"❌ Error fetching data: {e}")
-        return [], 0
+        reporter.error(f"❌ Error fetching data: {e}")
+        if collector.count:
+            reporter.info(f"♻️ {collector.count} contacts fetched so far were kept - fetch again to resume from page {page_count + 1}.")
+        return None, 0
     except Exception as e:
-        progress_bar.empty()
-        status_text.empty()
-        st.error(f"❌ Unexpected error: {e}")
-        return [], 0
+        reporter.clear()
+        reporter.error(f"❌ Unexpected error: {e}")
+        return None, 0
+    finally:
+        checkpoint.release()
 
-def normalize_lead_status(raw_status):
+def split_timestamp_range(start_timestamp, end_timestamp, parts):
+    """Split an inclusive millisecond range into up to `parts` contiguous, non-overlapping windows."""
+    span = end_timestamp - start_timestamp + 1
+    parts = max(1, min(parts, span))
+    step = span // parts
+    
+    windows = []
+    window_start = start_timestamp
+    for i in range(parts):
+        window_end = end_timestamp if i == parts - 1 else window_start + step - 1
+        windows.append((window_start, window_end))
+        window_start = window_end + 1
+    return windows
+
+def fetch_contacts_window(client, date_field, window_start, window_end, modified_after=None, properties=None, check_stopped=None):
     """
-    🔥 AGGRESSIVELY normalize lead status - ensures consistent grouping
-    This is the KEY FUNCTION that fixes your count issue
+    🔥 Fetch one time window of the search results.
+    The first page doubles as a probe: if the reported `total` is above the shard
+    target and the window can still be bisected, return the two halves instead of paging.
+    `check_stopped` is called before every page and raises to abandon the window.
     """
-    if not raw_status:
-        return "Unknown"
+    filter_groups = build_date_filter_groups(date_field, window_start, window_end, modified_after)
+    data = search_contacts_page(client, date_field, filter_groups, properties=properties)
+    total = data.get("total", 0)
+    
+    if total > FETCH_SHARD_TARGET_SIZE and window_end - window_start >= FETCH_MIN_SHARD_SPAN_MS:
+        middle = window_start + (window_end - window_start) // 2
+        return {"split": [(window_start, middle), (middle + 1, window_end)], "total": total}
+    
+    contacts = list(data.get("results", []))
+    after = data.get("paging", {}).get("next", {}).get("after")
+    
+    # Paging past the search cap is rejected by HubSpot, so an unsplittable window stops there
+    while after and len(contacts) < HUBSPOT_SEARCH_RESULT_CAP:
+        if check_stopped:
+            check_stopped()
+        data = search_contacts_page(client, date_field, filter_groups, after=after, properties=properties)
+        contacts.extend(data.get("results", []))
+        after = data.get("paging", {}).get("next", {}).get("after")
+    
+    return {"contacts": contacts, "total": total, "truncated": total > HUBSPOT_SEARCH_RESULT_CAP}
+
+def fetch_hubspot_contacts_sharded(api_key, date_field, start_date, end_date, max_workers=FETCH_MAX_WORKERS, modified_after=None, stream=False, properties=None, reporter=None, client=None):
+    """
+    🔥 PARALLEL SHARDED FETCH
+    Splits the date range into time windows, bisects any window whose search `total`
+    exceeds the shard target (HubSpot stops paging after 10,000 results per query) and
+    pages the windows concurrently, merging and de-duplicating by hs_object_id.
+    Completed windows are checkpointed, so a failed fetch resumes with only the unfinished windows.
+    With stream=True finished windows are processed on this thread while the workers keep fetching.
+    """
+    # Resolve the shared client here (unless given): worker threads have no Streamlit script context
+    client = client or get_hubspot_client(api_key)
+    reporter = reporter or StreamlitFetchReporter()
+    start_timestamp, end_timestamp = get_date_range_timestamps(start_date, end_date)
+    
+    checkpoint = FetchCheckpoint("sharded", date_field, start_timestamp, end_timestamp, modified_after, properties)
+    state, saved_contacts = checkpoint.load()
+    
+    if state:
+        windows = [tuple(window) for window in state["pending"]]
+        windows_done = state["windows_done"]
+        truncated_windows = state["truncated_windows"]
+        reporter.status(f"♻️ Resuming previous fetch: {len(saved_contacts)} contacts already fetched, {len(windows)} window(s) left...")
+    else:
+        windows = split_timestamp_range(start_timestamp, end_timestamp, max_workers)
+        windows_done = 0
+        truncated_windows = 0
+        reporter.status(f"📡 Fetching ALL contacts with {date_field} filter from {start_date} to {end_date} ({max_workers} workers)...")
     
-    status = str(raw_status).strip().lower()
+    checkpointed_count = len(saved_contacts)
+    collector = ContactPageCollector(stream=stream)
+    collector.add_page(saved_contacts)
+    del saved_contacts
+    window_of = {}
     
-    # 🔥 FORCE MERGE OLD VALUES (THIS IS THE FIX!)
-    # Group all prospect types to new categories
-    if "prospect" in status:
-        if "hot" in status or "urgent" in status:
-            return "Hot"
-        elif "warm" in status or "interested" in status:
-            return "Warm"
-        elif "neutral" in status or "cold" in status or "future" in status:
-            return "Cold"
-        else:
-            return "Warm"  # Default prospect to Warm
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    stopped = threading.Event()
     
-    # Group all not-connected variations
-    if "not_connect" in status or "nc" in status.lower() or "no_connect" in status:
-        return "Not Connected (NC)"
+    def check_stopped():
+        if stopped.is_set():
+            raise FetchCancelled()
     
-    # Group all not-interested variations
-    if "not_interest" in status or "no_interest" in status or "disinterest" in status:
-        return "Not Interested"
+    def submit(window):
+        future = executor.submit(fetch_contacts_window, client, date_field, window[0], window[1], modified_after, properties, check_stopped)
+        window_of[future] = window
+        return future
     
-    # Group all not-qualified variations
-    if "not_qualif" in status or "unqualif" in status or "disqualif" in status:
-        return "Not Qualified"
+    try:
+        # One-result probe of the whole range: its `total` drives the progress bar
+        total_probe = search_contacts_page(
+            client, date_field, build_date_filter_groups(date_field, start_timestamp, end_timestamp, modified_after),
+            limit=1, properties=["hs_object_id"]
+        )
+        total = total_probe.get("total", 0)
+        
+        pending = {submit(window) for window in windows}
+        
+        while pending:
+            # Wake up regularly so a cancelled job stops without waiting for a whole window
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            reporter.check_cancelled()
+            if not done:
+                continue
+            
+            new_contacts = []
+            
+            for future in done:
+                result = future.result()
+                
+                if "split" in result:
+                    for window in result["split"]:
+                        pending.add(submit(window))
+                    continue
+                
+                windows_done += 1
+                if result["truncated"]:
+                    truncated_windows += 1
+                
+                collector.add_page(result["contacts"])
+                new_contacts.extend(result["contacts"])
+            
+            checkpointed_count += len(new_contacts)
+            checkpoint.save(new_contacts, {
+                "pending": [window_of[future] for future in pending],
+                "windows_done": windows_done,
+                "truncated_windows": truncated_windows,
+                "contact_count": checkpointed_count
+            })
+            
+            reporter.progress(get_fetch_fraction(checkpointed_count, total))
+            reporter.status(
+                f"📥 Fetched {collector.count:,} of {total:,} contacts "
+                f"({windows_done} window(s) done, {len(pending)} in flight)..."
+            )
+        
+        all_contacts = collector.result()
+        
+        if truncated_windows:
+            reporter.warning(
+                f"⚠️ {truncated_windows} time window(s) still exceeded HubSpot's "
+                f"{HUBSPOT_SEARCH_RESULT_CAP:,}-result search cap and may be incomplete."
+            )
+        
+        checkpoint.clear()
+        reporter.progress(1.0)
+        reporter.status(f"✅ Fetch complete! Total: {len(all_contacts)} contacts")
+        
+        return all_contacts, len(all_contacts)
+        
+    except FetchCancelled:
+        # The checkpoint stays, so fetching the same range again resumes with the unfinished windows
+        reporter.clear()
+        raise
+    except requests.exceptions.RequestException as e:
+        reporter.clear()
+        
+        reporter.error(f"❌ Error fetching data: {e}")
+        if collector.count:
+            reporter.info(f"♻️ {collector.count} contacts fetched so far were kept - fetch again to resume with the unfinished windows.")
+        return None, 0
+    except Exception as e:
+        reporter.clear()
+        reporter.error(f"❌ Unexpected error: {e}")
+        return None, 0
+    finally:
+        # Stop queued windows and abandon in-flight ones as soon as the fetch fails or is cancelled
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        checkpoint.release()
+
+def prepare_contacts_for_storage(df):
+    """Coerce the processed frame to Parquet-safe column types (mixed ''/number/None object columns)."""
+    stored = df.copy()
     
-    # Group all duplicate variations
-    if "duplicate" in status or "junk" in status or "spam" in status:
-        return "Duplicate"
+    for col in ['Annual Revenue', 'Revenue', 'Employee Count']:
+        if col in stored.columns:
+            stored[col] = pd.to_numeric(stored[col], errors='coerce')
     
-    # Group all customer variations
-    if "customer" in status or "client" in status or "converted" in status:
-        return "Customer"
+    for col in ['Created Date', 'Last Modified Date']:
+        if col in stored.columns:
+            stored[col] = to_utc_datetimes(stored[col])
     
-    # Group all new lead variations
+    for col in stored.columns:
+        if stored[col].dtype == object:
+            stored[col] = stored[col].map(lambda value: value if value is None or isinstance(value, str) else (None if pd.isna(value) else str(value)))
+    
+    return stored
+
+def to_utc_datetimes(values):
+    """
+    Dates as naive UTC datetimes. Datetime values pass through; ISO-8601 strings - what HubSpot's search
+    API sends, e.g. "2024-01-15T10:00:00.000Z" - are shifted from their offset; anything else becomes NaT.
+    """
+    return pd.to_datetime(pd.Series(values), utc=True, errors='coerce', format='ISO8601').dt.tz_localize(None)
+
+def contacts_in_range_mask(df, date_field, start_timestamp, end_timestamp):
+    """Boolean mask of processed contacts matching the date-field filter (inclusive ms bounds)."""
+    start = pd.Timestamp(start_timestamp, unit='ms')
+    end = pd.Timestamp(end_timestamp, unit='ms')
+    
+    def in_range(col):
+        values = to_utc_datetimes(df[col])
+        return (values >= start) & (values <= end)
+    
+    if date_field == "Created Date":
+        return in_range('Created Date')
+    elif date_field == "Last Modified Date":
+        return in_range('Last Modified Date')
+    else:  # Both - created OR modified in date range
+        return in_range('Created Date') | in_range('Last Modified Date')
+
+class ContactStore:
+    """
+    🔥 PERSISTENT CONTACT STORE
+    Processed contacts on disk as Parquet, partitioned by created month
+    (contacts/created_month=YYYY-MM/contacts.parquet) and keyed by contact ID.
+    manifest.json records, per date field, the [start, end] day segments already fetched,
+    when they were fetched and their lastmodifieddate high-water marks.
+    Monthly partitions keep file counts low: a typical date range opens two or three files.
+    """
+    
+    def __init__(self, root):
+        self.root = root
+        self.contacts_dir = os.path.join(root, "contacts")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.lock = threading.RLock()
+        os.makedirs(self.contacts_dir, exist_ok=True)
+    
+    def _partition_path(self, partition):
+        return os.path.join(self.contacts_dir, f"created_month={partition}", "contacts.parquet")
+    
+    def _list_partitions(self):
+        return sorted(
+            name.split("=", 1)[1] for name in os.listdir(self.contacts_dir)
+            if name.startswith("created_month=") and os.path.exists(os.path.join(self.contacts_dir, name, "contacts.parquet"))
+        )
+    
+    def _read_partition(self, partition):
+        path = self._partition_path(partition)
+        return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    
+    def _write_partition(self, partition, df):
+        path = self._partition_path(partition)
+        if df.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        
+        # Write then rename so concurrent readers never see a half-written file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _partition_keys(df):
+        created = to_utc_datetimes(df['Created Date'])
+        return created.dt.strftime('%Y-%m').fillna('unknown')
+    
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"segments": {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+    
+    def _save_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def _day_coverage(self, manifest, date_field, now):
+        """Expand the cached segments of a date field to {day: segment}, newest fetch winning; evicted segments are skipped."""
+        coverage = {}
+        segments = manifest["segments"].get(date_field, [])
+        for segment in sorted(segments, key=lambda s: s["fetched_at"]):
+            if now - segment["fetched_at"] > RANGE_CACHE_MAX_AGE_SECONDS:
+                continue
+            day = date.fromisoformat(segment["start"])
+            last_day = date.fromisoformat(segment["end"])
+            while day <= last_day:
+                coverage[day] = segment
+                day += timedelta(days=1)
+        return coverage
+    
+    def plan_range(self, date_field, start_date, end_date):
+        """
+        Split a requested range into runs of consecutive days that are 'fresh' (served from the store),
+        'stale' (cached past the TTL, carrying the oldest high-water mark of the run) or 'missing'.
+        """
+        now = time.time()
+        with self.lock:
+            coverage = self._day_coverage(self.load_manifest(), date_field, now)
+        
+        runs = []
+        day = start_date
+        while day <= end_date:
+            segment = coverage.get(day)
+            if segment is None:
+                status = "missing"
+            elif now - segment["fetched_at"] > RANGE_CACHE_TTL_SECONDS:
+                status = "stale"
+            else:
+                status = "fresh"
+            
+            if runs and runs[-1]["status"] == status:
+                runs[-1]["end"] = day
+            else:
+                runs.append({"start": day, "end": day, "status": status, "high_water_mark": None})
+            
+            if status == "stale":
+                mark = runs[-1]["high_water_mark"]
+                runs[-1]["high_water_mark"] = segment["high_water_mark"] if mark is None else min(mark, segment["high_water_mark"])
+            day += timedelta(days=1)
+        
+        return runs
+    
+    def is_range_cached(self, date_field, start_date, end_date):
+        """True when every day of the range has been fetched before (fresh or stale)."""
+        return all(run["status"] != "missing" for run in self.plan_range(date_field, start_date, end_date))
+    
+    def record_segment(self, date_field, start_date, end_date, high_water_mark):
+        """Record a freshly fetched segment, evict expired ones and re-merge days into compact segments."""
+        now = time.time()
+        with self.lock:
+            manifest = self.load_manifest()
+            coverage = self._day_coverage(manifest, date_field, now)
+            
+            fetched = {"fetched_at": now, "high_water_mark": high_water_mark}
+            day = start_date
+            while day <= end_date:
+                coverage[day] = fetched
+                day += timedelta(days=1)
+            
+            segments = []
+            for day in sorted(coverage):
+                info = coverage[day]
+                previous = segments[-1] if segments else None
+                if (previous and date.fromisoformat(previous["end"]) + timedelta(days=1) == day
+                        and previous["fetched_at"] == info["fetched_at"]
+                        and previous["high_water_mark"] == info["high_water_mark"]):
+                    previous["end"] = day.isoformat()
+                else:
+                    segments.append({
+                        "start": day.isoformat(),
+                        "end": day.isoformat(),
+                        "fetched_at": info["fetched_at"],
+                        "high_water_mark": info["high_water_mark"]
+                    })
+            
+            manifest["segments"][date_field] = segments
+            self._save_manifest(manifest)
+    
+    def upsert(self, df):
+        """Insert or replace processed contacts by ID, touching only the affected partitions."""
+        if df.empty:
+            return
+        
+        stored = prepare_contacts_for_storage(df)
+        with self.lock:
+            for partition, rows in stored.groupby(self._partition_keys(stored), sort=False):
+                existing = self._read_partition(partition)
+                if not existing.empty:
+                    existing = existing[~existing['ID'].isin(rows['ID'])]
+                    rows = pd.concat([existing, rows], ignore_index=True)
+                self._write_partition(partition, rows)
+    
+    def _partitions_for_range(self, date_field, start_timestamp, end_timestamp):
+        """Partitions that can hold contacts of a range - Created Date ranges prune to their own months."""
+        partitions = self._list_partitions()
+        if date_field != "Created Date":
+            return partitions
+        
+        first_month = pd.Timestamp(start_timestamp, unit='ms').strftime('%Y-%m')
+        last_month = pd.Timestamp(end_timestamp, unit='ms').strftime('%Y-%m')
+        return [p for p in partitions if p != 'unknown' and first_month <= p <= last_month]
+    
+    def read_range(self, date_field, start_timestamp, end_timestamp):
+        """Read the stored contacts matching a date-field filter."""
+        with self.lock:
+            frames = [
+                self._read_partition(partition)
+                for partition in self._partitions_for_range(date_field, start_timestamp, end_timestamp)
+            ]
+        
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        
+        df = pd.concat(frames, ignore_index=True)
+        df = df[contacts_in_range_mask(df, date_field, start_timestamp, end_timestamp)]
+        return df.sort_values(['Created Date', 'ID'], kind='stable').reset_index(drop=True)
+    
+    def replace_range(self, date_field, start_timestamp, end_timestamp, df):
+        """Upsert a full fetch of a range and drop stored contacts of that range HubSpot no longer returned."""
+        with self.lock:
+            self.upsert(df)
+            
+            fetched_ids = set(df['ID']) if not df.empty else set()
+            for partition in self._partitions_for_range(date_field, start_timestamp, end_timestamp):
+                existing = self._read_partition(partition)
+                stale = contacts_in_range_mask(existing, date_field, start_timestamp, end_timestamp) & ~existing['ID'].isin(fetched_ids)
+                if stale.any():
+                    self._write_partition(partition, existing[~stale])
+
+@st.cache_resource(show_spinner=False)
+def get_contact_store(root=CONTACT_STORE_DIR):
+    """Process-wide contact store shared by every session."""
+    return ContactStore(root)
+
+def get_max_lastmodified(contacts):
+    """Largest lastmodifieddate (ms) among raw contacts or a processed contacts DataFrame, or None."""
+    if isinstance(contacts, pd.DataFrame):
+        if contacts.empty:
+            return None
+        modified = contacts["Last Modified Date"]
+    else:
+        modified = parse_contact_dates([contact.get("properties", {}).get("lastmodifieddate") or "" for contact in contacts])
+    
+    latest = to_utc_datetimes(modified).max()
+    return None if pd.isna(latest) else int(latest.value // 1_000_000)
+
+def load_synced_range(date_field, start_date, end_date):
+    """Processed contacts of an already-synced range straight from the contact store, or None."""
+    store = get_contact_store()
+    if not store.is_range_cached(date_field, start_date, end_date):
+        return None
+    
+    start_timestamp, end_timestamp = get_date_range_timestamps(start_date, end_date)
+    return store.read_range(date_field, start_timestamp, end_timestamp)
+
+def sync_date_segment(api_key, date_field, start_date, end_date, high_water_mark=None, sharded=False, max_workers=FETCH_MAX_WORKERS, properties=None, reporter=None, client=None, store=None):
+    """
+    Bring one run of days up to date in the contact store and record it as a fresh segment.
+    With a high-water mark the run is delta-synced; otherwise it is fetched in full.
+    Returns the number of contacts fetched, or None if the fetch failed.
+    """
+    store = store or get_contact_store()
+    start_timestamp, end_timestamp = get_date_range_timestamps(start_date, end_date)
+    fetch_started_ms = int(time.time() * 1000)
+    
+    # Created dates never change, and a modified-date range that is still open cannot lose
+    # contacts to later edits - any other range has to be re-read in full to stay correct.
+    can_sync_delta = date_field == "Created Date" or end_timestamp >= fetch_started_ms
+    
+    if high_water_mark is not None and can_sync_delta:
+        changed, _ = fetch_hubspot_contacts_with_date_filter(
+            api_key, date_field, start_date, end_date,
+            sharded=sharded, max_workers=max_workers,
+            modified_after=high_water_mark - INCREMENTAL_SYNC_OVERLAP_MS, stream=True, properties=properties, reporter=reporter,
+            client=client
+        )
+        if changed is None:
+            return None
+        store.upsert(changed)
+    else:
+        high_water_mark = 0
+        changed, _ = fetch_hubspot_contacts_with_date_filter(
+            api_key, date_field, start_date, end_date, sharded=sharded, max_workers=max_workers,
+            stream=True, properties=properties, reporter=reporter, client=client
+        )
+        if changed is None:
+            return None
+        store.replace_range(date_field, start_timestamp, end_timestamp, changed)
+    
+    # Never move the mark past the fetch start: edits made while paging may have been missed
+    max_seen = get_max_lastmodified(changed)
+    high_water_mark = max(high_water_mark, fetch_started_ms if max_seen is None else min(max_seen, fetch_started_ms))
+    store.record_segment(date_field, start_date, end_date, high_water_mark)
+    
+    return len(changed)
+
+def sync_hubspot_contacts(api_key, date_field, start_date, end_date, incremental=True, sharded=False, max_workers=FETCH_MAX_WORKERS, properties=None, reporter=None, client=None, store=None):
+    """
+    🔥 RANGE-AWARE INCREMENTAL SYNC
+    The requested range is split into runs of days: days fetched within the cache TTL are served
+    from the contact store, stale days are delta-synced since their high-water mark and days never
+    fetched are fetched in full - so sliding or widening a window only costs the new days.
+    incremental=False re-reads the whole range. Off the script thread, pass the `client` and `store` resolved on it.
+    Returns (processed contacts for the range, number of contacts fetched by this sync).
+    """
+    store = store or get_contact_store()
+    
+    if incremental:
+        runs = store.plan_range(date_field, start_date, end_date)
+    else:
+        runs = [{"start": start_date, "end": end_date, "status": "missing", "high_water_mark": None}]
+    
+    fetched_count = 0
+    for run in runs:
+        if run["status"] == "fresh":
+            continue
+        
+        run_count = sync_date_segment(
+            api_key, date_field, run["start"], run["end"],
+            high_water_mark=run["high_water_mark"], sharded=sharded, max_workers=max_workers,
+            properties=properties, reporter=reporter, client=client, store=store
+        )
+        if run_count is None:
+            return pd.DataFrame(), 0
+        fetched_count += run_count
+    
+    start_timestamp, end_timestamp = get_date_range_timestamps(start_date, end_date)
+    return store.read_range(date_field, start_timestamp, end_timestamp), fetched_count
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def normalize_lead_status(raw_status):
+    """
+    🔥 AGGRESSIVELY normalize lead status - ensures consistent grouping
+    This is the KEY FUNCTION that fixes your count issue
+    """
+    if not raw_status:
+        return "Unknown"
+    
+    status = str(raw_status).strip().lower()
+    
+    # 🔥 FORCE MERGE OLD VALUES (THIS IS THE FIX!)
+    # Group all prospect types to new categories
+    if "prospect" in status:
+        if "hot" in status or "urgent" in status:
+            return "Hot"
+        elif "warm" in status or "interested" in status:
+            return "Warm"
+        elif "neutral" in status or "cold" in status or "future" in status:
+            return "Cold"
+        else:
+            return "Warm"  # Default prospect to Warm
+    
+    # Group all not-connected variations
+    if "not_connect" in status or "nc" in status.lower() or "no_connect" in status:
+        return "Not Connected (NC)"
+    
+    # Group all not-interested variations
+    if "not_interest" in status or "no_interest" in status or "disinterest" in status:
+        return "Not Interested"
+    
+    # Group all not-qualified variations
+    if "not_qualif" in status or "unqualif" in status or "disqualif" in status:
+        return "Not Qualified"
+    
+    # Group all duplicate variations
+    if "duplicate" in status or "junk" in status or "spam" in status:
+        return "Duplicate"
+    
+    # Group all customer variations
+    if "customer" in status or "client" in status or "converted" in status:
+        return "Customer"
+    
+    # Group all new lead variations
     if "new" in status or "open" in status or "fresh" in status:
         return "New Lead"
     
@@ -729,384 +1916,994 @@ def normalize_lead_status(raw_status):
     # Final fallback with title case
     return status.replace("_", " ").title()
 
+class SubstringMatcher:
+    """
+    First-match substring lookup over an ordered (pattern, value) table.
+    
+    Gives the same answer as scanning the table with `pattern in text` and taking the first hit. Large
+    inputs are classified column-wise with pyarrow's compiled regex kernels: one pass with all patterns
+    combined finds the texts that contain any of them, then a bisection over the table order pins down
+    the first matching pattern with one combined-pattern pass per step (log2 of the table size).
+    """
+    
+    def __init__(self, table):
+        self.patterns = []
+        self.values = []
+        self.fallback = None
+        for pattern, value in table:
+            if not isinstance(pattern, str) or pattern in self.patterns:
+                continue
+            if pattern == "":
+                # "" is contained in every text, so no later pattern can ever win
+                self.fallback = value
+                break
+            self.patterns.append(pattern)
+            self.values.append(value)
+        self.regex_cache = {}
+    
+    def match(self, text):
+        """Matched value for one text (the fallback where nothing matches)."""
+        for pattern, value in zip(self.patterns, self.values):
+            if pattern in text:
+                return value
+        return self.fallback
+    
+    def contains_any(self, column, start, stop):
+        """Boolean mask of the texts containing any of patterns[start:stop]."""
+        regex = self.regex_cache.get((start, stop))
+        if regex is None:
+            regex = "|".join(re.sub(r"([\\.^$|?*+()\[\]{}])", r"\\\1", p) for p in self.patterns[start:stop])
+            self.regex_cache[(start, stop)] = regex
+        return pc.match_substring_regex(column, regex).to_numpy(zero_copy_only=False)
+    
+    def classify(self, texts):
+        """Matched value for each text (the fallback where nothing matches)."""
+        texts = list(texts)
+        if len(texts) < SUBSTRING_MATCHER_MIN_COLUMN_SIZE or not self.patterns:
+            return [self.match(text) for text in texts]
+        
+        try:
+            column = pa.array(texts, type=pa.string())
+        except (pa.ArrowException, UnicodeEncodeError):
+            # e.g. lone surrogates from a malformed payload
+            return [self.match(text) for text in texts]
+        
+        count = len(self.patterns)
+        first_match = np.full(len(texts), count)
+        # Each entry: rows known to contain a pattern in [start, stop) and none before start
+        pending = [(0, count, np.flatnonzero(self.contains_any(column, 0, count)))]
+        while pending:
+            start, stop, rows = pending.pop()
+            if len(rows) == 0:
+                continue
+            if stop - start == 1:
+                first_match[rows] = start
+                continue
+            
+            middle = (start + stop) // 2
+            hit = self.contains_any(column.take(rows), start, middle)
+            pending.append((start, middle, rows[hit]))
+            pending.append((middle, stop, rows[~hit]))
+        
+        return [self.values[index] if index < count else self.fallback for index in first_match]
+
+# 🔥 BUILT ONCE FROM THE MAPPING TABLES ABOVE (same first-match priority as scanning them in order)
+TRAFFIC_SOURCE_MATCHER = SubstringMatcher(list(TRAFFIC_SOURCE_CATEGORIES.items()) + TRAFFIC_SOURCE_PARTIAL_MATCHES)
+PROSPECT_REASON_MATCHER = SubstringMatcher(PROSPECT_REASON_MAP.items())
+
+def normalize_traffic_sources(raw_sources):
+    """Normalize a sequence of traffic sources to standard categories with one matcher pass."""
+    raw_sources = list(raw_sources)
+    source_strs = [str(raw_source).lower().strip() if raw_source else "" for raw_source in raw_sources]
+    categories = TRAFFIC_SOURCE_MATCHER.classify(source_strs)
+    
+    # Unmatched sources are returned as a cleaned version
+    return [
+        "Unknown" if not raw_source else category if category is not None else source_str.title()
+        for raw_source, source_str, category in zip(raw_sources, source_strs, categories)
+    ]
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
 def normalize_traffic_source(raw_source):
     """Normalize traffic source to standard categories"""
-    if not raw_source:
-        return "Unknown"
-    
-    source_str = str(raw_source).lower().strip()
-    
-    # Check for exact matches in categories
-    for key, category in TRAFFIC_SOURCE_CATEGORIES.items():
-        if key in source_str:
-            return category
-    
-    # Check for partial matches
-    if "google" in source_str:
-        return "Google"
-    elif "facebook" in source_str or "fb" in source_str:
-        return "Facebook"
-    elif "linkedin" in source_str:
-        return "LinkedIn"
-    elif "instagram" in source_str or "ig" in source_str:
-        return "Instagram"
-    elif "twitter" in source_str or "x.com" in source_str:
-        return "Twitter"
-    elif "email" in source_str or "mail" in source_str:
-        return "Email"
-    elif "direct" in source_str:
-        return "Direct Traffic"
-    elif "organic" in source_str:
-        return "Organic Search"
-    elif "referral" in source_str:
-        return "Referral"
-    elif "search" in source_str:
-        return "Search"
-    elif "social" in source_str:
-        return "Social Media"
-    
-    # Return cleaned version
-    return source_str.title()
+    return normalize_traffic_sources([raw_source])[0]
+
+def map_prospect_reasons(reasons):
+    """Map a sequence of prospect reasons with aggressive cleaning, with one matcher pass."""
+    reasons = list(reasons)
+    reason_strs = [str(reason).strip().lower() if reason else "" for reason in reasons]
+    partial_matches = PROSPECT_REASON_MATCHER.classify(reason_strs)
+    
+    mapped = []
+    for reason, reason_str, partial_match in zip(reasons, reason_strs, partial_matches):
+        if not reason:
+            mapped.append("")
+        elif reason_str in PROSPECT_REASON_MAP:
+            mapped.append(PROSPECT_REASON_MAP[reason_str])
+        elif partial_match is not None:
+            mapped.append(partial_match)
+        else:
+            # Clean up special characters and format
+            mapped.append(reason_str.replace("_", " ").replace("-", " ").title())
+    return mapped
 
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
 def map_prospect_reason(reason):
     """Map prospect reason with aggressive cleaning"""
-    if not reason:
-        return ""
-    
-    reason_str = str(reason).strip().lower()
-    
-    # First, check exact match
-    if reason_str in PROSPECT_REASON_MAP:
-        return PROSPECT_REASON_MAP[reason_str]
-    
-    # Check for partial matches
-    for key, value in PROSPECT_REASON_MAP.items():
-        if key in reason_str:
-            return value
+    return map_prospect_reasons([reason])[0]
+
+@lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def get_sub_lead_status_override(sub_lead_status):
+    """Lead status forced by a sub lead status (e.g. "Not answering" -> Not Connected), or None."""
+    if not sub_lead_status:
+        return None
     
-    # Clean up special characters and format
-    cleaned = reason_str.replace("_", " ").replace("-", " ").title()
-    return cleaned
+    return SUB_LEAD_STATUS_OVERRIDE_LOOKUP.get(str(sub_lead_status).strip().lower())
+
+def get_property_column(raw_properties, key, size):
+    """Raw property values as an object array, "" where a contact lacks the key (like properties.get(key, ""))."""
+    if key not in raw_properties.columns:
+        return np.full(size, "", dtype=object)
+    
+    values = raw_properties[key].to_numpy(dtype=object, copy=True)
+    # Missing keys come back as NaN; HubSpot itself only sends strings or null
+    values[values != values] = ""
+    return values
+
+def coalesce_columns(*columns):
+    """Column-wise `a or b or c`: the first truthy value per row, else the last column's value."""
+    result = columns[-1]
+    for values in reversed(columns[:-1]):
+        result = np.where(values.astype(bool), values, result)
+    return result
+
+def classify_distinct_values(values, classify):
+    """Like map_distinct_values, but hands all distinct values to a column classifier in one call."""
+    codes, uniques = pd.factorize(values)
+    lookup = np.array(classify(list(uniques) + [None]), dtype=object)
+    return lookup[codes]
+
+def map_distinct_values(values, func):
+    """
+    Apply a scalar function to a column, calling it once per distinct value.
+    Rows are factorized into codes and the per-value results are broadcast back with one take.
+    """
+    codes, uniques = pd.factorize(values)
+    # Nulls get code -1, which picks the trailing func(None)
+    lookup = np.array([func(value) for value in uniques] + [func(None)], dtype=object)
+    return lookup[codes]
+
+def parse_property_column(values, pattern, convert, parse_value):
+    """
+    Column-wise `parse_value(value) if value else value`.
+    Values fully matching `pattern` are converted in one go; anything else falls back to parse_value.
+    """
+    truthy = values.astype(bool)
+    candidates = pd.Series(values[truthy], dtype=object)
+    text = candidates.astype("str")
+    fast = text.str.fullmatch(pattern).to_numpy(dtype=bool)
+    converted = convert(text[fast])
+    
+    if fast.all() and truthy.all():
+        return converted
+    
+    result = values.copy()
+    positions = np.flatnonzero(truthy)
+    result[positions[fast]] = pd.Series(converted).astype(object).to_numpy()
+    # Leftovers are mostly a handful of repeated junk values like "n/a"
+    result[positions[~fast]] = map_distinct_values(candidates[~fast].to_numpy(), parse_value)
+    return result
+
+def parse_money(value, default=None):
+    """Parse a money string like "$1,250.50"."""
+    try:
+        return float(str(value).replace('$', '').replace(',', ''))
+    except:
+        return default
+
+def parse_count(value):
+    """Parse an integer count."""
+    try:
+        return int(value)
+    except:
+        return None
+
+def convert_epoch_ms(text):
+    """Column-wise parse of digit-only epoch-milliseconds strings."""
+    return text.astype("int64").to_numpy().astype("datetime64[ms]")
+
+def parse_contact_dates(values):
+    """
+    A HubSpot date property column as naive UTC datetime64[ms]. The search API sends ISO-8601 strings,
+    older exports and fixtures epoch milliseconds; empty or unparsed values become NaT.
+    """
+    text = pd.Series(values, dtype=object).astype("str")
+    epoch = text.str.fullmatch(r"[0-9]{1,15}").to_numpy(dtype=bool)
+    dates = to_utc_datetimes(text.where(~epoch)).to_numpy(dtype="datetime64[ms]")
+    dates[epoch] = convert_epoch_ms(text[epoch])
+    return dates
+
+def convert_money(text):
+    """Column-wise parse_money for plain "$1,250.50"-style strings."""
+    return text.str.replace(r"[$,]", "", regex=True).astype("float64").to_numpy()
+
+def convert_count(text):
+    """Column-wise parse_count for digit-only strings."""
+    return text.astype("int64").to_numpy()
 
 def process_contacts_data(contacts):
     """Process raw contacts data into a clean DataFrame with correct normalization."""
     if not contacts:
         return pd.DataFrame()
     
-    processed_data = []
-    
-    for contact in contacts:
-        properties = contact.get("properties", {})
+    size = len(contacts)
+    raw_properties = pd.DataFrame([contact.get("properties", {}) for contact in contacts], dtype=object)
+    
+    def prop(key):
+        return get_property_column(raw_properties, key, size)
+    
+    empty = np.full(size, "", dtype=object)
+    
+    # Dates always come out as datetimes, so the store, cube and delta sync can compare them
+    created_date = parse_contact_dates(prop("createdate"))
+    last_modified = parse_contact_dates(prop("lastmodifieddate"))
+    
+    # Parse revenue, employee count and amount (Qualified Lead Revenue)
+    money_pattern = r"\$?[0-9][0-9,]*(?:\.[0-9]+)?"
+    annual_revenue = parse_property_column(prop("annualrevenue"), money_pattern, convert_money, parse_money)
+    employee_count = parse_property_column(prop("numemployees"), r"[0-9]{1,18}", convert_count, parse_count)
+    amount_raw = prop("amount")
+    amount = parse_property_column(amount_raw, money_pattern, convert_money, lambda value: parse_money(value, 0.0))
+    amount = np.where(amount_raw.astype(bool), amount, 0.0).astype("float64")
+    
+    # Extract COURSE/PROGRAM information
+    course_info = coalesce_columns(*[prop(field) for field in CONTACT_COURSE_FIELDS], empty)
+    
+    # 🔥 ULTIMATE FIX: Normalize lead status
+    raw_lead_status = coalesce_columns(prop("hs_lead_status"), prop("lead_status"))
+    display_lead_status = map_distinct_values(raw_lead_status, normalize_lead_status)
+    
+    sub_lead_status = coalesce_columns(prop("sub_lead_status"), prop("hs_sub_lead_status"))
+    
+    # 🔥 SUB LEAD STATUS OVERRIDE
+    # Fix: "Cold" shouldn't have sub-statuses like "Not answering". Group them appropriately.
+    override_status = map_distinct_values(sub_lead_status, get_sub_lead_status_override)
+    display_lead_status = np.where(pd.notna(override_status), override_status, display_lead_status)
+    
+    # 🔥 COMPLETE HIERARCHY: Extract Campaign & Traffic Source data
+    traffic_source = prop("hs_analytics_source")
+    campaign_name = coalesce_columns(prop("hs_analytics_source_data_1"), prop("hs_campaign_name"))
+    
+    # 🔥 NEW: Drill-Down 2 (Ad/Keyword/Placement)
+    campaign_drilldown_2 = prop("hs_analytics_source_data_2")
+    
+    first_name = prop("firstname")
+    last_name = prop("lastname")
+    email = prop("email")
+    phone = prop("phone")
+    
+    df = pd.DataFrame({
+        "ID": np.array([contact.get("id", "") for contact in contacts], dtype=object),
+        "First Name": first_name,
+        "Last Name": last_name,
+        "Full Name": np.array([f"{first} {last}".strip() for first, last in zip(first_name, last_name)], dtype=object),
+        "Email": email,
+        "Phone": phone,
+        "Mobile Phone": prop("mobilephone"),
+        "Company": prop("company"),
+        "Job Title": prop("jobtitle"),
         
-        # Format dates if they exist
-        created_date = properties.get("createdate", "")
-        if created_date:
-            try:
-                created_date = pd.to_datetime(int(created_date), unit='ms')
-            except:
-                pass
+        # COURSE/PROGRAM INFORMATION
+        "Course/Program": course_info,
         
-        last_modified = properties.get("lastmodifieddate", "")
-        if last_modified:
-            try:
-                last_modified = pd.to_datetime(int(last_modified), unit='ms')
-            except:
-                pass
+        # 🔥 NORMALIZED LEAD STATUS (CORRECT!)
+        "Lead Status": display_lead_status,
+        "Sub Lead Status": sub_lead_status,
+        "Lifecycle Stage": prop("lifecyclestage"),
         
-        # Parse revenue if exists
-        annual_revenue = properties.get("annualrevenue", "")
-        if annual_revenue:
-            try:
-                annual_revenue = str(annual_revenue).replace('$', '').replace(',', '')
-                annual_revenue = float(annual_revenue)
-            except:
-                annual_revenue = None
-        
-        # Parse employee count
-        employee_count = properties.get("numemployees", "")
-        if employee_count:
-            try:
-                employee_count = int(employee_count)
-            except:
-                employee_count = None
-                
-        # Parse amount (Qualified Lead Revenue)
-        amount = properties.get("amount", "")
-        if amount:
-            try:
-                amount = str(amount).replace('$', '').replace(',', '')
-                amount = float(amount)
-            except:
-                amount = 0.0
-        else:
-            amount = 0.0
-        
-        # Extract COURSE/PROGRAM information
-        course_info = ""
-        course_priority_fields = [
-            "course", "program", "product", "service", "offering",
-            "course_name", "program_name", "product_name",
-            "enquired_course", "interested_course", "course_interested",
-            "program_of_interest", "course_of_interest", "product_of_interest",
-            "service_of_interest", "training_program", "educational_program",
-            "learning_program", "certification_program"
-        ]
+        # 🔥 COMPLETE HIERARCHY: CAMPAIGN & TRAFFIC SOURCE DATA
+        "Traffic Source": classify_distinct_values(traffic_source, normalize_traffic_sources),
+        "Traffic Source Raw": traffic_source,
+        "Campaign Name": campaign_name,
+        "Campaign Drilldown 2": campaign_drilldown_2,  # 🔥 NEW
+        "UTM Source": prop("hs_utm_source"),
+        "UTM Medium": prop("hs_utm_medium"),
+        "UTM Campaign": prop("hs_utm_campaign"),
         
-        for field in course_priority_fields:
-            if field in properties and properties[field]:
-                course_info = properties[field]
-                break
+        # 🔥 NORMALIZED PROSPECT REASONS (CORRECT!)
+        "Future Prospect Reasons": classify_distinct_values(
+            coalesce_columns(prop("future_prospect_reasons"), prop("future_prospect_reason")), map_prospect_reasons
+        ),
+        "Hot Prospect Reason": classify_distinct_values(prop("hot_prospect_reason"), map_prospect_reasons),
+        "Neutral Prospect Reasons": classify_distinct_values(prop("neutral_prospect_reasons"), map_prospect_reasons),
+        "Not Connected Reasons": classify_distinct_values(prop("not_connected_reasons"), map_prospect_reasons),
+        "Not Interested Reasons": classify_distinct_values(prop("not_interested_reasons"), map_prospect_reasons),
+        "Other Enquiry Reasons": classify_distinct_values(prop("other_enquiry_reasons"), map_prospect_reasons),
+        "Prospect Reasons": classify_distinct_values(prop("prospect_reasons"), map_prospect_reasons),
         
-        # 🔥 ULTIMATE FIX: Normalize lead status
-        raw_lead_status = properties.get("hs_lead_status", "") or properties.get("lead_status", "")
-        display_lead_status = normalize_lead_status(raw_lead_status)
+        # Additional reason fields
+        "Contact Reason": classify_distinct_values(prop("contact_reason"), map_prospect_reasons),
+        "Reason for Contact": classify_distinct_values(prop("reason_for_contact"), map_prospect_reasons),
+        "Enquiry Reason": classify_distinct_values(prop("enquiry_reason"), map_prospect_reasons),
+        "Disqualification Reason": classify_distinct_values(prop("disqualification_reason"), map_prospect_reasons),
+        "Conversion Reason": classify_distinct_values(prop("conversion_reason"), map_prospect_reasons),
         
-        sub_lead_status = properties.get("sub_lead_status", "") or properties.get("hs_sub_lead_status", "")
+        # Other contact info
+        "Country": prop("country"),
+        "State": prop("state"),
+        "City": prop("city"),
+        "Industry": prop("industry"),
+        "Annual Revenue": annual_revenue,
+        "Revenue": amount,
+        "Employee Count": employee_count,
+        "Website": prop("website"),
+        "Owner ID": prop("hubspot_owner_id"),
+        "Created Date": created_date,
+        "Last Modified Date": last_modified,
+        "Has Email": email.astype(bool).astype("int64"),
+        "Has Phone": phone.astype(bool).astype("int64"),
+        "Has Course": course_info.astype(bool).astype("int64"),
+        "Has Traffic Source": traffic_source.astype(bool).astype("int64"),
+        "Has Campaign": campaign_name.astype(bool).astype("int64"),
+        "Has Drilldown 2": campaign_drilldown_2.astype(bool).astype("int64"),  # 🔥 NEW
         
-        # 🔥 SUB LEAD STATUS OVERRIDE
-        # Fix: "Cold" shouldn't have sub-statuses like "Not answering". Group them appropriately.
-        if sub_lead_status:
-            sls_clean = str(sub_lead_status).strip()
-            sls_lower = sls_clean.lower()
-            
-            if sls_lower in ["not answering", "call back request", "disconnected by user", "out of coverage", "user busy"]:
-                display_lead_status = "Not Connected (NC)"
-            elif sls_lower in ["casual enquiry", "not interested", "other reasons", "future prospect"]:
-                display_lead_status = "Not Interested"
-            elif sls_lower in ["connected unknowingly", "hr calls", "wrong course enquiry"]:
-                display_lead_status = "Not Qualified"
-        
-        # 🔥 COMPLETE HIERARCHY: Extract Campaign & Traffic Source data
-        traffic_source = properties.get("hs_analytics_source", "")
-        campaign_name = properties.get("hs_analytics_source_data_1", "") or properties.get("hs_campaign_name", "")
-        
-        # 🔥 NEW: Drill-Down 2 (Ad/Keyword/Placement)
-        campaign_drilldown_2 = properties.get("hs_analytics_source_data_2", "")
-        
-        # Normalize traffic source
-        normalized_traffic_source = normalize_traffic_source(traffic_source)
-        
-        # Process each contact
-        processed_data.append({
-            "ID": contact.get("id", ""),
-            "First Name": properties.get("firstname", ""),
-            "Last Name": properties.get("lastname", ""),
-            "Full Name": f"{properties.get('firstname', '')} {properties.get('lastname', '')}".strip(),
-            "Email": properties.get("email", ""),
-            "Phone": properties.get("phone", ""),
-            "Mobile Phone": properties.get("mobilephone", ""),
-            "Company": properties.get("company", ""),
-            "Job Title": properties.get("jobtitle", ""),
-            
-            # COURSE/PROGRAM INFORMATION
-            "Course/Program": course_info,
-            
-            # 🔥 NORMALIZED LEAD STATUS (CORRECT!)
-            "Lead Status": display_lead_status,
-            "Sub Lead Status": sub_lead_status,
-            "Lifecycle Stage": properties.get("lifecyclestage", ""),
-            
-            # 🔥 COMPLETE HIERARCHY: CAMPAIGN & TRAFFIC SOURCE DATA
-            "Traffic Source": normalized_traffic_source,
-            "Traffic Source Raw": traffic_source,
-            "Campaign Name": campaign_name,
-            "Campaign Drilldown 2": campaign_drilldown_2,  # 🔥 NEW
-            "UTM Source": properties.get("hs_utm_source", ""),
-            "UTM Medium": properties.get("hs_utm_medium", ""),
-            "UTM Campaign": properties.get("hs_utm_campaign", ""),
-            
-            # 🔥 NORMALIZED PROSPECT REASONS (CORRECT!)
-            "Future Prospect Reasons": map_prospect_reason(properties.get("future_prospect_reasons", "") or properties.get("future_prospect_reason", "")),
-            "Hot Prospect Reason": map_prospect_reason(properties.get("hot_prospect_reason", "")),
-            "Neutral Prospect Reasons": map_prospect_reason(properties.get("neutral_prospect_reasons", "")),
-            "Not Connected Reasons": map_prospect_reason(properties.get("not_connected_reasons", "")),
-            "Not Interested Reasons": map_prospect_reason(properties.get("not_interested_reasons", "")),
-            "Other Enquiry Reasons": map_prospect_reason(properties.get("other_enquiry_reasons", "")),
-            "Prospect Reasons": map_prospect_reason(properties.get("prospect_reasons", "")),
+        # 🔥 STORE RAW VALUE FOR DEBUGGING
+        "Lead Status Raw": raw_lead_status
+    })
+    
+    # Mixed object columns (e.g. floats and None) get the dtype the row-wise build used to infer
+    return df.infer_objects()
+
+def get_frame_memory(df):
+    """Deep memory footprint of a DataFrame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+def compact_contacts_frame(df):
+    """
+    🗜️ Compact schema for a processed contacts frame: low-cardinality text becomes categorical, other text
+    Arrow-backed strings and the Has * flags booleans. Values are unchanged; already compact frames are
+    returned as-is. The original footprint is kept in df.attrs["memory_before_compaction"].
+    """
+    if df.empty or df.attrs.get("compact_schema"):
+        return df
+    
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in CONTACT_FLAG_COLUMNS:
+            values = values.astype(bool)
+        elif isinstance(values.dtype, pd.StringDtype) or (
+            values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == "string"
+        ):
+            if values.nunique() <= COMPACT_CATEGORY_MAX_RATIO * len(values):
+                values = values.astype("category")
+            elif values.dtype == object and COMPACT_TEXT_DTYPE is not None:
+                values = values.astype(COMPACT_TEXT_DTYPE)
+        columns[column] = values
+    
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs.update(df.attrs, compact_schema=True, memory_before_compaction=get_frame_memory(df))
+    return compact
+
+def clean_text_column(values):
+    """Series as stripped text with missing values as "" (categoricals get "" added as a category first)."""
+    if isinstance(values.dtype, pd.CategoricalDtype) and "" not in values.cat.categories:
+        values = values.cat.add_categories("")
+    return values.fillna('').astype(str).str.strip()
+
+def strip_text_column(values):
+    """Series with surrounding whitespace stripped (missing values stay missing)."""
+    return values.str.strip()
+
+def get_function_name(func):
+    """Stable cache-key stand-in for a module-level function (None stays None)."""
+    return None if func is None else func.__qualname__
+
+def combine_codes(code_arrays, sizes):
+    """
+    One int64 id per row for several code arrays (0 <= code < size) that sorts like the code tuples;
+    ids are re-densified whenever the next level would overflow.
+    """
+    combined = np.zeros(len(code_arrays[0]), dtype=np.int64)
+    for codes, size in zip(code_arrays, sizes):
+        if combined.size and (int(combined.max()) + 1) * size >= 2 ** 62:
+            combined = np.unique(combined, return_inverse=True)[1].astype(np.int64).ravel()
+        combined = combined * size + codes
+    return combined
+
+def count_groups(keys, names, mask=None, weights=None):
+    """
+    groupby(names).size() for factorized (codes, distinct values) keys: a Series sorted by key, rows
+    with a missing key skipped. With `weights`, sums those per row instead of counting rows.
+    """
+    selected = np.ones(len(keys[0][0]), dtype=bool) if mask is None else mask.copy()
+    for codes, _ in keys:
+        selected &= codes >= 0
+    rows = np.flatnonzero(selected)
+    if weights is not None:
+        result_dtype = np.int64 if weights.dtype.kind in "biu" else np.float64
+        weights = weights[rows]
+    else:
+        result_dtype = np.int64
+    
+    # Rank each key's distinct values so that group ids sort like the values themselves
+    ranks = []
+    sorted_values = []
+    for codes, uniques in keys:
+        order = uniques.argsort()
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[order] = np.arange(len(uniques))
+        ranks.append(rank[codes[rows]])
+        sorted_values.append(uniques.take(order))
+    sizes = [len(values) for values in sorted_values]
+    combined = combine_codes(ranks, sizes)
+    
+    group_space = int(np.prod(sizes, dtype=object))
+    if group_space <= len(rows):
+        # Dense ids: one bincount over every possible combination
+        present = np.flatnonzero(np.bincount(combined, minlength=group_space))
+        totals = np.bincount(combined, weights=weights, minlength=group_space)[present]
+        levels = []
+        for values, size in zip(reversed(sorted_values), reversed(sizes)):
+            levels.insert(0, values.take(present % size))
+            present = present // size
+    else:
+        # Sparse ids: sort the combined ids
+        groups, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=weights, minlength=len(groups))
+        levels = [values.take(rank[first]) for rank, values in zip(ranks, sorted_values)]
+    
+    levels = [level.rename(name) for level, name in zip(levels, names)]
+    index = levels[0] if len(levels) == 1 else pd.MultiIndex.from_arrays(levels)
+    return pd.Series(totals.astype(result_dtype), index=index)
+
+def append_distinct_values(uniques, values):
+    """
+    Distinct values of a key with `values` appended, keeping their Index dtype and name (Index.append
+    infers the dtype anew, which turns object keys of strings into str ones unlike a full factorize).
+    """
+    return uniques.append(pd.Index(values, name=uniques.name)).astype(uniques.dtype, copy=False)
+
+class ContactAggregator:
+    """
+    🔥 SHARED-KEY AGGREGATION ENGINE
+    Every column used as a group-by key is factorized once into integer codes plus its distinct
+    values; distributions, group sizes and pivots are then bincounts over those codes instead of
+    separate scans of the frame. Cleaning (strip, fillna) runs on the distinct values only and the
+    contacts frame is never modified. One aggregator belongs to one loaded dataset, so it also
+    caches the tables derived from it, and can be carried over to a re-read of the dataset (apply_delta).
+    """
+    
+    def __init__(self, df):
+        self.df = df
+        self.keys = {}
+        self.clean_maps = {}  # Cleaned key -> (clean, cleaned code of each raw distinct value, missing values last)
+        self.results = {}  # Derived tables (e.g. status pivots) for this dataset, by spec
+    
+    def key(self, column, clean=None):
+        """(codes, distinct values) for a column, optionally cleaned per distinct value with `clean`."""
+        # Functions are cached by name: every Streamlit rerun executes the script, and so defines them, anew
+        cache_key = (column, get_function_name(clean))
+        if cache_key not in self.keys:
+            if clean is None:
+                values = self.df[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    # Compact frames already carry codes; unused categories simply never count
+                    codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+                else:
+                    codes, uniques = values.factorize()
+            else:
+                codes, uniques = self.key(column)
+                # The extra trailing entry stands in for missing values (code -1)
+                distinct = clean(pd.Series(uniques).reindex(range(len(uniques) + 1)))
+                distinct_codes, uniques = distinct.factorize()
+                self.clean_maps[cache_key] = (clean, distinct_codes)
+                codes = distinct_codes[codes]
+            # Smallest signed integer type keeps the codes cheap to hold on to with the session
+            codes = codes.astype(np.min_scalar_type(-len(uniques) - 1), copy=False)
+            self.keys[cache_key] = (codes, pd.Index(uniques, name=column))
+        return self.keys[cache_key]
+    
+    def apply_delta(self, df, delta):
+        """
+        Aggregator for `df`, a re-read of this dataset (see diff_contacts). Unchanged contacts keep their
+        codes; only added or updated contacts are looked up, and values never seen before are appended
+        after the existing distinct values, so just those get cleaned. Derived tables are rebuilt lazily.
+        """
+        patched = ContactAggregator(df)
+        row_map, added = delta['row_map'], delta['added']
+        kept = np.flatnonzero(row_map >= 0)
+        keys = list(self.keys.items())
+        
+        for (column, clean_name), (codes, uniques) in keys:
+            if clean_name is not None:
+                continue
+            values = df[column].take(added)
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(values.cat.categories.dtype)
+            added_codes = uniques.get_indexer(pd.Index(values))
+            unseen = (added_codes < 0) & values.notna().to_numpy()
+            if unseen.any():
+                unseen_codes, unseen_values = values[unseen].factorize()
+                added_codes[unseen] = unseen_codes + len(uniques)
+                uniques = append_distinct_values(uniques, unseen_values)
             
-            # Additional reason fields
-            "Contact Reason": map_prospect_reason(properties.get("contact_reason", "")),
-            "Reason for Contact": map_prospect_reason(properties.get("reason_for_contact", "")),
-            "Enquiry Reason": map_prospect_reason(properties.get("enquiry_reason", "")),
-            "Disqualification Reason": map_prospect_reason(properties.get("disqualification_reason", "")),
-            "Conversion Reason": map_prospect_reason(properties.get("conversion_reason", "")),
+            patched_codes = np.empty(len(df), dtype=np.min_scalar_type(-len(uniques) - 1))
+            patched_codes[kept] = codes[row_map[kept]]
+            patched_codes[added] = added_codes
+            patched.keys[(column, None)] = (patched_codes, uniques)
+        
+        for (column, clean_name), (_, uniques) in keys:
+            if clean_name is None:
+                continue
+            raw_codes, raw_uniques = patched.key(column)
+            clean, clean_map = self.clean_maps[(column, clean_name)]
+            known = len(clean_map) - 1
             
-            # Other contact info
-            "Country": properties.get("country", ""),
-            "State": properties.get("state", ""),
-            "City": properties.get("city", ""),
-            "Industry": properties.get("industry", ""),
-            "Annual Revenue": annual_revenue,
-            "Revenue": amount,
-            "Employee Count": employee_count,
-            "Website": properties.get("website", ""),
-            "Owner ID": properties.get("hubspot_owner_id", ""),
-            "Created Date": created_date,
-            "Last Modified Date": last_modified,
-            "Has Email": 1 if properties.get("email") else 0,
-            "Has Phone": 1 if properties.get("phone") else 0,
-            "Has Course": 1 if course_info else 0,
-            "Has Traffic Source": 1 if traffic_source else 0,
-            "Has Campaign": 1 if campaign_name else 0,
-            "Has Drilldown 2": 1 if campaign_drilldown_2 else 0,  # 🔥 NEW
+            # Raw values only ever get appended, so the old map stays valid up to its missing-value slot
+            appended = clean(pd.Series(raw_uniques[known:]))
+            appended_codes = uniques.get_indexer(pd.Index(appended))
+            unseen = (appended_codes < 0) & appended.notna().to_numpy()
+            if unseen.any():
+                unseen_codes, unseen_values = appended[unseen].factorize()
+                appended_codes[unseen] = unseen_codes + len(uniques)
+                uniques = append_distinct_values(uniques, unseen_values)
+            clean_map = np.concatenate([clean_map[:known], appended_codes, clean_map[known:]])
             
-            # 🔥 STORE RAW VALUE FOR DEBUGGING
-            "Lead Status Raw": raw_lead_status
-        })
-    
-    df = pd.DataFrame(processed_data)
+            patched.clean_maps[(column, clean_name)] = (clean, clean_map)
+            codes = clean_map[raw_codes].astype(np.min_scalar_type(-len(uniques) - 1), copy=False)
+            patched.keys[(column, clean_name)] = (codes, uniques)
+        
+        return patched
+    
+    def where(self, key, exclude=()):
+        """Row mask for a key that is present and not one of `exclude`."""
+        codes, uniques = key
+        keep = np.append(~uniques.isin(list(exclude)), False)
+        return keep[codes]
+    
+    def value_counts(self, key, mask=None):
+        """value_counts() of a key over the masked rows (first-seen order for equal counts)."""
+        codes, uniques = key
+        if mask is not None:
+            codes = codes[mask]
+        codes = codes[codes >= 0]
+        counts = np.bincount(codes, minlength=len(uniques))
+        order = pd.unique(codes)
+        result = pd.Series(counts[order], index=uniques.take(order), name='count')
+        return result.sort_values(ascending=False, kind="stable")
+    
+    def group_sizes(self, keys, names, mask=None, values=None):
+        """
+        groupby(names).size() over the masked rows as a Series sorted by key; with `values`, counts
+        the non-null entries of that column per group instead (groupby(names)[values].count()).
+        """
+        weights = None
+        if values is not None and self.df[values].hasnans:
+            weights = self.df[values].notna().to_numpy()
+        return count_groups(keys, names, mask, weights)
+    
+    def pivot_counts(self, index_keys, index_names, column_key, column_name, values, mask=None):
+        """pivot_table(index, columns, values, aggfunc='count', fill_value=0) over the masked rows."""
+        sizes = self.group_sizes(index_keys + [column_key], index_names + [column_name], mask, values)
+        return sizes.unstack(column_name, fill_value=0)
+    
+    def monthly_counts(self, column):
+        """Row count per calendar month of a datetime column, in month order (missing dates skipped)."""
+        months = self.df[column].dt.to_period('M').array.asi8
+        months = months[months != pd.NaT.value]
+        if months.size == 0:
+            return pd.Series([], index=pd.PeriodIndex([], freq='M', name=column), dtype=np.int64)
+        first = months.min()
+        counts = np.bincount(months - first)
+        present = np.flatnonzero(counts)
+        index = pd.PeriodIndex.from_ordinals(present + first, freq='M', name=column)
+        return pd.Series(counts[present], index=index)
+
+def get_created_dates(df):
+    """'Created Date' as a datetime Series, with missing or unparsed values as NaT."""
+    if 'Created Date' not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ms]')
+    created = df['Created Date']
+    if not pd.api.types.is_datetime64_any_dtype(created):
+        created = to_utc_datetimes(created)
+    return created
+
+def get_created_days(created):
+    """Calendar day of each 'Created Date' value in a Series (missing or unparsed values as NaT)."""
+    return get_created_dates(created.to_frame('Created Date')).dt.floor('D')
+
+def filter_contacts(df, filters):
+    """Contacts whose columns hold one of the selected values ({column: values}; empty selections don't filter, missing never matches)."""
+    for column, values in filters.items():
+        if len(values) > 0:
+            df = df[df[column].isin(values) & df[column].notna()]
     return df
 
-def build_course_quality_table(df):
+def filtered_contacts_csv(df, filters, columns=None):
+    """CSV of the contacts matching `filters` (only `columns` if given), built when a download is clicked."""
+    rows = filter_contacts(df, filters)
+    return (rows if columns is None else rows[columns]).to_csv(index=False)
+
+class ContactCube:
     """
-    🎯 BUILD COURSE QUALITY TABLE (PIVOT STYLE)
-    Creates a matrix showing course-wise lead status distribution with quality metrics
+    🧊 PRE-AGGREGATED CONTACT CUBE
+    One cell per distinct combination of CONTACT_CUBE_DIMENSIONS, holding the contact count, revenue,
+    flag totals and the summed creation time of its contacts. Filtered views and KPIs slice and roll up
+    the cells, so they cost the number of cells rather than the number of contacts.
     """
-    # Keep only records with course info
-    df_with_course = df[df['Course/Program'].notna() & (df['Course/Program'] != '')].copy()
-    
-    if df_with_course.empty:
-        return pd.DataFrame()
-    
-    # Clean course names
-    df_with_course['Course_Clean'] = df_with_course['Course/Program'].str.strip()
-    
-    # Create pivot table: Course × Lead Status
-    pivot = pd.pivot_table(
-        df_with_course,
-        index='Course_Clean',
-        columns='Lead Status',
-        values='ID',
-        aggfunc='count',
-        fill_value=0
-    )
-    
-    # Reset index to make Course_Clean a column
-    pivot = pivot.reset_index()
-    
-    # Rename columns for consistency
-    pivot = pivot.rename(columns={'Course_Clean': 'Course/Program'})
     
-    # Define required columns from our funnel order
-    required_columns = ['Course/Program'] + [status for status in LEAD_STATUS_ORDER if status != 'Unknown'] + ['Unknown']
-    
-    # Add missing columns with 0 values
-    for col in required_columns:
-        if col not in pivot.columns:
-            pivot[col] = 0
-            
-    # Filter the required columns to only include those in the pivot
-    # to avoid KeyError if some funnel statuses don't appear in data
-    valid_cols = [col for col in required_columns if col in pivot.columns]
-    
-    # Reorder columns
-    pivot = pivot[valid_cols]
-    
-    # Calculate Quality Metrics
-    pivot['Low Quality Leads'] = pivot['Not Interested'] + pivot['Not Qualified']
-    pivot['Good Quality Leads'] = pivot['Cold'] + pivot['Warm'] + pivot['Hot']
-    
-    # Calculate Grand Total (sum of all lead status columns)
-    status_columns = [col for col in required_columns if col != 'Course/Program']
-    pivot['Grand Total'] = pivot[status_columns].sum(axis=1)
+    def __init__(self, df, aggregator=None):
+        aggregator = aggregator or ContactAggregator(df)
+        keys = self._dimension_keys(df, aggregator)
+        
+        # Missing values get their own slot so that every contact lands in a cell
+        combined = combine_codes(
+            [codes + 1 for codes, _ in keys.values()],
+            [len(uniques) + 1 for _, uniques in keys.values()]
+        )
+        _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        
+        self.df = df
+        self.members = {dimension: uniques for dimension, (_, uniques) in keys.items()}
+        self.codes = {dimension: codes[first] for dimension, (codes, _) in keys.items()}
+        self.first_row = first  # Position of each cell's first contact, for first-seen ordering
+        self.row_cells = inverse  # Cell of each contact, so that a re-read can be patched (apply_delta)
+        self.measures = {
+            measure: self._cell_totals(inverse, values, len(first))
+            for measure, values in self._contact_measures(df).items()
+        }
+    
+    @staticmethod
+    def _dimension_keys(df, aggregator):
+        """Factorized key of each dimension (Created Day from the creation dates; absent columns all missing)."""
+        keys = {}
+        for dimension in CONTACT_CUBE_DIMENSIONS:
+            column, clean = ('Created Date', get_created_days) if dimension == 'Created Day' else (dimension, None)
+            if column in df.columns:
+                codes, uniques = aggregator.key(column, clean)
+                keys[dimension] = (codes, uniques.rename(dimension))
+            else:
+                keys[dimension] = (np.full(len(df), -1, dtype=np.int64), pd.Index([], name=dimension))
+        return keys
+    
+    @staticmethod
+    def _contact_measures(df):
+        """Each measure per contact, as summed into the cells."""
+        measures = {'Contacts': np.ones(len(df), dtype=np.int64)}
+        if 'Revenue' in df.columns:
+            measures['Revenue'] = pd.to_numeric(df['Revenue'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        for column in CONTACT_FLAG_COLUMNS:
+            if column in df.columns:
+                measures[column] = df[column].to_numpy(dtype=bool).astype(np.int64)
+        created = get_created_dates(df)
+        created_seconds = created.to_numpy(dtype='datetime64[ms]').astype(np.int64) / 1000.0
+        created_seconds[created.isna().to_numpy()] = 0.0
+        measures['Created Seconds'] = created_seconds
+        return measures
+    
+    @staticmethod
+    def _cell_totals(cells, values, size):
+        totals = np.bincount(cells, weights=values, minlength=size)
+        return totals.astype(np.int64) if values.dtype.kind in "biu" else totals
+    
+    def apply_delta(self, df, delta, aggregator):
+        """
+        Cube for `df`, a re-read of this cube's contacts (see diff_contacts), given the aggregator carried
+        over to it: removed or updated contacts are subtracted from their cells and added or updated ones
+        summed in. New combinations become new cells and emptied cells are dropped.
+        """
+        row_map, added, removed = delta['row_map'], delta['added'], delta['removed']
+        keys = self._dimension_keys(df, aggregator)
+        
+        # Carried-over codes keep their numbering, so existing cells are found by their code tuples
+        cells = pd.MultiIndex.from_arrays([self.codes[dimension] for dimension in keys])
+        added_codes = [codes[added] for codes, _ in keys.values()]
+        added_cells = cells.get_indexer(pd.MultiIndex.from_arrays(added_codes))
+        unseen = added_cells < 0
+        cell_codes = dict(self.codes)
+        if unseen.any():
+            combinations, inverse = np.unique(
+                np.stack([codes[unseen] for codes in added_codes], axis=1), axis=0, return_inverse=True
+            )
+            added_cells[unseen] = len(cells) + inverse.ravel()
+            for i, dimension in enumerate(keys):
+                cell_codes[dimension] = np.concatenate([self.codes[dimension], combinations[:, i]])
+        size = len(cells) + (len(combinations) if unseen.any() else 0)
+        
+        removed_measures = self._contact_measures(self.df.take(removed))
+        added_measures = self._contact_measures(df.take(added))
+        measures = {}
+        for measure, totals in self.measures.items():
+            totals = np.concatenate([totals, np.zeros(size - len(totals), dtype=totals.dtype)])
+            totals -= self._cell_totals(self.row_cells[removed], removed_measures[measure], size)
+            totals += self._cell_totals(added_cells, added_measures[measure], size)
+            measures[measure] = totals
+        
+        kept = np.flatnonzero(row_map >= 0)
+        row_cells = np.empty(len(df), dtype=np.int64)
+        row_cells[kept] = self.row_cells[row_map[kept]]
+        row_cells[added] = added_cells
+        
+        # Renumber the occupied cells; positions moved, so first contacts are found again
+        occupied = measures['Contacts'] > 0
+        renumber = np.cumsum(occupied) - 1
+        row_cells = renumber[row_cells]
+        first_row = np.full(int(occupied.sum()), len(df), dtype=np.int64)
+        np.minimum.at(first_row, row_cells, np.arange(len(df)))
+        
+        cube = ContactCube.__new__(ContactCube)
+        cube.df = df
+        cube.members = {dimension: uniques for dimension, (_, uniques) in keys.items()}
+        cube.codes = {dimension: codes[occupied] for dimension, codes in cell_codes.items()}
+        cube.first_row = first_row
+        cube.row_cells = row_cells
+        cube.measures = {measure: totals[occupied] for measure, totals in measures.items()}
+        return cube
+    
+    def select(self, filters):
+        """Cell mask for {dimension: allowed values}; empty selections don't filter."""
+        mask = np.ones(len(self.first_row), dtype=bool)
+        for dimension, values in filters.items():
+            if len(values) > 0:
+                keep = np.append(self.members[dimension].isin(list(values)), False)
+                mask &= keep[self.codes[dimension]]
+        return mask
+    
+    def where(self, dimension, exclude=()):
+        """Cell mask for a dimension that is present and not one of `exclude`."""
+        keep = np.append(~self.members[dimension].isin(list(exclude)), False)
+        return keep[self.codes[dimension]]
+    
+    def total(self, measure='Contacts', mask=None):
+        """Sum of a measure over the selected cells."""
+        values = self.measures[measure]
+        return values.sum() if mask is None else values[mask].sum()
+    
+    def values(self, dimension, mask=None):
+        """Sorted distinct values of a dimension in the selected cells (missing values left out)."""
+        codes = self.codes[dimension] if mask is None else self.codes[dimension][mask]
+        return sorted(self.members[dimension].take(np.unique(codes[codes >= 0])))
+    
+    def value_counts(self, dimension, mask=None):
+        """value_counts() of a dimension over the contacts in the selected cells (first-seen order for ties)."""
+        codes, contacts, first_row = self.codes[dimension], self.measures['Contacts'], self.first_row
+        if mask is not None:
+            codes, contacts, first_row = codes[mask], contacts[mask], first_row[mask]
+        present = codes >= 0
+        codes, contacts, first_row = codes[present], contacts[present], first_row[present]
+        
+        members = self.members[dimension]
+        counts = np.bincount(codes, weights=contacts, minlength=len(members)).astype(np.int64)
+        first_seen = np.full(len(members), np.iinfo(np.int64).max)
+        np.minimum.at(first_seen, codes, first_row)
+        seen = np.flatnonzero(counts)
+        order = seen[np.argsort(first_seen[seen], kind="stable")]
+        result = pd.Series(counts[order], index=members.take(order), name='count')
+        return result.sort_values(ascending=False, kind="stable")
+    
+    def rollup(self, dimensions, measure='Contacts', mask=None):
+        """groupby(dimensions)[measure].sum() over the selected cells, sorted by key (missing values left out)."""
+        keys = [(self.codes[dimension], self.members[dimension]) for dimension in dimensions]
+        return count_groups(keys, dimensions, mask, self.measures[measure])
+    
+    def mean_created(self, mask=None):
+        """Average creation time of the contacts in the selected cells (NaT when none has a date)."""
+        dated = self.codes['Created Day'] >= 0
+        if mask is not None:
+            dated &= mask
+        contacts = self.measures['Contacts'][dated].sum()
+        if not contacts:
+            return pd.NaT
+        return pd.Timestamp(self.measures['Created Seconds'][dated].sum() / contacts, unit='s')
+
+# 🎯 STATUS PIVOT SPECS
+# Dimensions are (column, per-value cleaning, raw values that drop a contact or None to keep all).
+# Metrics are (column, source): a tuple of statuses is summed, None is the sum of every status
+# column, and a column name is turned into a percentage of the Grand Total.
+COURSE_PIVOT_DIMENSIONS = (
+    ('Course/Program', strip_text_column, ('',)),
+)
+CAMPAIGN_PIVOT_DIMENSIONS = (
+    ('Traffic Source', strip_text_column, ('Unknown',)),       # Level 1: Traffic Source
+    ('Campaign Name', strip_text_column, ('',)),               # Level 2: Campaign Name
+    ('Campaign Drilldown 2', clean_text_column, None),         # 🔥 Level 3: Drill-Down 2
+)
+COURSE_QUALITY_METRICS = (
+    ('Low Quality Leads', ('Not Interested', 'Not Qualified')),
+    ('Good Quality Leads', ('Cold', 'Warm', 'Hot')),
+    ('Grand Total', None),
+    ('Low Quality %', 'Low Quality Leads'),
+    ('Good Quality %', 'Good Quality Leads'),
+)
+CAMPAIGN_QUALITY_METRICS = (
+    ('Grand Total', None),
+    ('Quality Leads (Hot+Warm+Customer)', ('Hot', 'Warm', 'Customer')),
+    ('Disqualified Leads', ('Not Interested', 'Not Qualified')),
+    ('Quality Leads %', 'Quality Leads (Hot+Warm+Customer)'),
+    ('Disqualified %', 'Disqualified Leads'),
+)
+STATUS_BREAKDOWNS = {
+    "Course": COURSE_PIVOT_DIMENSIONS,
+    "Traffic Source → Campaign → Drill-Down 2": CAMPAIGN_PIVOT_DIMENSIONS,
+    "UTM Source → Medium → Campaign": (
+        ('UTM Source', strip_text_column, ('',)),
+        ('UTM Medium', clean_text_column, None),
+        ('UTM Campaign', clean_text_column, None),
+    ),
+    "Country → State → City": (
+        ('Country', strip_text_column, ('',)),
+        ('State', clean_text_column, None),
+        ('City', clean_text_column, None),
+    ),
+}
+
+def add_status_metrics(pivot, status_columns, metrics):
+    """Append the metric columns of a status pivot, computed from its status counts."""
+    for name, source in metrics:
+        if source is None:
+            pivot[name] = pivot[status_columns].sum(axis=1)
+        elif isinstance(source, str):
+            pivot[name] = (pivot[source] / pivot['Grand Total'] * 100).round(1)
+        else:
+            pivot[name] = pivot[list(source)].sum(axis=1)
+    return pivot
+
+def build_status_pivot(df, dimensions, metrics, sort_by, ascending=True, aggregator=None, subtotals=False):
+    """
+    🎯 N-LEVEL LEAD STATUS PIVOT
+    Contacts per combination of `dimensions` × Lead Status with every funnel status as a column,
+    followed by the `metrics`. With `subtotals`, every hierarchy level also gets rows summed from the
+    leaf counts (deeper dimensions left empty, 'Level' = number of fixed dimensions), in outline order.
+    Results are cached on the dataset's aggregator per spec.
+    """
+    aggregator = aggregator or ContactAggregator(df)
+    dimension_specs = tuple((column, get_function_name(clean), dropped) for column, clean, dropped in dimensions)
+    cache_key = ('status_pivot', dimension_specs, metrics, sort_by, ascending, subtotals)
+    if cache_key in aggregator.results:
+        return aggregator.results[cache_key]
+    
+    # Keep only records with data for the filtered dimensions
+    names = [column for column, _, _ in dimensions]
+    selected = np.ones(len(df), dtype=bool)
+    for column, _, exclude in dimensions:
+        if exclude is not None:
+            selected &= aggregator.where(aggregator.key(column), exclude)
+    
+    if not selected.any():
+        pivot = pd.DataFrame()
+    else:
+        # Count pivot: dimensions (cleaned per distinct value) × Lead Status
+        pivot = aggregator.pivot_counts(
+            [aggregator.key(column, clean) for column, clean, _ in dimensions],
+            names,
+            aggregator.key('Lead Status'),
+            'Lead Status',
+            values='ID',
+            mask=selected
+        ).reset_index()
+        
+        # Every funnel status becomes a column, in funnel order (missing ones as 0)
+        status_columns = [status for status in LEAD_STATUS_ORDER if status != 'Unknown'] + ['Unknown']
+        for col in status_columns:
+            if col not in pivot.columns:
+                pivot[col] = 0
+        pivot = add_status_metrics(pivot[names + status_columns], status_columns, metrics)
+        
+        if subtotals:
+            # Subtotal rows from the additive leaf counts, so their rates are exact
+            levels = [pivot.assign(Level=len(names))]
+            for depth in range(len(names)):
+                if depth == 0:
+                    totals = pivot[status_columns].sum().to_frame().T
+                else:
+                    totals = pivot.groupby(names[:depth], sort=False)[status_columns].sum().reset_index()
+                levels.append(add_status_metrics(totals, status_columns, metrics).assign(Level=depth))
+            pivot = pd.concat(levels, ignore_index=True)[['Level'] + names + status_columns + [name for name, _ in metrics]]
+            pivot = pivot.sort_values(names, na_position='first', kind='stable', ignore_index=True)
+        else:
+            pivot = pivot.sort_values(list(sort_by) if isinstance(sort_by, tuple) else sort_by,
+                                      ascending=list(ascending) if isinstance(ascending, tuple) else ascending)
     
-    # Calculate percentages
-    pivot['Low Quality %'] = (pivot['Low Quality Leads'] / pivot['Grand Total'] * 100).round(1)
-    pivot['Good Quality %'] = (pivot['Good Quality Leads'] / pivot['Grand Total'] * 100).round(1)
+    aggregator.results[cache_key] = pivot
+    return pivot
+
+CAMPAIGN_ROLLUP_MEASURES = ['Grand Total', 'Quality Leads (Hot+Warm+Customer)', 'Disqualified Leads']
+
+class CampaignRollupTree:
+    """
+    🌳 CAMPAIGN HIERARCHY ROLLUP TREE
+    Traffic Source → Campaign → Drill-Down 2 as a tree whose nodes hold additive counts (leads, quality
+    leads, disqualified leads) for their whole subtree, taken from the status pivot subtotals. A rollup
+    reads whole subtrees wherever no deeper filter applies, so any level and filter combination costs
+    O(nodes), and rates are recomputed from the summed counts instead of averaging path percentages.
+    """
     
+    def __init__(self, subtotal_pivot, dimensions):
+        self.dimensions = list(dimensions)
+        self.nodes = {}  # Path prefix -> subtree counts
+        self.children = {}  # Path prefix -> child paths
+        if subtotal_pivot.empty:
+            return
+        
+        paths = subtotal_pivot[self.dimensions].to_numpy(dtype=object)
+        counts = subtotal_pivot[CAMPAIGN_ROLLUP_MEASURES].to_numpy()
+        for level, path_values, node_counts in zip(subtotal_pivot['Level'], paths, counts):
+            path = tuple(path_values[:level])
+            self.nodes[path] = node_counts
+            if level > 0:
+                self.children.setdefault(path[:-1], []).append(path)
+    
+    def rollup(self, level, filters=()):
+        """
+        Counts with exact Quality Leads % / Disqualified % per value of hierarchy dimension `level`,
+        over the paths passing `filters` (selected values per level; an empty selection keeps all).
+        """
+        filters = [set(selected) for selected in filters]
+        filters += [set()] * (len(self.dimensions) - len(filters))
+        
+        totals = {}
+        stack = [()] if () in self.nodes else []
+        while stack:
+            path = stack.pop()
+            depth = len(path)
+            if depth > level and not any(filters[depth:]):
+                # No filter below this node: its precomputed subtotal covers the whole subtree
+                totals[path[level]] = totals.get(path[level], 0) + self.nodes[path]
+                continue
+            for child in self.children.get(path, []):
+                if not filters[depth] or child[-1] in filters[depth]:
+                    stack.append(child)
+        
+        keys = sorted(totals)
+        rollup = pd.DataFrame(
+            np.array([totals[key] for key in keys], dtype=np.int64).reshape(-1, len(CAMPAIGN_ROLLUP_MEASURES)),
+            index=pd.Index(keys, name=self.dimensions[level]),
+            columns=CAMPAIGN_ROLLUP_MEASURES
+        )
+        rollup['Quality Leads %'] = (rollup['Quality Leads (Hot+Warm+Customer)'] / rollup['Grand Total'] * 100).round(1)
+        rollup['Disqualified %'] = (rollup['Disqualified Leads'] / rollup['Grand Total'] * 100).round(1)
+        return rollup
+
+def build_campaign_rollup_tree(df, aggregator=None):
+    """Campaign hierarchy rollup tree for a dataset (cached on its aggregator)."""
+    aggregator = aggregator or ContactAggregator(df)
+    if 'campaign_rollup_tree' not in aggregator.results:
+        names = tuple(column for column, _, _ in CAMPAIGN_PIVOT_DIMENSIONS)
+        subtotal_pivot = build_status_pivot(
+            df, CAMPAIGN_PIVOT_DIMENSIONS, CAMPAIGN_QUALITY_METRICS, names, True, aggregator, subtotals=True
+        )
+        aggregator.results['campaign_rollup_tree'] = CampaignRollupTree(subtotal_pivot, names)
+    return aggregator.results['campaign_rollup_tree']
+
+def build_course_quality_table(df, aggregator=None):
+    """
+    🎯 BUILD COURSE QUALITY TABLE (PIVOT STYLE)
+    Creates a matrix showing course-wise lead status distribution with quality metrics
+    """
     # Sort by Grand Total descending
-    pivot = pivot.sort_values('Grand Total', ascending=False)
-    
-    return pivot
+    return build_status_pivot(df, COURSE_PIVOT_DIMENSIONS, COURSE_QUALITY_METRICS, 'Grand Total', False, aggregator)
 
-def build_campaign_performance_table(df):
+def build_campaign_performance_table(df, aggregator=None):
     """
     🎯 BUILD COMPLETE CAMPAIGN PERFORMANCE TABLE (PIVOT STYLE)
     Creates a matrix showing full 3-level hierarchy: Traffic Source → Campaign → Drill-Down 2 → Lead Status
     """
-    # Keep only records with campaign info
-    df_with_campaign = df[
-        (df['Campaign Name'].notna()) & 
-        (df['Campaign Name'] != '') & 
-        (df['Traffic Source'].notna()) & 
-        (df['Traffic Source'] != 'Unknown')
-    ].copy()
-    
-    if df_with_campaign.empty:
-        return pd.DataFrame()
-    
-    # Clean all hierarchy columns
-    df_with_campaign['Traffic_Source_Clean'] = df_with_campaign['Traffic Source'].str.strip()
-    df_with_campaign['Campaign_Clean'] = df_with_campaign['Campaign Name'].str.strip()
-    df_with_campaign['Campaign_Drilldown_2'] = df_with_campaign['Campaign Drilldown 2'].fillna('').astype(str).str.strip()
-    
-    # 🔥 COMPLETE 3-LEVEL HIERARCHY PIVOT
-    pivot = pd.pivot_table(
-        df_with_campaign,
-        index=[
-            'Traffic_Source_Clean',      # Level 1: Traffic Source
-            'Campaign_Clean',            # Level 2: Campaign Name
-            'Campaign_Drilldown_2'       # 🔥 Level 3: Drill-Down 2
-        ],
-        columns='Lead Status',
-        values='ID',
-        aggfunc='count',
-        fill_value=0
-    )
-    
-    # Reset index to make hierarchy columns regular columns
-    pivot = pivot.reset_index()
-    
-    # Rename columns for consistency
-    pivot = pivot.rename(columns={
-        'Traffic_Source_Clean': 'Traffic Source',
-        'Campaign_Clean': 'Campaign Name',
-        'Campaign_Drilldown_2': 'Campaign Drilldown 2'  # 🔥 Keep exact name
-    })
-    
-    # Define required columns in specific order (complete hierarchy)
-    required_columns = [
-        'Traffic Source',
-        'Campaign Name',
-        'Campaign Drilldown 2'
-    ] + [status for status in LEAD_STATUS_ORDER if status != 'Unknown'] + ['Unknown']
-    
-    # Add missing columns with 0 values
-    for col in required_columns:
-        if col not in pivot.columns:
-            pivot[col] = 0
-            
-    # Filter the required columns to only include those in the pivot
-    # to avoid KeyError if some funnel statuses don't appear in data
-    valid_cols = [col for col in required_columns if col in pivot.columns]
-    
-    # Reorder columns
-    pivot = pivot[valid_cols]
-    
-    # Calculate Grand Total (sum of all lead status columns)
-    status_columns = [col for col in valid_cols if col not in ['Traffic Source', 'Campaign Name', 'Campaign Drilldown 2']]
-    pivot['Grand Total'] = pivot[status_columns].sum(axis=1)
-    
-    # Calculate Quality Metrics
-    pivot['Quality Leads (Hot+Warm+Customer)'] = pivot['Hot'] + pivot['Warm'] + pivot['Customer']
-    pivot['Disqualified Leads'] = pivot['Not Interested'] + pivot['Not Qualified']
-    
-    # Calculate percentages
-    pivot['Quality Leads %'] = (pivot['Quality Leads (Hot+Warm+Customer)'] / pivot['Grand Total'] * 100).round(1)
-    pivot['Disqualified %'] = (pivot['Disqualified Leads'] / pivot['Grand Total'] * 100).round(1)
-    
     # Sort by Traffic Source, then Quality Leads % descending
-    pivot = pivot.sort_values(['Traffic Source', 'Campaign Name', 'Quality Leads %'], ascending=[True, True, False])
-    
-    return pivot
+    return build_status_pivot(
+        df, CAMPAIGN_PIVOT_DIMENSIONS, CAMPAIGN_QUALITY_METRICS,
+        ('Traffic Source', 'Campaign Name', 'Quality Leads %'), (True, True, False), aggregator
+    )
 
-def analyze_lead_status_distribution(df):
+def analyze_lead_status_distribution(df, aggregator=None):
     """Analyze lead status distribution - with CORRECT normalization."""
     if 'Lead Status' not in df.columns:
         return pd.DataFrame()
+    aggregator = aggregator or ContactAggregator(df)
     
     # 🔥 Use normalized lead status (already cleaned)
-    lead_status_dist = df['Lead Status'].value_counts().reset_index()
+    lead_status_dist = aggregator.value_counts(aggregator.key('Lead Status')).reset_index()
     lead_status_dist.columns = ['Lead Status', 'Count']
     
     # Sort by Logical Funnel Order
@@ -1122,17 +2919,21 @@ def analyze_lead_status_distribution(df):
     
     return lead_status_dist
 
-def analyze_sub_lead_status_distribution(df):
+def analyze_sub_lead_status_distribution(df, aggregator=None):
     """Analyze Sub Lead Status distribution mapped to Lead Status."""
     if 'Lead Status' not in df.columns or 'Sub Lead Status' not in df.columns:
         return pd.DataFrame()
+    aggregator = aggregator or ContactAggregator(df)
     
     # Filter out empty sub lead statuses
-    sub_df = df[df['Sub Lead Status'].notna() & (df['Sub Lead Status'] != '')]
-    if sub_df.empty:
+    sub_key = aggregator.key('Sub Lead Status')
+    has_sub_status = aggregator.where(sub_key, exclude=[''])
+    if not has_sub_status.any():
         return pd.DataFrame()
         
-    dist = sub_df.groupby(['Lead Status', 'Sub Lead Status']).size().reset_index(name='Count')
+    dist = aggregator.group_sizes(
+        [aggregator.key('Lead Status'), sub_key], ['Lead Status', 'Sub Lead Status'], mask=has_sub_status
+    ).reset_index(name='Count')
     
     # Sort for better presentation based on Funnel Order
     dist['Sort_Index'] = dist['Lead Status'].apply(
@@ -1148,22 +2949,23 @@ def analyze_sub_lead_status_distribution(df):
     
     return dist
 
-def analyze_course_distribution(df):
+def analyze_course_distribution(df, aggregator=None):
     """Analyze course/program distribution with count."""
     if 'Course/Program' not in df.columns:
         return pd.DataFrame()
+    aggregator = aggregator or ContactAggregator(df)
     
     # Clean course data
-    df['Course_Clean'] = df['Course/Program'].fillna('').astype(str).str.strip()
+    course_key = aggregator.key('Course/Program', clean_text_column)
     
     # Remove empty values
-    courses_with_data = df[df['Course_Clean'] != '']
+    has_course = aggregator.where(course_key, exclude=[''])
     
-    if courses_with_data.empty:
+    if not has_course.any():
         return pd.DataFrame()
     
     # Count distribution
-    course_dist = courses_with_data['Course_Clean'].value_counts().reset_index()
+    course_dist = aggregator.value_counts(course_key, has_course).reset_index()
     course_dist.columns = ['Course', 'Count']
     
     # Sort by count (descending)
@@ -1171,23 +2973,21 @@ def analyze_course_distribution(df):
     
     return course_dist
 
-def analyze_traffic_source_distribution(df):
+def analyze_traffic_source_distribution(df, aggregator=None):
     """Analyze traffic source distribution."""
     if 'Traffic Source' not in df.columns:
         return pd.DataFrame()
+    aggregator = aggregator or ContactAggregator(df)
     
     # Remove unknown/empty traffic sources
-    df_filtered = df[
-        (df['Traffic Source'].notna()) & 
-        (df['Traffic Source'] != '') & 
-        (df['Traffic Source'] != 'Unknown')
-    ].copy()
+    traffic_key = aggregator.key('Traffic Source')
+    has_traffic = aggregator.where(traffic_key, exclude=['', 'Unknown'])
     
-    if df_filtered.empty:
+    if not has_traffic.any():
         return pd.DataFrame()
     
     # Count distribution
-    traffic_dist = df_filtered['Traffic Source'].value_counts().reset_index()
+    traffic_dist = aggregator.value_counts(traffic_key, has_traffic).reset_index()
     traffic_dist.columns = ['Traffic Source', 'Count']
     
     # Sort by count (descending)
@@ -1195,7 +2995,7 @@ def analyze_traffic_source_distribution(df):
     
     return traffic_dist
 
-def analyze_prospect_reasons(df):
+def analyze_prospect_reasons(df, aggregator=None):
     """Analyze all prospect reasons - with CORRECT mapping."""
     # Define all prospect reason columns
     prospect_columns = [
@@ -1215,19 +3015,20 @@ def analyze_prospect_reasons(df):
     
     # Find which columns actually exist in the dataframe
     available_columns = [col for col in prospect_columns if col in df.columns]
+    aggregator = aggregator or ContactAggregator(df)
     
     results = {}
     
     for column in available_columns:
         # Clean the data
-        df[column] = df[column].fillna('').astype(str).str.strip()
+        reason_key = aggregator.key(column, clean_text_column)
         
         # Remove empty values
-        non_empty = df[df[column] != ''][column]
+        non_empty = aggregator.where(reason_key, exclude=[''])
         
-        if not non_empty.empty:
+        if non_empty.any():
             # Count distribution
-            reason_dist = non_empty.value_counts().reset_index()
+            reason_dist = aggregator.value_counts(reason_key, non_empty).reset_index()
             reason_dist.columns = ['Reason', 'Count']
             reason_dist = reason_dist.sort_values('Count', ascending=False)
             
@@ -1235,214 +3036,389 @@ def analyze_prospect_reasons(df):
     
     return results
 
-def analyze_contact_data(df):
-    """Perform comprehensive analysis on contacts data."""
-    analysis = {}
-    
+# Sections of analyze_contact_data, in the order it lists them
+ANALYSIS_SECTIONS = [
+    'lead_status_distribution', 'sub_lead_status_distribution', 'course_distribution', 'traffic_source_distribution',
+    'prospect_reasons', 'country_distribution', 'industry_distribution', 'stage_distribution', 'monthly_trend',
+    'completeness', 'phone_country_analysis', 'course_quality', 'campaign_performance', 'debug_mapping'
+]
+
+def analyze_contact_section(name, df, aggregator):
+    """One section of analyze_contact_data, or None when the dataset has nothing for it."""
     if df.empty:
-        return analysis
+        return None
     
     # 1. Lead Status Distribution - WITH CORRECT NORMALIZATION
-    lead_status_dist = analyze_lead_status_distribution(df)
-    if not lead_status_dist.empty:
-        analysis['lead_status_distribution'] = lead_status_dist
+    if name == 'lead_status_distribution':
+        lead_status_dist = analyze_lead_status_distribution(df, aggregator)
+        return lead_status_dist if not lead_status_dist.empty else None
         
     # 1.5 Sub Lead Status Distribution
-    sub_lead_dist = analyze_sub_lead_status_distribution(df)
-    if not sub_lead_dist.empty:
-        analysis['sub_lead_status_distribution'] = sub_lead_dist
+    if name == 'sub_lead_status_distribution':
+        sub_lead_dist = analyze_sub_lead_status_distribution(df, aggregator)
+        return sub_lead_dist if not sub_lead_dist.empty else None
     
     # 2. Course Distribution
-    course_dist = analyze_course_distribution(df)
-    if not course_dist.empty:
-        analysis['course_distribution'] = course_dist
+    if name == 'course_distribution':
+        course_dist = analyze_course_distribution(df, aggregator)
+        return course_dist if not course_dist.empty else None
     
     # 3. Traffic Source Distribution
-    traffic_dist = analyze_traffic_source_distribution(df)
-    if not traffic_dist.empty:
-        analysis['traffic_source_distribution'] = traffic_dist
+    if name == 'traffic_source_distribution':
+        traffic_dist = analyze_traffic_source_distribution(df, aggregator)
+        return traffic_dist if not traffic_dist.empty else None
     
     # 4. Prospect Reasons Analysis
-    prospect_reasons = analyze_prospect_reasons(df)
-    if prospect_reasons:
-        analysis['prospect_reasons'] = prospect_reasons
+    if name == 'prospect_reasons':
+        prospect_reasons = analyze_prospect_reasons(df, aggregator)
+        return prospect_reasons or None
     
     # 5. Country Analysis
-    if 'Country' in df.columns:
-        country_dist = df['Country'].value_counts().reset_index()
+    if name == 'country_distribution' and 'Country' in df.columns:
+        country_dist = aggregator.value_counts(aggregator.key('Country')).reset_index()
         country_dist.columns = ['Country', 'Count']
-        analysis['country_distribution'] = country_dist
+        return country_dist
     
     # 6. Industry Analysis
-    if 'Industry' in df.columns:
-        industry_dist = df['Industry'].value_counts().reset_index()
+    if name == 'industry_distribution' and 'Industry' in df.columns:
+        industry_dist = aggregator.value_counts(aggregator.key('Industry')).reset_index()
         industry_dist.columns = ['Industry', 'Count']
-        analysis['industry_distribution'] = industry_dist
+        return industry_dist
     
     # 7. Lifecycle Stage Analysis
-    if 'Lifecycle Stage' in df.columns:
-        stage_dist = df['Lifecycle Stage'].value_counts().reset_index()
+    if name == 'stage_distribution' and 'Lifecycle Stage' in df.columns:
+        stage_dist = aggregator.value_counts(aggregator.key('Lifecycle Stage')).reset_index()
         stage_dist.columns = ['Lifecycle Stage', 'Count']
-        analysis['stage_distribution'] = stage_dist
+        return stage_dist
     
     # 8. Creation Date Trend (Monthly)
-    if 'Created Date' in df.columns:
+    if name == 'monthly_trend' and 'Created Date' in df.columns:
         try:
-            df['Created_Month'] = df['Created Date'].dt.to_period('M')
-            monthly_trend = df.groupby('Created_Month').size().reset_index()
+            monthly_trend = aggregator.monthly_counts('Created Date').reset_index()
             monthly_trend.columns = ['Month', 'Count']
             monthly_trend['Month'] = monthly_trend['Month'].astype(str)
-            analysis['monthly_trend'] = monthly_trend
+            return monthly_trend
         except:
-            pass
+            return None
     
     # 9. Contact Completeness Analysis
-    completeness_data = {
-        'Field': ['Email', 'Phone', 'Lead Status', 'Course/Program', 'Traffic Source', 'Campaign Name', 'Drill-Down 2'],
-        'Count': [
+    if name == 'completeness':
+        completeness_counts = [
             df['Has Email'].sum(),
             df['Has Phone'].sum(),
-            df['Lead Status'].notna().sum(),
+            (aggregator.key('Lead Status')[0] >= 0).sum(),
             df['Has Course'].sum(),
             df['Has Traffic Source'].sum(),
             df['Has Campaign'].sum(),
             df['Has Drilldown 2'].sum()  # 🔥 NEW
-        ],
-        'Percentage': [
-            (df['Has Email'].sum() / len(df)) * 100,
-            (df['Has Phone'].sum() / len(df)) * 100,
-            (df['Lead Status'].notna().sum() / len(df)) * 100,
-            (df['Has Course'].sum() / len(df)) * 100,
-            (df['Has Traffic Source'].sum() / len(df)) * 100,
-            (df['Has Campaign'].sum() / len(df)) * 100,
-            (df['Has Drilldown 2'].sum() / len(df)) * 100  # 🔥 NEW
         ]
-    }
-    analysis['completeness'] = pd.DataFrame(completeness_data)
+        completeness_data = {
+            'Field': ['Email', 'Phone', 'Lead Status', 'Course/Program', 'Traffic Source', 'Campaign Name', 'Drill-Down 2'],
+            'Count': completeness_counts,
+            'Percentage': [(count / len(df)) * 100 for count in completeness_counts]
+        }
+        return pd.DataFrame(completeness_data)
     
     # 10. Phone Number Country Analysis
-    if 'Phone' in df.columns:
-        phone_analysis = analyze_phone_numbers(df)
-        analysis['phone_country_analysis'] = phone_analysis
+    if name == 'phone_country_analysis' and 'Phone' in df.columns:
+        return analyze_phone_numbers(df, aggregator)
     
     # 11. 🔥 Course Quality Analysis
-    course_quality = build_course_quality_table(df)
-    if not course_quality.empty:
-        analysis['course_quality'] = course_quality
+    if name == 'course_quality':
+        course_quality = build_course_quality_table(df, aggregator)
+        return course_quality if not course_quality.empty else None
     
     # 12. 🔥 COMPLETE Campaign Performance Analysis (3-Level Hierarchy)
-    campaign_performance = build_campaign_performance_table(df)
-    if not campaign_performance.empty:
-        analysis['campaign_performance'] = campaign_performance
+    if name == 'campaign_performance':
+        campaign_performance = build_campaign_performance_table(df, aggregator)
+        return campaign_performance if not campaign_performance.empty else None
     
     # 13. DEBUG: Raw vs Normalized mapping
-    if 'Lead Status Raw' in df.columns:
-        debug_data = df[['Lead Status', 'Lead Status Raw']].copy()
-        debug_data = debug_data.groupby(['Lead Status', 'Lead Status Raw']).size().reset_index(name='Count')
+    if name == 'debug_mapping' and 'Lead Status Raw' in df.columns:
+        debug_data = aggregator.group_sizes(
+            [aggregator.key('Lead Status'), aggregator.key('Lead Status Raw')], ['Lead Status', 'Lead Status Raw']
+        ).reset_index(name='Count')
         debug_data = debug_data.sort_values('Count', ascending=False)
-        analysis['debug_mapping'] = debug_data.head(20)
+        return debug_data.head(20)
     
-    return analysis
+    return None
 
-def analyze_phone_numbers(df):
-    """Analyze phone numbers by country codes."""
-    if 'Phone' not in df.columns:
-        return pd.DataFrame()
+def analyze_contact_data(df, aggregator=None):
+    """
+    Perform comprehensive analysis on contacts data.
+    All sections share one ContactAggregator, so each key column is factorized once and df is left untouched.
+    """
+    aggregator = aggregator or ContactAggregator(df)
+    sections = {name: analyze_contact_section(name, df, aggregator) for name in ANALYSIS_SECTIONS}
+    return {name: section for name, section in sections.items() if section is not None}
+
+class LazyResults:
+    """
+    🦥 LAZY ANALYSIS REGISTRY
+    Read-only mapping of named artifacts (analysis sections, charts) of one dataset. Each artifact is
+    built by build(name) on first access and cached on the dataset's aggregator, so a tab only pays for
+    what it renders and every session showing the dataset shares the result. Artifacts built as None
+    are absent; iterating builds them all. Deliberately has no len(): Streamlit sizes values stored in
+    session state, which would build everything.
+    """
     
-    results = []
+    def __init__(self, aggregator, kind, names, build):
+        self.aggregator = aggregator
+        self.kind = kind
+        self.names = names
+        self.build = build
+    
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        cache_key = (self.kind, name)
+        if cache_key not in self.aggregator.results:
+            self.aggregator.results[cache_key] = self.build(name)
+        artifact = self.aggregator.results[cache_key]
+        if artifact is None:
+            raise KeyError(name)
+        return artifact
+    
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
     
-    for phone in df['Phone'].dropna():
-        phone_str = str(phone).strip()
-        country = 'Unknown'
-        country_code = 'Unknown'
-        
-        for code, country_name in COUNTRY_CODES.items():
-            if phone_str.startswith(code):
-                country = country_name
-                country_code = code
-                break
-            elif phone_str.startswith(code.replace('+', '')):
-                country = country_name
-                country_code = code
-                break
-        
-        # Check for Indian numbers
-        if country == 'Unknown':
-            if phone_str.startswith('91') and len(phone_str) >= 12:
-                country = 'India'
-                country_code = '+91'
-            elif phone_str.startswith('0') and (len(phone_str) == 11 or len(phone_str) == 10):
-                country = 'India (Local)'
-                country_code = '+91'
-            elif phone_str.isdigit() and len(phone_str) == 10:
-                country = 'India (10 digit)'
-                country_code = '+91'
-        
-        results.append({
-            'Phone': phone_str,
-            'Country': country,
-            'Country_Code': country_code
-        })
+    def __contains__(self, name):
+        return self.get(name) is not None
     
-    if results:
-        analysis_df = pd.DataFrame(results)
-        country_dist = analysis_df['Country'].value_counts().reset_index()
-        country_dist.columns = ['Country', 'Count']
-        return country_dist
-    return pd.DataFrame()
+    def __iter__(self):
+        return (name for name in self.names if name in self)
+    
+    def keys(self):
+        return list(self)
+    
+    def items(self):
+        return [(name, self[name]) for name in self]
+    
+    def __bool__(self):
+        return any(True for _ in self)  # Stops at the first artifact that exists
 
-def analyze_email_validation(df):
-    """Comprehensive email validation analysis."""
-    if 'Email' not in df.columns:
+def classify_phone_numbers(phones):
+    """
+    Country and E.164 form of every number in a Series, in one vectorized pass. Numbers lose any
+    extension and are reduced to their digits; international ones (+ or 00) take the country of the
+    longest dialling code they start with. National ones written as plain digits (spaces aside) follow
+    the Indian formats first (91 + 10 digits, 0 + 10 digits, bare 10 digits); the rest fall back to the
+    dialling codes, as long as they have an E.164 number of digits. Indian numbers are only valid
+    E.164 with exactly 10 subscriber digits. Missing numbers stay missing in both columns.
+    """
+    text = phones.astype('string').str.replace(PHONE_EXTENSION_PATTERN, '', regex=True)
+    international_prefix = r'^[^\d+]*(?:\+|00)'  # + or 00 before the first digit, past any brackets or spaces
+    international = text.str.contains(international_prefix, regex=True).fillna(False).to_numpy(dtype=bool)
+    digits = text.str.replace(international_prefix + r'|\D', '', regex=True).fillna('')
+    length = digits.str.len().to_numpy()
+    
+    # The dialling code only depends on the leading digits, so each distinct head is looked up once
+    head_codes, heads = digits.str.slice(0, max(PHONE_CODE_LOOKUP)).factorize()
+    heads = pd.Series(heads)
+    head_countries = pd.Series(np.nan, index=heads.index, dtype=object)
+    for size, codes in PHONE_CODE_LOOKUP.items():
+        head_countries = head_countries.fillna(heads.str.slice(0, size).map(codes))
+    dialled = pd.Series(head_countries.to_numpy()[head_codes], index=phones.index)
+    dialled = dialled.where((length >= E164_DIGIT_RANGE[0]) & (length <= E164_DIGIT_RANGE[1]))
+    
+    # Formatted numbers like "(415) 555-1234" are no Indian national numbers, whatever their length
+    plain_digits = text.str.fullmatch(r'[\d\s]+').fillna(False).to_numpy(dtype=bool)
+    national = ~international & plain_digits
+    india = national & digits.str.startswith('91').to_numpy() & (length >= 12)
+    local = national & digits.str.startswith('0').to_numpy() & np.isin(length, (10, 11))
+    ten_digit = national & ~india & ~local & (length == 10)
+    countries = np.select(
+        [india, local, ten_digit], ['India', 'India (Local)', 'India (10 digit)'],
+        default=dialled.fillna('Unknown').to_numpy(dtype=object)
+    )
+    
+    # Indian national formats get +91 in front of their 10 subscriber digits; everything else is + and its digits
+    indian = local | ten_digit
+    e164 = ('+' + digits).where(dialled.notna()).mask(indian, '+91' + digits.str.removeprefix('0'))
+    e164_digits = e164.str.len() - 1
+    indian_length = indian | (dialled == 'India').to_numpy()
+    valid = np.where(indian_length, e164_digits == 2 + INDIA_NATIONAL_DIGITS, e164_digits.between(*E164_DIGIT_RANGE))
+    
+    present = phones.notna().to_numpy()
+    return pd.DataFrame({
+        'Country': pd.Series(countries, index=phones.index).where(present),
+        'E.164': e164.astype(object).where(valid & present, np.nan)
+    })
+
+def get_phone_countries(phones):
+    """Country of each phone number in a Series (missing numbers stay missing)."""
+    return classify_phone_numbers(phones)['Country']
+
+def get_phone_e164(phones):
+    """E.164 form of each phone number in a Series (missing and unplaceable numbers are missing)."""
+    return classify_phone_numbers(phones)['E.164']
+
+def get_normalized_phones(df, aggregator=None):
+    """Per-contact E.164 phone numbers (each distinct number is normalized once)."""
+    aggregator = aggregator or ContactAggregator(df)
+    codes, uniques = aggregator.key('Phone', get_phone_e164)
+    return pd.Series(uniques.take(codes, allow_fill=True, fill_value=np.nan), index=df.index, name='Phone (E.164)')
+
+def analyze_phone_numbers(df, aggregator=None):
+    """Analyze phone numbers by country codes (each distinct number is classified once)."""
+    if 'Phone' not in df.columns:
         return pd.DataFrame()
+    aggregator = aggregator or ContactAggregator(df)
     
-    email_issues = []
+    if not (aggregator.key('Phone')[0] >= 0).any():
+        return pd.DataFrame()
     
-    for idx, email in df['Email'].items():
-        if pd.isna(email) or str(email).strip() == '':
-            email_issues.append({
-                'Record ID': df.loc[idx, 'ID'] if 'ID' in df.columns else idx,
-                'Email': '',
-                'Issue': 'Missing email'
-            })
-            continue
-        
-        email_str = str(email).lower().strip()
+    country_dist = aggregator.value_counts(aggregator.key('Phone', get_phone_countries)).reset_index()
+    country_dist.columns = ['Country', 'Count']
+    return country_dist
+
+def get_edit_distances(chars, lengths, target):
+    """
+    Edits (substitutions, insertions, deletions, swaps of neighbouring characters) turning each row of
+    `chars` - byte codes, of which the first `lengths` count - into `target`, for all rows at once.
+    Rows are filled one character at a time; within a row, insertions are a running minimum.
+    """
+    target = np.frombuffer(target.encode('utf-8'), dtype=np.uint8)
+    steps = np.arange(len(target) + 1, dtype=np.int16)
+    distances = np.full(len(chars), len(target), dtype=np.int16)
+    before, previous = None, np.broadcast_to(steps, (len(chars), len(steps)))
+    
+    for i in range(1, int(lengths.max(initial=0)) + 1):
+        char = chars[:, i - 1, None]
+        best = np.empty_like(previous)
+        best[:, 0] = i
+        best[:, 1:] = np.minimum(previous[:, 1:] + 1, previous[:, :-1] + (char != target))
+        if i > 1:
+            swapped = (char == target[:-1]) & (chars[:, i - 2, None] == target[1:])
+            best[:, 2:] = np.where(swapped, np.minimum(best[:, 2:], before[:, :-2] + 1), best[:, 2:])
+        current = np.minimum.accumulate(best - steps, axis=1) + steps
         
-        # Check for common typos
-        if '@gmal.com' in email_str:
-            email_issues.append({
-                'Record ID': df.loc[idx, 'ID'] if 'ID' in df.columns else idx,
-                'Email': email_str,
-                'Issue': 'Incorrect domain: gmal.com'
-            })
-        elif '@gmil.com' in email_str:
-            email_issues.append({
-                'Record ID': df.loc[idx, 'ID'] if 'ID' in df.columns else idx,
-                'Email': email_str,
-                'Issue': 'Incorrect domain: gmil.com'
-            })
-        elif '@gamil.com' in email_str:
-            email_issues.append({
-                'Record ID': df.loc[idx, 'ID'] if 'ID' in df.columns else idx,
-                'Email': email_str,
-                'Issue': 'Incorrect domain: gamil.com'
-            })
-        elif not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email_str):
-            email_issues.append({
-                'Record ID': df.loc[idx, 'ID'] if 'ID' in df.columns else idx,
-                'Email': email_str,
-                'Issue': 'Invalid email format'
-            })
-    
-    return pd.DataFrame(email_issues)
+        ended = lengths == i
+        distances[ended] = current[ended, -1]
+        before, previous = previous, current
+    return distances
 
-def create_visualizations(analysis, df):
-    """Create Plotly visualizations."""
-    visualizations = {}
+def find_email_domain_typos(domains):
+    """
+    Popular domain each of `domains` is most likely a typo of (None if none), checked against all domains at once.
+    Known provider domains are no typos, and neither is a popular domain under another country's suffix.
+    """
+    domains = pd.Series(domains, dtype=object)
+    encoded = domains.str.encode('utf-8')
+    lengths = encoded.str.len().to_numpy()
+    width = max(len(popular) + edits for popular, edits in POPULAR_EMAIL_DOMAINS.items())
+    
+    # Byte codes padded to the longest possible typo; anything longer is no typo
+    known = domains.isin(list(POPULAR_EMAIL_DOMAINS) + list(KNOWN_EMAIL_DOMAINS)).to_numpy()
+    candidates = np.flatnonzero((lengths <= width) & ~known)
+    chars = np.array(encoded.take(candidates).tolist(), dtype=f'S{width}').view(np.uint8).reshape(-1, width)
+    lengths = lengths[candidates]
+    suffixes = domains.take(candidates).str.replace(r'^[^.]*\.?', '', regex=True).to_numpy(dtype=object)  # After the first label
+    real_suffix = np.isin(suffixes, list(EMAIL_DOMAIN_SUFFIXES))
+    
+    # Fewest edits wins; ties go to the more popular domain
+    best_distances = np.full(len(candidates), width, dtype=np.int16)
+    suggestions = np.full(len(domains), None, dtype=object)
+    for popular, edits in POPULAR_EMAIL_DOMAINS.items():
+        other_country = real_suffix & (suffixes != popular.partition('.')[2])
+        rows = np.flatnonzero((np.abs(lengths - len(popular)) <= edits) & ~other_country)
+        if edits == 0 or len(rows) == 0:
+            continue
+        distances = get_edit_distances(chars[rows], lengths[rows], popular)
+        closer = (distances <= edits) & (distances < best_distances[rows])
+        best_distances[rows[closer]] = distances[closer]
+        suggestions[candidates[rows[closer]]] = popular
+    return suggestions.tolist()
+
+@st.cache_resource(show_spinner=False)
+def get_email_domain_cache():
+    """Process-wide typo suggestion (None if not a typo) of every email domain checked so far."""
+    return {}
+
+def suggest_email_domains(domains, cache=None):
+    """
+    Popular domain each of the distinct `domains` is most likely a typo of, or None; unseen domains are checked together.
+    `cache` defaults to the process-wide domain cache (resolve it on the script thread when running off it).
+    """
+    cache = get_email_domain_cache() if cache is None else cache
+    suggestions = [cache.get(domain, '') for domain in domains]  # '' marks a domain not checked yet
+    unseen = [domain for domain, suggestion in zip(domains, suggestions) if suggestion == '']
+    if unseen:
+        found = dict(zip(unseen, find_email_domain_typos(unseen)))
+        if len(cache) + len(found) > EMAIL_DOMAIN_CACHE_SIZE:
+            cache.clear()  # Starting over is cheaper than tracking which domains are still in use
+        cache.update(found)
+        suggestions = [found[domain] if suggestion == '' else suggestion for domain, suggestion in zip(domains, suggestions)]
+    return suggestions
+
+def analyze_email_validation(df, domain_cache=None):
+    """
+    Comprehensive email validation analysis: missing emails, likely typos of popular domains (with the
+    corrected address) and malformed addresses, in contact order. Checks run column-wise, and each
+    distinct domain is looked up for typos once (see suggest_email_domains for `domain_cache`).
+    """
+    if 'Email' not in df.columns:
+        return pd.DataFrame()
     
+    emails = df['Email'].astype('string').str.lower().str.strip().fillna('')
+    has_domain = emails.str.contains('@', regex=False).to_numpy(dtype=bool)
+    domains = emails.str.replace(r'^.*@', '', regex=True).where(has_domain)  # After the last @
+    domain_codes, distinct_domains = domains.factorize()
+    suggestions = np.array(suggest_email_domains(list(distinct_domains), domain_cache) + [None], dtype=object)[domain_codes]
+    
+    missing = (emails == '').to_numpy()
+    typo = ~missing & pd.notna(suggestions)
+    invalid = ~missing & ~typo & ~emails.str.fullmatch(EMAIL_FORMAT_PATTERN).to_numpy(dtype=bool)
+    flagged = np.flatnonzero(missing | typo | invalid)
+    
+    # Only the flagged contacts get their issue text and correction spelled out
+    emails, domains, suggestions, typo = emails.take(flagged), domains.take(flagged), suggestions[flagged], typo[flagged]
+    issues = np.where(missing[flagged], 'Missing email', 'Invalid email format').astype(object)
+    issues[typo] = ('Incorrect domain: ' + domains[typo]).to_numpy(dtype=object)
+    corrections = np.full(len(flagged), np.nan, dtype=object)
+    corrections[typo] = (emails[typo].str.replace(r'@[^@]*$', '@', regex=True) + suggestions[typo].astype(str)).to_numpy(dtype=object)
+    
+    record_ids = df['ID'] if 'ID' in df.columns else df.index.to_series()
+    return pd.DataFrame({
+        'Record ID': record_ids.to_numpy()[flagged],
+        'Email': emails.to_numpy(dtype=object),
+        'Issue': issues,
+        'Suggested Correction': corrections
+    })
+
+def get_email_validation(df, aggregator):
+    """analyze_email_validation() of the aggregator's dataset, computed on first use and cached with it."""
+    if 'email_validation' not in aggregator.results:
+        aggregator.results['email_validation'] = analyze_email_validation(df)
+    return aggregator.results['email_validation']
+
+def update_email_validation(email_validation, old_df, df, delta, domain_cache=None):
+    """Email issues of `df` from those of `old_df` (see diff_contacts), re-checking only added or updated contacts."""
+    issues = analyze_email_validation(df.take(delta['added']), domain_cache)
+    if not email_validation.empty:
+        removed_ids = old_df['ID'].take(delta['removed'])
+        kept = email_validation[~email_validation['Record ID'].isin(removed_ids)]
+        issues = pd.concat([kept, issues], ignore_index=True) if not issues.empty else kept
+    if issues.empty:
+        return issues
+    
+    # Back into the order of the contacts
+    positions = pd.Index(df['ID']).get_indexer(issues['Record ID'])
+    return issues.take(np.argsort(positions, kind="stable")).reset_index(drop=True)
+
+# Charts of create_visualizations, in the order it lists them
+VISUALIZATION_NAMES = [
+    'lead_status_bar', 'course_bar', 'traffic_source_bar', 'country_bar', 'monthly_trend',
+    'lead_status_pie', 'course_pie', 'traffic_source_pie'
+]
+
+def create_visualization(name, analysis):
+    """One Plotly chart of create_visualizations, or None when its analysis section is missing or too small."""
     # 1. Lead Status Bar Chart (Top 10 - Excluding Grand Total)
-    if 'lead_status_distribution' in analysis:
+    if name == 'lead_status_bar' and 'lead_status_distribution' in analysis:
         lead_status_data = analysis['lead_status_distribution']
         # Exclude "Grand Total" from chart
         lead_status_chart_data = lead_status_data[lead_status_data['Lead Status'] != 'Grand Total'].head(10)
@@ -1456,10 +3432,10 @@ def create_visualizations(analysis, df):
                 color_continuous_scale='Viridis'
             )
             fig1.update_layout(xaxis_tickangle=-45)
-            visualizations['lead_status_bar'] = fig1
+            return fig1
     
     # 2. Course Distribution Bar Chart (Top 10)
-    if 'course_distribution' in analysis:
+    if name == 'course_bar' and 'course_distribution' in analysis:
         course_data = analysis['course_distribution'].head(10)
         if not course_data.empty:
             fig2 = px.bar(
@@ -1471,10 +3447,10 @@ def create_visualizations(analysis, df):
                 color_continuous_scale='Blues'
             )
             fig2.update_layout(xaxis_tickangle=-45)
-            visualizations['course_bar'] = fig2
+            return fig2
     
     # 3. Traffic Source Bar Chart (Top 10)
-    if 'traffic_source_distribution' in analysis:
+    if name == 'traffic_source_bar' and 'traffic_source_distribution' in analysis:
         traffic_data = analysis['traffic_source_distribution'].head(10)
         if not traffic_data.empty:
             fig3 = px.bar(
@@ -1486,10 +3462,10 @@ def create_visualizations(analysis, df):
                 color_continuous_scale='Reds'
             )
             fig3.update_layout(xaxis_tickangle=-45)
-            visualizations['traffic_source_bar'] = fig3
+            return fig3
     
     # 4. Country Bar Chart (Top 15)
-    if 'country_distribution' in analysis:
+    if name == 'country_bar' and 'country_distribution' in analysis:
         country_data = analysis['country_distribution'].head(15)
         if not country_data.empty:
             fig4 = px.bar(
@@ -1501,10 +3477,10 @@ def create_visualizations(analysis, df):
                 color_continuous_scale='Greens'
             )
             fig4.update_layout(xaxis_tickangle=-45)
-            visualizations['country_bar'] = fig4
+            return fig4
     
     # 5. Monthly Trend Line Chart
-    if 'monthly_trend' in analysis:
+    if name == 'monthly_trend' and 'monthly_trend' in analysis:
         trend_data = analysis['monthly_trend']
         if len(trend_data) > 1:
             fig5 = px.line(
@@ -1515,10 +3491,10 @@ def create_visualizations(analysis, df):
                 markers=True
             )
             fig5.update_traces(line=dict(width=3))
-            visualizations['monthly_trend'] = fig5
+            return fig5
     
     # 6. Lead Status Pie Chart
-    if 'lead_status_distribution' in analysis:
+    if name == 'lead_status_pie' and 'lead_status_distribution' in analysis:
         lead_status_data = analysis['lead_status_distribution']
         # Exclude "Grand Total" from pie chart
         lead_status_pie_data = lead_status_data[lead_status_data['Lead Status'] != 'Grand Total'].head(8)
@@ -1532,10 +3508,10 @@ def create_visualizations(analysis, df):
                 color_discrete_sequence=px.colors.qualitative.Set3
             )
             fig6.update_traces(textposition='inside', textinfo='percent+label')
-            visualizations['lead_status_pie'] = fig6
+            return fig6
     
     # 7. Course Pie Chart
-    if 'course_distribution' in analysis:
+    if name == 'course_pie' and 'course_distribution' in analysis:
         course_data = analysis['course_distribution'].head(8)
         if not course_data.empty:
             fig7 = px.pie(
@@ -1547,10 +3523,10 @@ def create_visualizations(analysis, df):
                 color_discrete_sequence=px.colors.qualitative.Pastel
             )
             fig7.update_traces(textposition='inside', textinfo='percent+label')
-            visualizations['course_pie'] = fig7
+            return fig7
     
     # 8. Traffic Source Pie Chart
-    if 'traffic_source_distribution' in analysis:
+    if name == 'traffic_source_pie' and 'traffic_source_distribution' in analysis:
         traffic_data = analysis['traffic_source_distribution'].head(8)
         if not traffic_data.empty:
             fig8 = px.pie(
@@ -1562,9 +3538,495 @@ def create_visualizations(analysis, df):
                 color_discrete_sequence=px.colors.qualitative.Prism
             )
             fig8.update_traces(textposition='inside', textinfo='percent+label')
-            visualizations['traffic_source_pie'] = fig8
+            return fig8
     
-    return visualizations
+    return None
+
+def create_visualizations(analysis, df):
+    """Create Plotly visualizations."""
+    charts = {name: create_visualization(name, analysis) for name in VISUALIZATION_NAMES}
+    return {name: chart for name, chart in charts.items() if chart is not None}
+
+def diff_contacts(old_df, df):
+    """
+    How a re-read of the contacts differs from the frame loaded before, matched by ID and 'Last Modified
+    Date' (HubSpot bumps it on every edit): {'row_map': position in old_df of each unchanged contact of df
+    or -1, 'added': positions in df of new or updated contacts, 'removed': positions in old_df of deleted
+    or updated ones}. None when the frames can't be matched up.
+    """
+    if list(old_df.columns) != list(df.columns) or 'ID' not in df.columns or 'Last Modified Date' not in df.columns:
+        return None
+    old_ids = pd.Index(old_df['ID'])
+    if not old_ids.is_unique or not df['ID'].is_unique:
+        return None
+    
+    row_map = old_ids.get_indexer(df['ID'])
+    matched = np.flatnonzero(row_map >= 0)
+    old_modified = old_df['Last Modified Date'].to_numpy()[row_map[matched]]
+    modified = df['Last Modified Date'].to_numpy()[matched]
+    row_map[matched[~(old_modified == modified)]] = -1  # Missing dates never match, so those count as updated
+    
+    unchanged = np.zeros(len(old_df), dtype=bool)
+    unchanged[row_map[row_map >= 0]] = True
+    return {'row_map': row_map, 'added': np.flatnonzero(row_map < 0), 'removed': np.flatnonzero(~unchanged)}
+
+def get_contacts_fingerprint(df):
+    """
+    Cheap content fingerprint of a contacts frame: its schema, row count and a hash of the IDs and
+    'Last Modified Date' values in row order (HubSpot bumps the date on every edit). None without those columns.
+    """
+    if 'ID' not in df.columns or 'Last Modified Date' not in df.columns:
+        return None
+    
+    digest = hashlib.sha1(json.dumps([[column, str(dtype)] for column, dtype in df.dtypes.items()]).encode())
+    for column in ['ID', 'Last Modified Date']:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.cat.categories.dtype)
+        # Hashing the Arrow buffers directly is far cheaper than hashing values one by one
+        try:
+            array = pa.array(values, from_pandas=True)
+        except (pa.ArrowException, TypeError):
+            # Mixed values Arrow cannot type (e.g. dates next to unparsed strings): hash their text
+            array = pa.array(values.astype(str))
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        digest.update(f"{array.type}:{array.offset}".encode())
+        for buffer in array.buffers():
+            digest.update(b"-" if buffer is None else f"{buffer.size}:".encode() + buffer)
+    return f"{len(df)}:{digest.hexdigest()}"
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_cache():
+    """Process-wide cache of session payloads, shared by every session and rerun."""
+    return FetchResultCache(ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_BYTES)
+
+def build_session_payload(df, base=None, analysis_cache=None, email_domain_cache=None):
+    """
+    Analysis, charts, the contact cube and the dataset's aggregator (which caches further breakdowns)
+    for a contacts DataFrame, as kept in session state.
+    🦥 Only the cube behind the KPIs is built up front: analysis sections and charts are lazy mappings
+    and email validation and the campaign rollup tree are built on first use, so a tab only pays for
+    what it renders.
+    🧠 Payloads are memoized across sessions by dataset fingerprint, so refreshing unchanged contacts or
+    loading contacts another session already analyzed only costs hashing the IDs and modified dates.
+    🔁 With `base` - the (contacts, payload) loaded before, e.g. ahead of a delta sync - only the contacts
+    added, removed or updated since are re-processed, as long as they are a small share of the dataset
+    and were fetched with the same properties (df.attrs["properties"], None for all of them).
+    Off the script thread, pass the `analysis_cache` and `email_domain_cache` resolved on it.
+    """
+    analysis_cache = analysis_cache or get_analysis_cache()
+    properties = df.attrs.get("properties")
+    fingerprint = get_contacts_fingerprint(df)
+    cache_key = ("session_payload", fingerprint, properties)
+    if fingerprint is not None:
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached[0]["session_payload"]
+    
+    # Unchanged contacts only keep their values if the same properties were fetched
+    if base is not None and base[0].attrs.get("properties") != properties:
+        base = None
+    delta = diff_contacts(base[0], df) if base is not None else None
+    if delta is not None and len(delta['added']) + len(delta['removed']) > INCREMENTAL_ANALYSIS_MAX_DELTA_RATIO * len(df):
+        delta = None
+    
+    # Pre-aggregated cube for the KPIs and filtered views
+    if delta is None:
+        aggregator = ContactAggregator(df)
+        contact_cube = ContactCube(df, aggregator)
+    else:
+        old_df, old_payload = base
+        old_aggregator = old_payload["contact_aggregator"]
+        aggregator = old_aggregator.apply_delta(df, delta)
+        contact_cube = old_payload["contact_cube"].apply_delta(df, delta, aggregator)
+        if 'email_validation' in old_aggregator.results:
+            # Already checked, so patching it is cheaper than checking everything again later
+            aggregator.results['email_validation'] = update_email_validation(
+                old_aggregator.results['email_validation'], old_df, df, delta, email_domain_cache
+            )
+    
+    # Analysis and visualizations, computed as the tabs ask for them
+    analysis_results = LazyResults(
+        aggregator, 'analysis', ANALYSIS_SECTIONS, partial(analyze_contact_section, df=df, aggregator=aggregator)
+    )
+    visualizations = LazyResults(
+        aggregator, 'visualization', VISUALIZATION_NAMES, partial(create_visualization, analysis=analysis_results)
+    )
+    
+    payload = {
+        "analysis_results": analysis_results,
+        "visualizations": visualizations,
+        "contact_cube": contact_cube,
+        "contact_aggregator": aggregator
+    }
+    if fingerprint is not None:
+        analysis_cache.put(cache_key, {"df": df, "session_payload": payload})
+    return payload
+
+def get_loaded_contacts():
+    """(contacts, session payload) loaded in this session, or None."""
+    df = st.session_state.get('contacts_df')
+    if df is None or df.empty or st.session_state.get('contact_cube') is None or st.session_state.get('contact_aggregator') is None:
+        return None
+    return df, {
+        "analysis_results": st.session_state.analysis_results,
+        "visualizations": st.session_state.visualizations,
+        "contact_cube": st.session_state.contact_cube,
+        "contact_aggregator": st.session_state.contact_aggregator
+    }
+
+def load_contacts_into_session(df, payload=None, compact_schema=False):
+    """Store contacts in session state together with their analysis, charts and cube (built unless given)."""
+    if compact_schema:
+        df = compact_contacts_frame(df)
+    payload = payload or build_session_payload(df)
+    
+    st.session_state.contacts_df = df
+    st.session_state.contacts_memory = (get_frame_memory(df), df.attrs.get("memory_before_compaction"))
+    st.session_state.analysis_results = payload["analysis_results"]
+    st.session_state.visualizations = payload["visualizations"]
+    st.session_state.contact_cube = payload["contact_cube"]
+    st.session_state.contact_aggregator = payload["contact_aggregator"]
+
+class FetchJob:
+    """
+    🔥 One background sync + analysis run.
+    Implements the fetch reporter methods, so the worker thread records its progress here and the
+    sessions waiting on it poll it. Messages are kept until those sessions collect the result.
+    """
+    
+    def __init__(self, description, key=None):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.key = key
+        self.subscribers = 1  # Sessions waiting on this job
+        self.state = "queued"  # queued -> running -> done / failed / cancelled
+        self.fraction = 0.0
+        self.status_text = "⏳ Waiting for a free fetch worker..."
+        self.messages = []
+        self.result = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+    
+    @property
+    def is_finished(self):
+        with self.lock:
+            return self.state in ("done", "failed", "cancelled")
+    
+    def start(self):
+        with self.lock:
+            self.state = "running"
+    
+    def finish(self, state, result=None):
+        """Record the outcome; sessions only see the job as finished once its result is in place."""
+        with self.lock:
+            self.result = result
+            self.finished_at = time.time()
+            self.state = state
+    
+    def get_messages(self):
+        with self.lock:
+            return list(self.messages)
+    
+    def snapshot(self):
+        with self.lock:
+            return {"state": self.state, "fraction": self.fraction, "status": self.status_text, "description": self.description}
+    
+    def progress(self, fraction):
+        with self.lock:
+            self.fraction = fraction
+    
+    def status(self, text):
+        with self.lock:
+            self.status_text = text
+    
+    def status_warning(self, text):
+        self.status(text)
+    
+    def _add_message(self, level, text):
+        with self.lock:
+            self.messages.append((level, text))
+    
+    def info(self, text):
+        self._add_message("info", text)
+    
+    def warning(self, text):
+        self._add_message("warning", text)
+    
+    def error(self, text):
+        self._add_message("error", text)
+    
+    def clear(self):
+        with self.lock:
+            self.fraction = 0.0
+            self.status_text = ""
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise FetchCancelled()
+
+class FetchResultCache:
+    """
+    🔥 Process-wide cache of results holding a contacts DataFrame ("df"): finished fetches keyed like
+    single-flight jobs, and session payloads keyed by dataset fingerprint.
+    Entries expire after the TTL; least recently used entries are evicted once the contacts
+    DataFrames they hold exceed max_bytes in total.
+    """
+    
+    def __init__(self, ttl_seconds=FETCH_RESULT_CACHE_TTL_SECONDS, max_bytes=FETCH_RESULT_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (result, stored_at, nbytes)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+    
+    def _evict(self, key):
+        _, _, nbytes = self.entries.pop(key)
+        self.total_bytes -= nbytes
+    
+    def get(self, key):
+        """Return (result, age in seconds) of a live entry, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            
+            result, stored_at, _ = entry
+            age = time.time() - stored_at
+            if age > self.ttl_seconds:
+                self._evict(key)
+                return None
+            
+            self.entries.move_to_end(key)
+            return result, age
+    
+    def put(self, key, result):
+        nbytes = int(result["df"].memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        
+        with self.lock:
+            if key in self.entries:
+                self._evict(key)
+            self.entries[key] = (result, time.time(), nbytes)
+            self.total_bytes += nbytes
+            
+            now = time.time()
+            for cached_key, (_, stored_at, _) in list(self.entries.items()):
+                if now - stored_at > self.ttl_seconds:
+                    self._evict(cached_key)
+            while self.total_bytes > self.max_bytes:
+                self._evict(next(iter(self.entries)))
+
+def get_fetch_key(date_field, start_date, end_date, incremental, project_properties, compact_schema):
+    """
+    Single-flight key: fetches agreeing on these return the same contacts, however they are carried out.
+    A full refetch never joins or reuses a delta sync, which trusts the contacts already stored.
+    """
+    return (
+        date_field, str(start_date), str(end_date),
+        "delta-sync" if incremental else "full-refetch",
+        "populated-properties" if project_properties else "all-properties",
+        "compact-schema" if compact_schema else "plain-schema"
+    )
+
+class FetchJobRegistry:
+    """
+    🔥 Process-wide registry of background fetch jobs with single-flight de-duplication.
+    Jobs run on a small thread pool, so a long pull never blocks the script run that started it or
+    any other session - sessions only keep the job id and poll it. A keyed request joins an identical
+    job that is still running, or is answered from the shared result cache, instead of fetching again.
+    """
+    
+    def __init__(self, max_workers=FETCH_JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hubspot-fetch-job")
+        self.jobs = {}
+        self.in_flight = {}  # key -> unfinished job
+        self.results = FetchResultCache()
+        self.lock = threading.Lock()
+    
+    def submit(self, description, fn, *args, key=None, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs) as a background job, or share an identical one.
+        Returns (job, notice) - notice tells the caller when an existing fetch was shared, else None.
+        """
+        with self.lock:
+            self._prune()
+            
+            if key is not None:
+                job = self.in_flight.get(key)
+                if job is not None and not job.cancel_event.is_set():
+                    job.subscribers += 1
+                    return job, "🤝 Joined an identical fetch that was already running - no extra HubSpot calls were made."
+                
+                cached = self.results.get(key)
+                if cached is not None:
+                    result, age = cached
+                    job = FetchJob(description, key)
+                    job.finish("done", result)
+                    self.jobs[job.id] = job
+                    return job, f"⚡ Reused an identical fetch from {age / 60:.0f} min ago - no HubSpot calls were made."
+            
+            job = FetchJob(description, key)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.in_flight[key] = job
+        
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job, None
+    
+    def _run(self, job, fn, args, kwargs):
+        job.start()
+        result = None
+        try:
+            job.check_cancelled()
+            result = fn(job, *args, **kwargs)
+            state = "done"
+        except FetchCancelled:
+            state = "cancelled"
+        except Exception as e:
+            job.error(f"❌ Unexpected error: {e}")
+            state = "failed"
+        
+        # Only clean, complete results are shared - failures and partial fetches must not be replayed.
+        # The result is cached before the job leaves in_flight, so identical requests always find one of them.
+        clean = not any(level in ("warning", "error") for level, _ in job.get_messages())
+        if job.key is not None and state == "done" and clean and not result["df"].empty:
+            self.results.put(job.key, result)
+        with self.lock:
+            if job.key is not None and self.in_flight.get(job.key) is job:
+                del self.in_flight[job.key]
+        job.finish(state, result)
+    
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def release(self, job_id, cancel=False):
+        """
+        Detach one session from a job. Once no session waits on it any more, a finished job is dropped
+        and, with cancel=True, an unfinished one is cancelled.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return
+            
+            if job.is_finished:
+                del self.jobs[job_id]
+            elif cancel:
+                job.cancel()
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]  # A new identical request must not join a dying job
+    
+    def _prune(self):
+        """Drop finished jobs whose sessions never collected them."""
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and now - job.finished_at > FETCH_JOB_RETENTION_SECONDS:
+                del self.jobs[job_id]
+
+@st.cache_resource(show_spinner=False)
+def get_fetch_job_registry():
+    """Process-wide fetch job registry, shared by every session and rerun."""
+    return FetchJobRegistry()
+
+def run_fetch_job(job, api_key, date_field, start_date, end_date, incremental=True, sharded=False,
+                  max_workers=FETCH_MAX_WORKERS, properties=None, compact_schema=True, base=None, client=None, store=None,
+                  analysis_cache=None, email_domain_cache=None):
+    """
+    Body of the "Fetch ALL Contacts" background job: connection test, sync, then the analysis the
+    dashboard shows, so the session only has to pick up the finished result. `base` is the session's
+    loaded (contacts, payload), patched instead of re-analyzed when the sync changed few contacts.
+    The job runs without a Streamlit script context, so the caller resolves the `properties` to request
+    (None: all of them) and the cached resources - `client`, `store`, `analysis_cache`, `email_domain_cache` -
+    on the script thread.
+    """
+    job.status("🔗 Testing API connection...")
+    success, message = test_hubspot_connection(api_key, client=client)
+    if not success:
+        job.error(f"Connection failed: {message}")
+        return {"df": pd.DataFrame(), "fetched": 0}
+    
+    job.check_cancelled()
+    df, total_fetched = sync_hubspot_contacts(
+        api_key, date_field, start_date, end_date,
+        incremental=incremental, sharded=sharded, max_workers=max_workers,
+        properties=properties, reporter=job, client=client, store=store
+    )
+    if df.empty:
+        return {"df": df, "fetched": total_fetched}
+    
+    job.check_cancelled()
+    df.attrs["properties"] = tuple(properties) if properties else None
+    if compact_schema:
+        df = compact_contacts_frame(df)
+    job.status(f"🔬 Analyzing {len(df):,} contacts...")
+    return {"df": df, "fetched": total_fetched, "session_payload": build_session_payload(df, base, analysis_cache, email_domain_cache)}
+
+@st.fragment(run_every=FETCH_JOB_POLL_SECONDS)
+def show_fetch_job_progress(job_id):
+    """Live progress of this session's background fetch; only this fragment reruns while the job is going."""
+    job = get_fetch_job_registry().get(job_id)
+    if job is None:
+        return
+    
+    if job.is_finished:
+        st.rerun()  # Full rerun, which collects the result
+    
+    snapshot = job.snapshot()
+    st.progress(snapshot["fraction"], text=snapshot["status"] or "⏳ Working...")
+    st.caption(f"🛰️ Fetching {snapshot['description']} in the background - the dashboard stays usable.")
+    
+    if st.button("⏹️ Cancel Fetch", use_container_width=True, key=f"cancel_fetch_{job_id}"):
+        # Other sessions may share this job - it only stops once nobody is waiting for it
+        get_fetch_job_registry().release(job_id, cancel=True)
+        st.session_state.fetch_job_id = None
+        st.session_state.fetch_notice = "⏹️ Fetch cancelled. Pages fetched so far were checkpointed - fetch again to resume."
+        st.rerun()
+
+def collect_finished_fetch_job():
+    """If this session's background fetch has finished, load its result and show its messages."""
+    notice = st.session_state.pop('fetch_notice', None)
+    if notice:
+        st.info(notice)
+    
+    job_id = st.session_state.get('fetch_job_id')
+    if not job_id:
+        return
+    
+    registry = get_fetch_job_registry()
+    job = registry.get(job_id)
+    if job is not None and not job.is_finished:
+        return
+    
+    st.session_state.fetch_job_id = None
+    if job is None:
+        return
+    registry.release(job_id)
+    
+    for level, text in job.messages:
+        getattr(st, level)(text)
+    
+    if job.state == "cancelled":
+        st.info("⏹️ Fetch cancelled. Pages fetched so far were checkpointed - fetch again to resume.")
+    elif job.state == "done":
+        # The result may be shared with other sessions: give this one its own (copy-on-write) frame
+        df = job.result["df"].copy(deep=False)
+        if not df.empty:
+            load_contacts_into_session(df, job.result["session_payload"])
+            st.success(f"✅ Successfully loaded ALL {len(df)} contacts with COMPLETE hierarchy!")
+        elif not any(level == "error" for level, _ in job.messages):
+            st.warning("No contacts found for the selected date range.")
 
 def main():
     # Header with gradient
@@ -1585,8 +4047,12 @@ def main():
         st.session_state.analysis_results = None
     if 'visualizations' not in st.session_state:
         st.session_state.visualizations = None
-    if 'email_validation' not in st.session_state:
-        st.session_state.email_validation = None
+    if 'contact_cube' not in st.session_state:
+        st.session_state.contact_cube = None
+    if 'contact_aggregator' not in st.session_state:
+        st.session_state.contact_aggregator = None
+    if 'fetch_job_id' not in st.session_state:
+        st.session_state.fetch_job_id = None
     
     # Create two columns for main layout
     col1, col2 = st.columns([3, 1])
@@ -1594,6 +4060,9 @@ def main():
     with col2:  # Sidebar-like configuration
         st.markdown("## 🔧 Configuration")
         
+        if HUBSPOT_API_BASE != HUBSPOT_DEFAULT_API_BASE:
+            st.caption(f"🧪 Using HubSpot API at {HUBSPOT_API_BASE}")
+        
         # Test connection button - uses hidden API key
         if st.button("🔗 Test API Connection", use_container_width=True):
             is_valid, message = test_hubspot_connection(HUBSPOT_API_KEY)
@@ -1626,6 +4095,31 @@ def main():
         days_diff = (end_date - start_date).days + 1
         st.info(f"📅 Will fetch ALL contacts from {days_diff} day(s)")
         
+        # 🔥 Sharded fetch: parallel time windows, bisected past the 10k search cap
+        sharded_fetch = st.checkbox(
+            "⚡ Parallel sharded fetch",
+            value=True,
+            help="Splits the date range into time windows fetched concurrently. "
+                 "Windows above HubSpot's 10,000-result search cap are bisected so large ranges are complete."
+        )
+        fetch_workers = st.slider("Fetch workers", 1, 8, FETCH_MAX_WORKERS, disabled=not sharded_fetch)
+        incremental_sync = st.checkbox(
+            "🔁 Incremental sync",
+            value=True,
+            help="After the first fetch of a date range, only contacts modified since the last sync are downloaded and merged in."
+        )
+        project_properties = st.checkbox(
+            "🎯 Fetch only populated properties",
+            value=True,
+            help="Skips contact properties that hold no data in this portal (checked once a day), so pages are smaller and faster."
+        )
+        compact_schema = st.checkbox(
+            "🗜️ Compact in-memory schema",
+            value=True,
+            help="Keeps low-cardinality fields (lead status, traffic source, country, reasons...) as categoricals and "
+                 "the Has * flags as booleans, so loaded contacts use far less memory and the analysis runs faster."
+        )
+        
         st.markdown(
             """
             <div class="warning-box">
@@ -1643,67 +4137,61 @@ def main():
         
         st.divider()
         
+        # 🔥 Background fetch finished? Load its result before anything else renders
+        collect_finished_fetch_job()
+        
+        # 🔥 Instant load: an already-synced range is served straight from the local contact store
+        if st.session_state.contacts_df is None and not st.session_state.get('skip_store_autoload'):
+            stored_df = load_synced_range(date_field, start_date, end_date)
+            if stored_df is not None and not stored_df.empty:
+                load_contacts_into_session(stored_df, compact_schema=compact_schema)
+                st.caption(f"💾 Loaded {len(stored_df):,} synced contacts from the local store. Fetch again to pull changes.")
+        
         # Quick Actions
         st.markdown("## ⚡ Quick Actions")
         
         fetch_col1, fetch_col2 = st.columns(2)
         
         with fetch_col1:
-            if st.button("🚀 Fetch ALL Contacts", type="primary", use_container_width=True):
+            fetch_running = st.session_state.fetch_job_id is not None
+            if st.button("🚀 Fetch ALL Contacts", type="primary", use_container_width=True, disabled=fetch_running):
                 if start_date > end_date:
                     st.error("Start date must be before end date.")
                 else:
-                    with st.spinner("Fetching ALL contacts with COMPLETE campaign hierarchy..."):
-                        # Test connection first
-                        success, message = test_hubspot_connection(HUBSPOT_API_KEY)
-                        
-                        if success:
-                            contacts, total_fetched = fetch_hubspot_contacts_with_date_filter(
-                                HUBSPOT_API_KEY, date_field, start_date, end_date
-                            )
-                            
-                            if contacts:
-                                df = process_contacts_data(contacts)
-                                st.session_state.contacts_df = df
-                                
-                                # Perform analysis
-                                analysis_results = analyze_contact_data(df)
-                                st.session_state.analysis_results = analysis_results
-                                
-                                # Create visualizations
-                                visualizations = create_visualizations(analysis_results, df)
-                                st.session_state.visualizations = visualizations
-                                
-                                # Email validation
-                                email_validation = analyze_email_validation(df)
-                                st.session_state.email_validation = email_validation
-                                
-                                st.success(f"✅ Successfully loaded ALL {len(contacts)} contacts with COMPLETE hierarchy!")
-                                st.rerun()
-                            else:
-                                st.warning("No contacts found for the selected date range.")
-                        else:
-                            st.error(f"Connection failed: {message}")
+                    # 🔥 Runs on a background worker; progress is polled below
+                    # 🔥 Single-flight: identical requests from any session share one fetch
+                    # Cached resources are resolved here: the worker has no Streamlit script context
+                    job, notice = get_fetch_job_registry().submit(
+                        f"{date_field} contacts from {start_date} to {end_date}", run_fetch_job,
+                        HUBSPOT_API_KEY, date_field, start_date, end_date,
+                        incremental=incremental_sync, sharded=sharded_fetch, max_workers=fetch_workers,
+                        properties=get_fetch_properties(HUBSPOT_API_KEY) if project_properties else None,
+                        compact_schema=compact_schema, base=get_loaded_contacts(),
+                        client=get_hubspot_client(HUBSPOT_API_KEY), store=get_contact_store(),
+                        analysis_cache=get_analysis_cache(), email_domain_cache=get_email_domain_cache(),
+                        key=get_fetch_key(date_field, start_date, end_date, incremental_sync, project_properties, compact_schema)
+                    )
+                    st.session_state.fetch_job_id = job.id
+                    st.session_state.fetch_notice = notice
         
         with fetch_col2:
             if st.button("🔄 Refresh Analysis", use_container_width=True):
                 if 'contacts_df' in st.session_state:
                     df = st.session_state.contacts_df
                     if df is not None and not df.empty:
-                        analysis_results = analyze_contact_data(df)
-                        st.session_state.analysis_results = analysis_results
-                        
-                        visualizations = create_visualizations(analysis_results, df)
-                        st.session_state.visualizations = visualizations
-                        
-                        email_validation = analyze_email_validation(df)
-                        st.session_state.email_validation = email_validation
+                        load_contacts_into_session(df, compact_schema=compact_schema)
                         
                         st.success("Analysis refreshed with COMPLETE hierarchy!")
                         st.rerun()
         
+        if st.session_state.fetch_job_id is not None:
+            show_fetch_job_progress(st.session_state.fetch_job_id)
+        
         if st.button("🗑️ Clear All Data", use_container_width=True):
+            if st.session_state.fetch_job_id is not None:
+                get_fetch_job_registry().release(st.session_state.fetch_job_id, cancel=True)
             st.session_state.clear()
+            st.session_state.skip_store_autoload = True
             st.rerun()
     
     with col1:  # Main content area
@@ -1722,6 +4210,19 @@ def main():
                 unsafe_allow_html=True
             )
             
+            contact_cube = st.session_state.contact_cube
+            if contact_cube is None:
+                contact_cube = st.session_state.contact_cube = ContactCube(df)
+            contact_aggregator = st.session_state.contact_aggregator
+            if contact_aggregator is None:
+                contact_aggregator = st.session_state.contact_aggregator = ContactAggregator(df)
+            
+            memory_bytes, memory_before = st.session_state.get('contacts_memory') or (get_frame_memory(df), None)
+            if memory_before:
+                st.caption(f"🗜️ Contacts use {memory_bytes / 1e6:,.1f} MB in memory (compacted from {memory_before / 1e6:,.1f} MB)")
+            else:
+                st.caption(f"💾 Contacts use {memory_bytes / 1e6:,.1f} MB in memory")
+            
             # 🔥 KPIS IN 5 COLUMNS
             st.markdown("## 📈 Key Performance Indicators")
             
@@ -1732,29 +4233,30 @@ def main():
                 st.metric("Total Contacts", f"{total_contacts:,}")
             
             with metric_col2:
-                email_count = df['Has Email'].sum()
+                email_count = contact_cube.total('Has Email')
                 email_percent = (email_count / len(df)) * 100 if len(df) > 0 else 0
                 st.metric("With Email", f"{email_count:,} ({email_percent:.1f}%)")
             
             with metric_col3:
-                phone_count = df['Has Phone'].sum()
+                phone_count = contact_cube.total('Has Phone')
                 phone_percent = (phone_count / len(df)) * 100 if len(df) > 0 else 0
                 st.metric("With Phone", f"{phone_count:,} ({phone_percent:.1f}%)")
             
             with metric_col4:
-                course_count = df['Has Course'].sum()
+                course_count = contact_cube.total('Has Course')
                 course_percent = (course_count / len(df)) * 100 if len(df) > 0 else 0
                 st.metric("With Course", f"{course_count:,} ({course_percent:.1f}%)")
                 
             with metric_col5:
                 # Calculate Qualified Revenue (Hot, Warm, Customer)
-                qualified_df = df[df['Lead Status'].isin(['Hot', 'Warm', 'Customer'])]
-                total_revenue = qualified_df['Revenue'].sum()
+                qualified_cells = contact_cube.select({'Lead Status': ['Hot', 'Warm', 'Customer']})
+                total_revenue = contact_cube.total('Revenue', qualified_cells)
                 st.metric("Qualified Revenue", f"₹{total_revenue:,.0f}")
             
             st.divider()
             
             # Create tabs for different sections
+            # 🦥 Only the open tab runs, so it alone computes the (lazy) analysis it shows
             tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
                 "📈 Lead Status Distribution", 
                 "📚 Course Distribution",
@@ -1764,765 +4266,779 @@ def main():
                 "🌍 Geographic Analysis", 
                 "📧 Email Validation",
                 "📥 Export Data"
-            ])
+            ], key="dashboard_tab", on_change="rerun")
             
             with tab1:  # LEAD STATUS DISTRIBUTION
-                st.markdown("### 📊 Lead Status Distribution")
-                
-                if st.session_state.analysis_results and 'lead_status_distribution' in st.session_state.analysis_results:
-                    lead_status_data = st.session_state.analysis_results['lead_status_distribution']
-                    sub_lead_df = st.session_state.analysis_results.get('sub_lead_status_distribution', pd.DataFrame())
+                if tab1.open:
+                    st.markdown("### 📊 Lead Status Distribution")
                     
-                    if not lead_status_data.empty:
-                        # 🔥 ADD FILTERS AT THE TOP
-                        st.markdown("#### 🔍 Filter View")
-                        col_f1, col_f2 = st.columns(2)
-                        
-                        unique_sources = sorted(df['Traffic Source'].dropna().unique()) if 'Traffic Source' in df.columns else []
-                        unique_dd2 = sorted(df['Campaign Drilldown 2'].dropna().unique()) if 'Campaign Drilldown 2' in df.columns else []
-                        
-                        with col_f1:
-                            selected_sources = st.multiselect("Traffic Source:", unique_sources, default=[], key="ls_traffic_source")
-                        with col_f2:
-                            selected_dd2s = st.multiselect("Drill-Down 2:", unique_dd2, default=[], key="ls_drilldown_2")
-                        
-                        # Filter dataframe based on selections
-                        filtered_df = df.copy()
-                        if selected_sources:
-                            filtered_df = filtered_df[filtered_df['Traffic Source'].isin(selected_sources)]
-                        if selected_dd2s:
-                            filtered_df = filtered_df[filtered_df['Campaign Drilldown 2'].isin(selected_dd2s)]
+                    if st.session_state.analysis_results and 'lead_status_distribution' in st.session_state.analysis_results:
+                        lead_status_data = st.session_state.analysis_results['lead_status_distribution']
+                        sub_lead_df = st.session_state.analysis_results.get('sub_lead_status_distribution', pd.DataFrame())
                         
-                        # Re-calculate status and sub-status counts based on filtered data
-                        # We need to re-run the aggregation logic on the filtered dataframe
-                        if not filtered_df.empty:
-                            # Recalculate Lead Status distribution
-                            ls_counts = filtered_df['Lead Status'].value_counts().reset_index()
-                            ls_counts.columns = ['Lead Status', 'Count']
-                            ls_counts = ls_counts.sort_values('Count', ascending=False)
+                        if not lead_status_data.empty:
+                            # 🔥 ADD FILTERS AT THE TOP
+                            st.markdown("#### 🔍 Filter View")
+                            col_f1, col_f2 = st.columns(2)
                             
-                            # Filter Sub Lead Status
-                            sub_filtered = filtered_df[filtered_df['Sub Lead Status'].notna() & (filtered_df['Sub Lead Status'] != '')]
-                            if not sub_filtered.empty:
-                                sub_counts = sub_filtered.groupby(['Lead Status', 'Sub Lead Status']).size().reset_index(name='Count')
-                                sub_counts = sub_counts.sort_values(['Lead Status', 'Count'], ascending=[True, False])
-                            else:
-                                sub_counts = pd.DataFrame(columns=['Lead Status', 'Sub Lead Status', 'Count'])
+                            unique_sources = contact_cube.values('Traffic Source')
+                            unique_dd2 = contact_cube.values('Campaign Drilldown 2')
                             
-                            # Display Excel-Style Hierarchical View
-                            st.markdown(f"#### 📑 Excel-Style Drill-down View (+) - {len(filtered_df):,} Records")
-                            available_ls = ls_counts['Lead Status'].tolist()
+                            with col_f1:
+                                selected_sources = st.multiselect("Traffic Source:", unique_sources, default=[], key="ls_traffic_source")
+                            with col_f2:
+                                selected_dd2s = st.multiselect("Drill-Down 2:", unique_dd2, default=[], key="ls_drilldown_2")
                             
-                            for status in available_ls:
-                                status_count = ls_counts[ls_counts['Lead Status'] == status]['Count'].sum()
-                                with st.expander(f"➕ {status} ({status_count:,})"):
-                                    sub_df_for_status = sub_counts[sub_counts['Lead Status'] == status][['Sub Lead Status', 'Count']]
-                                    if not sub_df_for_status.empty:
-                                        st.dataframe(sub_df_for_status, use_container_width=True, hide_index=True)
-                                    else:
-                                        st.info("No sub-lead statuses available for this category.")
+                            # Slice the contact cube based on selections
+                            ls_filters = {'Traffic Source': selected_sources, 'Campaign Drilldown 2': selected_dd2s}
+                            filtered_cells = contact_cube.select(ls_filters)
+                            filtered_count = contact_cube.total('Contacts', filtered_cells)
                             
-                            # Download option for filtered data
-                            st.divider()
-                            csv_filtered = filtered_df[['Lead Status', 'Sub Lead Status', 'Course/Program', 'Traffic Source', 'Campaign Drilldown 2']].to_csv(index=False)
-                            st.download_button(
-                                "📥 Download Filtered Lead Status Data",
-                                csv_filtered,
-                                "filtered_lead_status.csv",
-                                "text/csv"
-                            )
+                            # Re-calculate status and sub-status counts by rolling up the selected cells
+                            if filtered_count > 0:
+                                # Recalculate Lead Status distribution
+                                ls_counts = contact_cube.value_counts('Lead Status', filtered_cells).reset_index()
+                                ls_counts.columns = ['Lead Status', 'Count']
+                                ls_counts = ls_counts.sort_values('Count', ascending=False)
+                                
+                                # Filter Sub Lead Status
+                                sub_cells = filtered_cells & contact_cube.where('Sub Lead Status', exclude=[''])
+                                if sub_cells.any():
+                                    sub_counts = contact_cube.rollup(['Lead Status', 'Sub Lead Status'], mask=sub_cells).reset_index(name='Count')
+                                    sub_counts = sub_counts.sort_values(['Lead Status', 'Count'], ascending=[True, False])
+                                else:
+                                    sub_counts = pd.DataFrame(columns=['Lead Status', 'Sub Lead Status', 'Count'])
+                                
+                                # Display Excel-Style Hierarchical View
+                                st.markdown(f"#### 📑 Excel-Style Drill-down View (+) - {filtered_count:,} Records")
+                                available_ls = ls_counts['Lead Status'].tolist()
+                                
+                                for status in available_ls:
+                                    status_count = ls_counts[ls_counts['Lead Status'] == status]['Count'].sum()
+                                    with st.expander(f"➕ {status} ({status_count:,})"):
+                                        sub_df_for_status = sub_counts[sub_counts['Lead Status'] == status][['Sub Lead Status', 'Count']]
+                                        if not sub_df_for_status.empty:
+                                            st.dataframe(sub_df_for_status, use_container_width=True, hide_index=True)
+                                        else:
+                                            st.info("No sub-lead statuses available for this category.")
+                                
+                                # Download option for filtered data (rows are only gathered when clicked)
+                                st.divider()
+                                st.download_button(
+                                    "📥 Download Filtered Lead Status Data",
+                                    partial(
+                                        filtered_contacts_csv, df, ls_filters,
+                                        ['Lead Status', 'Sub Lead Status', 'Course/Program', 'Traffic Source', 'Campaign Drilldown 2']
+                                    ),
+                                    "filtered_lead_status.csv",
+                                    "text/csv"
+                                )
+                            else:
+                                st.warning("No data found for the selected filter combination.")
                         else:
-                            st.warning("No data found for the selected filter combination.")
+                            st.info("No lead status data available")
                     else:
-                        st.info("No lead status data available")
-                else:
-                    st.info("No lead status analysis available")
+                        st.info("No lead status analysis available")
 
             
             with tab2:  # COURSE DISTRIBUTION
-                st.markdown("### 📚 Course/Program Distribution")
-                
-                if st.session_state.analysis_results and 'course_distribution' in st.session_state.analysis_results:
-                    course_data = st.session_state.analysis_results['course_distribution']
+                if tab2.open:
+                    st.markdown("### 📚 Course/Program Distribution")
+                    
+                    if st.session_state.analysis_results and 'course_distribution' in st.session_state.analysis_results:
+                        course_data = st.session_state.analysis_results['course_distribution']
+                        
+                        if not course_data.empty:
+                            col_c1, col_c2 = st.columns([2, 1])
+                            
+                            with col_c1:
+                                # Display the table with Course and Count
+                                st.markdown("#### Course Counts")
+                                st.dataframe(
+                                    course_data,
+                                    use_container_width=True,
+                                    height=400,
+                                    column_config={
+                                        "Course": st.column_config.TextColumn("Course/Program", width="medium"),
+                                        "Count": st.column_config.NumberColumn("Count", format="%d", width="small")
+                                    }
+                                )
+                            
+                            with col_c2:
+                                # Download button
+                                csv_course = course_data.to_csv(index=False)
+                                st.download_button(
+                                    "📥 Download Courses",
+                                    csv_course,
+                                    "course_distribution.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
+                                
+                                # Quick stats
+                                total_courses = course_data['Count'].sum()
+                                top_course = course_data.iloc[0]['Course'] if len(course_data) > 0 else "N/A"
+                                top_course_count = course_data.iloc[0]['Count'] if len(course_data) > 0 else 0
+                                
+                                st.metric("Total Course Records", total_courses)
+                                st.metric("Top Course", top_course[:15], delta=f"{top_course_count} records")
+                                
+                                # Show course badges for top courses
+                                if len(course_data) > 0:
+                                    st.markdown("#### Top Courses")
+                                    top_courses = course_data.head(5)
+                                    for _, row in top_courses.iterrows():
+                                        st.markdown(
+                                            f'<span class="course-badge">{row["Course"]}: {row["Count"]}</span>',
+                                            unsafe_allow_html=True
+                                        )
+                                
+                                # Pie chart
+                                if len(course_data) > 0:
+                                    fig = px.pie(
+                                        course_data.head(8),
+                                        values='Count',
+                                        names='Course',
+                                        title="Top Course Distribution",
+                                        hole=0.4
+                                    )
+                                    fig.update_traces(textposition='inside', textinfo='percent+label')
+                                    st.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.info("No course/program data available")
+                            
+                            # Show how many contacts have course info
+                            course_count = contact_cube.total('Has Course')
+                            if course_count > 0:
+                                st.info(f"Found {course_count} contacts with course/program information")
+                            else:
+                                st.warning("No course/program information found in the contacts data")
+                    else:
+                        st.info("No course distribution analysis available")
+            
+            with tab3:  # 🎯 COURSE QUALITY ANALYSIS
+                if tab3.open:
+                    st.markdown("### 🎯 Course-wise Lead Quality Analysis")
+                    st.markdown("*Pivot table showing lead status distribution by course/program with quality metrics*")
                     
-                    if not course_data.empty:
-                        col_c1, col_c2 = st.columns([2, 1])
+                    if st.session_state.analysis_results and 'course_quality' in st.session_state.analysis_results:
+                        quality_df = st.session_state.analysis_results['course_quality']
                         
-                        with col_c1:
-                            # Display the table with Course and Count
-                            st.markdown("#### Course Counts")
+                        if not quality_df.empty:
+                            # Display metrics summary
+                            col_q1, col_q2, col_q3 = st.columns(3)
+                            
+                            with col_q1:
+                                total_courses = len(quality_df)
+                                st.metric("Total Courses", total_courses)
+                            
+                            with col_q2:
+                                avg_low_quality = quality_df['Low Quality %'].mean()
+                                st.metric("Avg Low Quality %", f"{avg_low_quality:.1f}%")
+                            
+                            with col_q3:
+                                avg_good_quality = quality_df['Good Quality %'].mean()
+                                st.metric("Avg Good Quality %", f"{avg_good_quality:.1f}%")
+                            
+                            st.divider()
+                            
+                            # Display the main course quality table using Streamlit dataframe
+                            st.markdown("#### Course Quality Matrix")
+                            
+                            # Create a copy for display with formatting
+                            display_df = quality_df.copy()
+                            
+                            # Store original numeric values for comparison
+                            low_quality_values = display_df['Low Quality %'].copy()
+                            good_quality_values = display_df['Good Quality %'].copy()
+                            
+                            # Format numeric columns for better display
+                            format_columns = [
+                                'Not Connected (NC)', 'Not Interested', 'Not Qualified',
+                                'Cold', 'Duplicate', 'Warm', 'Hot', 'Future Prospect',
+                                'Customer', 'New Lead', 'Upselling', 'Course Shifting',
+                                'Low Quality Leads', 'Good Quality Leads',
+                                'Grand Total'
+                            ]
+                            
+                            # Apply formatting to integer columns
+                            for col in format_columns:
+                                if col in display_df.columns:
+                                    display_df[col] = display_df[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "0")
+                            
+                            # Format percentage columns
+                            display_df['Low Quality %'] = display_df['Low Quality %'].apply(lambda x: f"{x:.1f}%")
+                            display_df['Good Quality %'] = display_df['Good Quality %'].apply(lambda x: f"{x:.1f}%")
+                            
+                            # Display the dataframe with proper scrolling
                             st.dataframe(
-                                course_data,
+                                display_df,
                                 use_container_width=True,
-                                height=400,
+                                height=500,
                                 column_config={
-                                    "Course": st.column_config.TextColumn("Course/Program", width="medium"),
-                                    "Count": st.column_config.NumberColumn("Count", format="%d", width="small")
+                                    "Course/Program": st.column_config.TextColumn("Course/Program", width="large"),
+                                    "Low Quality %": st.column_config.TextColumn("Low Quality %", width="small"),
+                                    "Good Quality %": st.column_config.TextColumn("Good Quality %", width="small"),
+                                    "Grand Total": st.column_config.TextColumn("Total Leads", width="small")
                                 }
                             )
-                        
-                        with col_c2:
-                            # Download button
-                            csv_course = course_data.to_csv(index=False)
-                            st.download_button(
-                                "📥 Download Courses",
-                                csv_course,
-                                "course_distribution.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
                             
-                            # Quick stats
-                            total_courses = course_data['Count'].sum()
-                            top_course = course_data.iloc[0]['Course'] if len(course_data) > 0 else "N/A"
-                            top_course_count = course_data.iloc[0]['Count'] if len(course_data) > 0 else 0
+                            # Legend
+                            st.markdown("""
+                            <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 0.5rem; margin-top: 1rem;">
+                                <strong>🎯 Quality Metrics Legend:</strong>
+                                <ul style="margin-bottom: 0;">
+                                    <li><strong>Low Quality</strong> = Not Interested + Not Qualified</li>
+                                    <li><strong>Good Quality</strong> = Cold + Warm + Hot</li>
+                                    <li><strong>Low Quality %</strong> = Percentage of low quality leads</li>
+                                    <li><strong>Good Quality %</strong> = Percentage of good quality leads</li>
+                                </ul>
+                                <p style="margin-top: 0.5rem; margin-bottom: 0; font-size: 0.9rem;">
+                                    <span style="background-color: #f8d7da; color: #721c24; padding: 0.2rem 0.5rem; border-radius: 0.2rem; font-weight: bold;">🔴</span> 
+                                    Low Quality % > 40% indicates high number of disqualified leads<br>
+                                    <span style="background-color: #d4edda; color: #155724; padding: 0.2rem 0.5rem; border-radius: 0.2rem; font-weight: bold;">🟢</span> 
+                                    Good Quality % > 50% indicates strong lead pipeline
+                                </p>
+                            </div>
+                            """, unsafe_allow_html=True)
                             
-                            st.metric("Total Course Records", total_courses)
-                            st.metric("Top Course", top_course[:15], delta=f"{top_course_count} records")
-                            
-                            # Show course badges for top courses
-                            if len(course_data) > 0:
-                                st.markdown("#### Top Courses")
-                                top_courses = course_data.head(5)
-                                for _, row in top_courses.iterrows():
-                                    st.markdown(
-                                        f'<span class="course-badge">{row["Course"]}: {row["Count"]}</span>',
-                                        unsafe_allow_html=True
-                                    )
+                            # Download and additional options
+                            st.divider()
+                            col_dl1, col_dl2, col_dl3 = st.columns(3)
                             
-                            # Pie chart
-                            if len(course_data) > 0:
-                                fig = px.pie(
-                                    course_data.head(8),
-                                    values='Count',
-                                    names='Course',
-                                    title="Top Course Distribution",
-                                    hole=0.4
+                            with col_dl1:
+                                csv_quality = quality_df.to_csv(index=False)
+                                st.download_button(
+                                    "📥 Download Course Quality Data",
+                                    csv_quality,
+                                    "course_quality_analysis.csv",
+                                    "text/csv",
+                                    use_container_width=True
                                 )
-                                fig.update_traces(textposition='inside', textinfo='percent+label')
-                                st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info("No course/program data available")
+                            
+                            with col_dl2:
+                                # Show raw numeric data
+                                if st.button("📊 View Raw Numeric Data", use_container_width=True):
+                                    st.dataframe(quality_df, use_container_width=True, height=400)
+                            
+                            with col_dl3:
+                                # Show top 5 courses by quality
+                                if st.button("🏆 Show Top 5 Quality Courses", use_container_width=True):
+                                    top_courses = quality_df.sort_values('Good Quality %', ascending=False).head(5)
+                                    st.dataframe(top_courses[['Course/Program', 'Good Quality %', 'Low Quality %', 'Grand Total']], 
+                                               use_container_width=True)
+                            
+                            # Additional insights
+                            with st.expander("📈 Quality Insights", expanded=False):
+                                # Find best and worst courses
+                                best_course = quality_df.loc[quality_df['Good Quality %'].idxmax()]
+                                worst_course = quality_df.loc[quality_df['Low Quality %'].idxmax()]
+                                
+                                col_ins1, col_ins2 = st.columns(2)
+                                
+                                with col_ins1:
+                                    st.markdown("**🏆 Best Quality Course**")
+                                    st.metric(
+                                        label=best_course['Course/Program'],
+                                        value=f"{best_course['Good Quality %']:.1f}% Good Quality",
+                                        delta=f"{best_course['Grand Total']} total leads"
+                                    )
+                                
+                                with col_ins2:
+                                    st.markdown("**⚠️ Highest Low Quality Course**")
+                                    st.metric(
+                                        label=worst_course['Course/Program'],
+                                        value=f"{worst_course['Low Quality %']:.1f}% Low Quality",
+                                        delta=f"{worst_course['Grand Total']} total leads"
+                                    )
+                                
+                                # Quality distribution
+                                st.markdown("**📊 Quality Distribution**")
+                                high_quality = (quality_df['Good Quality %'] > 50).sum()
+                                medium_quality = ((quality_df['Good Quality %'] >= 30) & (quality_df['Good Quality %'] <= 50)).sum()
+                                low_quality = (quality_df['Good Quality %'] < 30).sum()
+                                
+                                quality_dist = pd.DataFrame({
+                                    'Quality Level': ['High (>50%)', 'Medium (30-50%)', 'Low (<30%)'],
+                                    'Number of Courses': [high_quality, medium_quality, low_quality]
+                                })
+                                st.dataframe(quality_dist, use_container_width=True)
                         
-                        # Show how many contacts have course info
-                        course_count = df['Has Course'].sum()
-                        if course_count > 0:
-                            st.info(f"Found {course_count} contacts with course/program information")
                         else:
-                            st.warning("No course/program information found in the contacts data")
-                else:
-                    st.info("No course distribution analysis available")
+                            st.info("No course quality data available (no contacts with course information)")
+                    else:
+                        st.info("No course quality analysis available")
             
-            with tab3:  # 🎯 COURSE QUALITY ANALYSIS
-                st.markdown("### 🎯 Course-wise Lead Quality Analysis")
-                st.markdown("*Pivot table showing lead status distribution by course/program with quality metrics*")
-                
-                if st.session_state.analysis_results and 'course_quality' in st.session_state.analysis_results:
-                    quality_df = st.session_state.analysis_results['course_quality']
+            with tab4:  # 📣 COMPLETE CAMPAIGN PERFORMANCE ANALYSIS
+                if tab4.open:
+                    st.markdown("### 📣 COMPLETE Campaign Performance (3-Level Hierarchy)")
+                    st.markdown("*Full HubSpot hierarchy: Traffic Source → Campaign → Drill-Down 2 → Lead Status*")
                     
-                    if not quality_df.empty:
-                        # Display metrics summary
-                        col_q1, col_q2, col_q3 = st.columns(3)
-                        
-                        with col_q1:
-                            total_courses = len(quality_df)
-                            st.metric("Total Courses", total_courses)
-                        
-                        with col_q2:
-                            avg_low_quality = quality_df['Low Quality %'].mean()
-                            st.metric("Avg Low Quality %", f"{avg_low_quality:.1f}%")
-                        
-                        with col_q3:
-                            avg_good_quality = quality_df['Good Quality %'].mean()
-                            st.metric("Avg Good Quality %", f"{avg_good_quality:.1f}%")
-                        
-                        st.divider()
-                        
-                        # Display the main course quality table using Streamlit dataframe
-                        st.markdown("#### Course Quality Matrix")
-                        
-                        # Create a copy for display with formatting
-                        display_df = quality_df.copy()
-                        
-                        # Store original numeric values for comparison
-                        low_quality_values = display_df['Low Quality %'].copy()
-                        good_quality_values = display_df['Good Quality %'].copy()
-                        
-                        # Format numeric columns for better display
-                        format_columns = [
-                            'Not Connected (NC)', 'Not Interested', 'Not Qualified',
-                            'Cold', 'Duplicate', 'Warm', 'Hot', 'Future Prospect',
-                            'Customer', 'New Lead', 'Upselling', 'Course Shifting',
-                            'Low Quality Leads', 'Good Quality Leads',
-                            'Grand Total'
-                        ]
-                        
-                        # Apply formatting to integer columns
-                        for col in format_columns:
-                            if col in display_df.columns:
-                                display_df[col] = display_df[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "0")
-                        
-                        # Format percentage columns
-                        display_df['Low Quality %'] = display_df['Low Quality %'].apply(lambda x: f"{x:.1f}%")
-                        display_df['Good Quality %'] = display_df['Good Quality %'].apply(lambda x: f"{x:.1f}%")
-                        
-                        # Display the dataframe with proper scrolling
-                        st.dataframe(
-                            display_df,
-                            use_container_width=True,
-                            height=500,
-                            column_config={
-                                "Course/Program": st.column_config.TextColumn("Course/Program", width="large"),
-                                "Low Quality %": st.column_config.TextColumn("Low Quality %", width="small"),
-                                "Good Quality %": st.column_config.TextColumn("Good Quality %", width="small"),
-                                "Grand Total": st.column_config.TextColumn("Total Leads", width="small")
-                            }
-                        )
-                        
-                        # Legend
-                        st.markdown("""
-                        <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 0.5rem; margin-top: 1rem;">
-                            <strong>🎯 Quality Metrics Legend:</strong>
-                            <ul style="margin-bottom: 0;">
-                                <li><strong>Low Quality</strong> = Not Interested + Not Qualified</li>
-                                <li><strong>Good Quality</strong> = Cold + Warm + Hot</li>
-                                <li><strong>Low Quality %</strong> = Percentage of low quality leads</li>
-                                <li><strong>Good Quality %</strong> = Percentage of good quality leads</li>
-                            </ul>
-                            <p style="margin-top: 0.5rem; margin-bottom: 0; font-size: 0.9rem;">
-                                <span style="background-color: #f8d7da; color: #721c24; padding: 0.2rem 0.5rem; border-radius: 0.2rem; font-weight: bold;">🔴</span> 
-                                Low Quality % > 40% indicates high number of disqualified leads<br>
-                                <span style="background-color: #d4edda; color: #155724; padding: 0.2rem 0.5rem; border-radius: 0.2rem; font-weight: bold;">🟢</span> 
-                                Good Quality % > 50% indicates strong lead pipeline
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    if st.session_state.analysis_results and 'campaign_performance' in st.session_state.analysis_results:
+                        campaign_df = st.session_state.analysis_results['campaign_performance']
                         
-                        # Download and additional options
-                        st.divider()
-                        col_dl1, col_dl2, col_dl3 = st.columns(3)
-                        
-                        with col_dl1:
-                            csv_quality = quality_df.to_csv(index=False)
-                            st.download_button(
-                                "📥 Download Course Quality Data",
-                                csv_quality,
-                                "course_quality_analysis.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
-                        
-                        with col_dl2:
-                            # Show raw numeric data
-                            if st.button("📊 View Raw Numeric Data", use_container_width=True):
-                                st.dataframe(quality_df, use_container_width=True, height=400)
-                        
-                        with col_dl3:
-                            # Show top 5 courses by quality
-                            if st.button("🏆 Show Top 5 Quality Courses", use_container_width=True):
-                                top_courses = quality_df.sort_values('Good Quality %', ascending=False).head(5)
-                                st.dataframe(top_courses[['Course/Program', 'Good Quality %', 'Low Quality %', 'Grand Total']], 
-                                           use_container_width=True)
-                        
-                        # Additional insights
-                        with st.expander("📈 Quality Insights", expanded=False):
-                            # Find best and worst courses
-                            best_course = quality_df.loc[quality_df['Good Quality %'].idxmax()]
-                            worst_course = quality_df.loc[quality_df['Low Quality %'].idxmax()]
+                        if not campaign_df.empty:
+                            # Campaign Performance Metrics
+                            col_camp1, col_camp2, col_camp3, col_camp4 = st.columns(4)
                             
-                            col_ins1, col_ins2 = st.columns(2)
+                            with col_camp1:
+                                total_campaigns = len(campaign_df)
+                                st.metric("Total Campaign Paths", total_campaigns)
                             
-                            with col_ins1:
-                                st.markdown("**🏆 Best Quality Course**")
-                                st.metric(
-                                    label=best_course['Course/Program'],
-                                    value=f"{best_course['Good Quality %']:.1f}% Good Quality",
-                                    delta=f"{best_course['Grand Total']} total leads"
+                            with col_camp2:
+                                avg_quality = campaign_df['Quality Leads %'].mean()
+                                st.metric("Avg Quality %", f"{avg_quality:.1f}%")
+                            
+                            with col_camp3:
+                                total_leads = campaign_df['Grand Total'].sum()
+                                st.metric("Total Campaign Leads", f"{total_leads:,}")
+                            
+                            with col_camp4:
+                                drilldown2_count = campaign_df['Campaign Drilldown 2'].nunique()
+                                st.metric("Unique Drill-Down 2", drilldown2_count)
+                            
+                            # Show hierarchy visualization
+                            st.markdown("#### 🎯 HubSpot Analytics Hierarchy")
+                            st.markdown("""
+                            <div style="background-color: #f0f7ff; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;">
+                                <div class="hierarchy-level-1">📍 Level 1: hs_analytics_source (Traffic Source)</div>
+                                <div class="hierarchy-level-2">📋 Level 2: hs_analytics_source_data_1 (Campaign Name)</div>
+                                <div class="hierarchy-level-3">🎯 Level 3: hs_analytics_source_data_2 (Ad/Keyword/Placement)</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                            
+                            st.divider()
+                            
+                            # 🔥 COMPLETE FILTER SYSTEM
+                            st.markdown("#### 🔍 Filter by Hierarchy Level")
+                            col_filter1, col_filter2, col_filter3 = st.columns(3)
+                            
+                            with col_filter1:
+                                # Traffic Source Filter
+                                unique_sources = sorted(campaign_df['Traffic Source'].unique())
+                                selected_sources = st.multiselect(
+                                    "Traffic Source:",
+                                    unique_sources,
+                                    default=[],
+                                    key="traffic_source_filter"
                                 )
                             
-                            with col_ins2:
-                                st.markdown("**⚠️ Highest Low Quality Course**")
-                                st.metric(
-                                    label=worst_course['Course/Program'],
-                                    value=f"{worst_course['Low Quality %']:.1f}% Low Quality",
-                                    delta=f"{worst_course['Grand Total']} total leads"
+                            with col_filter2:
+                                # Campaign Name Filter
+                                if selected_sources:
+                                    source_campaigns = sorted(campaign_df[campaign_df['Traffic Source'].isin(selected_sources)]['Campaign Name'].unique())
+                                else:
+                                    source_campaigns = sorted(campaign_df['Campaign Name'].unique())
+                                
+                                selected_campaigns = st.multiselect(
+                                    "Campaign Name:",
+                                    source_campaigns,
+                                    default=[],
+                                    key="campaign_filter"
                                 )
                             
-                            # Quality distribution
-                            st.markdown("**📊 Quality Distribution**")
-                            high_quality = (quality_df['Good Quality %'] > 50).sum()
-                            medium_quality = ((quality_df['Good Quality %'] >= 30) & (quality_df['Good Quality %'] <= 50)).sum()
-                            low_quality = (quality_df['Good Quality %'] < 30).sum()
+                            with col_filter3:
+                                # 🔥 Drill-Down 2 Filter
+                                temp_df = campaign_df.copy()
+                                if selected_sources:
+                                    temp_df = temp_df[temp_df['Traffic Source'].isin(selected_sources)]
+                                if selected_campaigns:
+                                    temp_df = temp_df[temp_df['Campaign Name'].isin(selected_campaigns)]
+                                
+                                source_campaign_dd2 = sorted(temp_df['Campaign Drilldown 2'].unique())
+                                
+                                selected_dd2s = st.multiselect(
+                                    "Drill-Down 2:",
+                                    source_campaign_dd2,
+                                    default=[],
+                                    key="drilldown2_filter"
+                                )
                             
-                            quality_dist = pd.DataFrame({
-                                'Quality Level': ['High (>50%)', 'Medium (30-50%)', 'Low (<30%)'],
-                                'Number of Courses': [high_quality, medium_quality, low_quality]
-                            })
-                            st.dataframe(quality_dist, use_container_width=True)
+                            # Apply filters
+                            filtered_df = campaign_df.copy()
+                            filter_messages = []
                             
-                    else:
-                        st.info("No course quality data available (no contacts with course information)")
-                else:
-                    st.info("No course quality analysis available")
-            
-            with tab4:  # 📣 COMPLETE CAMPAIGN PERFORMANCE ANALYSIS
-                st.markdown("### 📣 COMPLETE Campaign Performance (3-Level Hierarchy)")
-                st.markdown("*Full HubSpot hierarchy: Traffic Source → Campaign → Drill-Down 2 → Lead Status*")
-                
-                if st.session_state.analysis_results and 'campaign_performance' in st.session_state.analysis_results:
-                    campaign_df = st.session_state.analysis_results['campaign_performance']
-                    
-                    if not campaign_df.empty:
-                        # Campaign Performance Metrics
-                        col_camp1, col_camp2, col_camp3, col_camp4 = st.columns(4)
-                        
-                        with col_camp1:
-                            total_campaigns = len(campaign_df)
-                            st.metric("Total Campaign Paths", total_campaigns)
-                        
-                        with col_camp2:
-                            avg_quality = campaign_df['Quality Leads %'].mean()
-                            st.metric("Avg Quality %", f"{avg_quality:.1f}%")
-                        
-                        with col_camp3:
-                            total_leads = campaign_df['Grand Total'].sum()
-                            st.metric("Total Campaign Leads", f"{total_leads:,}")
-                        
-                        with col_camp4:
-                            drilldown2_count = campaign_df['Campaign Drilldown 2'].nunique()
-                            st.metric("Unique Drill-Down 2", drilldown2_count)
-                        
-                        # Show hierarchy visualization
-                        st.markdown("#### 🎯 HubSpot Analytics Hierarchy")
-                        st.markdown("""
-                        <div style="background-color: #f0f7ff; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;">
-                            <div class="hierarchy-level-1">📍 Level 1: hs_analytics_source (Traffic Source)</div>
-                            <div class="hierarchy-level-2">📋 Level 2: hs_analytics_source_data_1 (Campaign Name)</div>
-                            <div class="hierarchy-level-3">🎯 Level 3: hs_analytics_source_data_2 (Ad/Keyword/Placement)</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        st.divider()
-                        
-                        # 🔥 COMPLETE FILTER SYSTEM
-                        st.markdown("#### 🔍 Filter by Hierarchy Level")
-                        col_filter1, col_filter2, col_filter3 = st.columns(3)
-                        
-                        with col_filter1:
-                            # Traffic Source Filter
-                            unique_sources = sorted(campaign_df['Traffic Source'].unique())
-                            selected_sources = st.multiselect(
-                                "Traffic Source:",
-                                unique_sources,
-                                default=[],
-                                key="traffic_source_filter"
-                            )
-                        
-                        with col_filter2:
-                            # Campaign Name Filter
                             if selected_sources:
-                                source_campaigns = sorted(campaign_df[campaign_df['Traffic Source'].isin(selected_sources)]['Campaign Name'].unique())
-                            else:
-                                source_campaigns = sorted(campaign_df['Campaign Name'].unique())
+                                filtered_df = filtered_df[filtered_df['Traffic Source'].isin(selected_sources)]
+                                filter_messages.append(f"Traffic Sources: {', '.join(selected_sources)}")
                             
-                            selected_campaigns = st.multiselect(
-                                "Campaign Name:",
-                                source_campaigns,
-                                default=[],
-                                key="campaign_filter"
-                            )
-                        
-                        with col_filter3:
-                            # 🔥 Drill-Down 2 Filter
-                            temp_df = campaign_df.copy()
-                            if selected_sources:
-                                temp_df = temp_df[temp_df['Traffic Source'].isin(selected_sources)]
                             if selected_campaigns:
-                                temp_df = temp_df[temp_df['Campaign Name'].isin(selected_campaigns)]
+                                filtered_df = filtered_df[filtered_df['Campaign Name'].isin(selected_campaigns)]
+                                filter_messages.append(f"Campaigns: {', '.join(selected_campaigns)}")
+                            
+                            if selected_dd2s:
+                                filtered_df = filtered_df[filtered_df['Campaign Drilldown 2'].isin(selected_dd2s)]
+                                filter_messages.append(f"Drill-Down 2s: {', '.join(selected_dd2s)}")
+                            
+                            # Show filter summary
+                            if filter_messages:
+                                st.success(f"🔍 Filtered: {', '.join(filter_messages)} - Showing {len(filtered_df)} paths")
+                            else:
+                                st.info(f"Showing all {len(filtered_df)} campaign paths across {len(unique_sources)} traffic sources")
+                            
+                            # Show hierarchy badges
+                            st.markdown("**Hierarchy Distribution:**")
+                            
+                            # Traffic Source badges
+                            source_counts = campaign_df['Traffic Source'].value_counts()
+                            for source, count in source_counts.head(8).items():
+                                st.markdown(f'<span class="traffic-badge">{source}: {count}</span>', unsafe_allow_html=True)
+                            
+                            # Drill-Down 2 badges (if applicable)
+                            if selected_sources and not filtered_df.empty:
+                                dd2_counts = filtered_df['Campaign Drilldown 2'].value_counts()
+                                if len(dd2_counts) > 0:
+                                    st.markdown("**Drill-Down 2 Values:**")
+                                    for dd2, count in dd2_counts.head(10).items():
+                                        if dd2:  # Skip empty
+                                            st.markdown(f'<span class="drilldown-badge">{dd2[:30]}: {count}</span>', unsafe_allow_html=True)
+                            
+                            st.divider()
+                            
+                            # Display the COMPLETE campaign performance table
+                            st.markdown("#### 📊 Complete Campaign Performance Matrix")
                             
-                            source_campaign_dd2 = sorted(temp_df['Campaign Drilldown 2'].unique())
+                            # Create a copy for display with formatting
+                            display_campaign_df = filtered_df.copy()
                             
-                            selected_dd2s = st.multiselect(
-                                "Drill-Down 2:",
-                                source_campaign_dd2,
-                                default=[],
-                                key="drilldown2_filter"
+                            # Define columns to format as integers
+                            int_columns = [
+                                'Cold', 'Warm', 'Hot', 'New Lead', 'Customer',
+                                'Not Connected (NC)', 'Not Interested', 'Not Qualified',
+                                'Duplicate', 'Upselling', 'Course Shifting',
+                                'Quality Leads (Hot+Warm+Customer)', 'Disqualified Leads', 'Grand Total'
+                            ]
+                            
+                            # Format integer columns
+                            for col in int_columns:
+                                if col in display_campaign_df.columns:
+                                    display_campaign_df[col] = display_campaign_df[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "0")
+                            
+                            # Format percentage columns
+                            display_campaign_df['Quality Leads %'] = display_campaign_df['Quality Leads %'].apply(lambda x: f"{x:.1f}%")
+                            display_campaign_df['Disqualified %'] = display_campaign_df['Disqualified %'].apply(lambda x: f"{x:.1f}%")
+                            
+                            # Display the dataframe with proper scrolling
+                            st.dataframe(
+                                display_campaign_df,
+                                use_container_width=True,
+                                height=600,
+                                column_config={
+                                    "Traffic Source": st.column_config.TextColumn("Traffic Source", width="medium"),
+                                    "Campaign Name": st.column_config.TextColumn("Campaign Name", width="large"),
+                                    "Campaign Drilldown 2": st.column_config.TextColumn("Drill-Down 2", width="medium"),
+                                    "Quality Leads %": st.column_config.TextColumn("Quality %", width="small"),
+                                    "Grand Total": st.column_config.TextColumn("Total", width="small")
+                                }
                             )
+                            
+                            # Legend
+                            st.markdown("""
+                            <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 0.5rem; margin-top: 1rem;">
+                                <strong>🎯 Campaign Performance Metrics:</strong>
+                                <ul style="margin-bottom: 0;">
+                                    <li><strong>Quality Leads</strong> = Hot + Warm + Customer (high-value leads)</li>
+                                    <li><strong>Disqualified Leads</strong> = Not Interested + Not Qualified</li>
+                                    <li><strong>Quality Leads %</strong> = Percentage of high-quality leads</li>
+                                    <li><strong>Disqualified %</strong> = Percentage of disqualified leads</li>
+                                    <li><strong>Drill-Down 2</strong> = Ad name, Keyword, Placement, or specific element</li>
+                                </ul>
+                                <p style="margin-top: 0.5rem; margin-bottom: 0; font-size: 0.9rem;">
+                                    <span class="campaign-good">✅ High Quality % (>50%) indicates effective campaigns</span><br>
+                                    <span class="campaign-bad">⚠️ High Disqualified % (>30%) indicates poor targeting</span>
+                                </p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                            
+                            # Download and drill-down options
+                            st.divider()
+                            col_camp_dl1, col_camp_dl2, col_camp_dl3 = st.columns(3)
+                            
+                            with col_camp_dl1:
+                                csv_campaign = filtered_df.to_csv(index=False)
+                                st.download_button(
+                                    "📥 Download COMPLETE Campaign Data",
+                                    csv_campaign,
+                                    f"complete_campaign_performance_{datetime.now().strftime('%Y%m%d')}.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
+                            
+                            with col_camp_dl2:
+                                # Show raw numeric data
+                                if st.button("📊 View Raw Campaign Data", use_container_width=True, key="view_raw_campaign"):
+                                    st.dataframe(filtered_df, use_container_width=True, height=400)
+                            
+                            with col_camp_dl3:
+                                # Show top 5 paths by quality
+                                if st.button("🏆 Show Top 5 Performing Paths", use_container_width=True, key="top5_paths"):
+                                    top_paths = filtered_df.sort_values('Quality Leads %', ascending=False).head(5)
+                                    st.dataframe(
+                                        top_paths[['Traffic Source', 'Campaign Name', 'Campaign Drilldown 2', 'Quality Leads %', 'Disqualified %', 'Grand Total']], 
+                                        use_container_width=True
+                                    )
+                            
+                            # Additional insights
+                            with st.expander("📈 Campaign Insights", expanded=False):
+                                # Find best and worst paths
+                                if not filtered_df.empty:
+                                    best_path = filtered_df.loc[filtered_df['Quality Leads %'].idxmax()]
+                                    worst_path = filtered_df.loc[filtered_df['Disqualified %'].idxmax()]
+                                    
+                                    col_ins1, col_ins2 = st.columns(2)
+                                    
+                                    with col_ins1:
+                                        st.markdown("**🏆 Best Performing Path**")
+                                        path_label = f"{best_path['Traffic Source']} → {best_path['Campaign Name'][:20]}"
+                                        if best_path['Campaign Drilldown 2']:
+                                            path_label += f" → {best_path['Campaign Drilldown 2'][:20]}"
+                                        st.metric(
+                                            label=path_label,
+                                            value=f"{best_path['Quality Leads %']:.1f}% Quality",
+                                            delta=f"{best_path['Grand Total']} total leads"
+                                        )
+                                    
+                                    with col_ins2:
+                                        st.markdown("**⚠️ Worst Performing Path**")
+                                        path_label = f"{worst_path['Traffic Source']} → {worst_path['Campaign Name'][:20]}"
+                                        if worst_path['Campaign Drilldown 2']:
+                                            path_label += f" → {worst_path['Campaign Drilldown 2'][:20]}"
+                                        st.metric(
+                                            label=path_label,
+                                            value=f"{worst_path['Disqualified %']:.1f}% Disqualified",
+                                            delta=f"{worst_path['Grand Total']} total leads"
+                                        )
+                                    
+                                    # Rollups read from the hierarchy tree: rates weighted by lead counts
+                                    campaign_tree = build_campaign_rollup_tree(df, contact_aggregator)
+                                    tree_filters = [selected_sources, selected_campaigns, selected_dd2s]
+                                    
+                                    # Traffic source performance
+                                    st.markdown("**📊 Traffic Source Performance**")
+                                    source_performance = campaign_tree.rollup(0, tree_filters).sort_values('Quality Leads %', ascending=False)
+                                    
+                                    st.dataframe(source_performance, use_container_width=True)
+                                    
+                                    # Drill-Down 2 analysis (if available)
+                                    dd2_performance = campaign_tree.rollup(2, tree_filters).drop(index='', errors='ignore')
+                                    if not dd2_performance.empty:
+                                        st.markdown("**🎯 Drill-Down 2 Performance**")
+                                        dd2_performance = dd2_performance.sort_values('Quality Leads %', ascending=False).head(10)
+                                        
+                                        st.dataframe(dd2_performance, use_container_width=True)
+                            
+                            # 🔥 DEEP DRILL-DOWN TO SPECIFIC PATH (FIXED DATE ERROR)
+                            with st.expander("🔍 Deep Drill-Down to Specific Path", expanded=False):
+                                if not filtered_df.empty:
+                                    # Create path identifiers for selection
+                                    filtered_df['Path_Identifier'] = filtered_df.apply(
+                                        lambda row: f"{row['Traffic Source']} → {row['Campaign Name']}" + 
+                                        (f" → {row['Campaign Drilldown 2']}" if row['Campaign Drilldown 2'] else ""),
+                                        axis=1
+                                    )
+                                    
+                                    path_options = filtered_df['Path_Identifier'].unique()
+                                    selected_path = st.selectbox(
+                                        "Select Specific Path for Deep Analysis:",
+                                        path_options,
+                                        key="path_deep_drilldown"
+                                    )
+                                    
+                                    if selected_path:
+                                        # Find the selected row
+                                        selected_row = filtered_df[filtered_df['Path_Identifier'] == selected_path].iloc[0]
+                                        
+                                        # Select the cube cells for this specific path
+                                        path_filters = {
+                                            'Traffic Source': [selected_row['Traffic Source']],
+                                            'Campaign Name': [selected_row['Campaign Name']],
+                                            'Campaign Drilldown 2': [selected_row['Campaign Drilldown 2']]
+                                        }
+                                        path_cells = contact_cube.select(path_filters)
+                                        path_leads = int(contact_cube.total('Contacts', path_cells))
+                                        
+                                        if path_leads > 0:
+                                            # Path overview
+                                            col_pd1, col_pd2, col_pd3, col_pd4 = st.columns(4)
+                                            
+                                            with col_pd1:
+                                                st.metric("Total Leads", path_leads)
+                                            
+                                            with col_pd2:
+                                                quality_cells = path_cells & contact_cube.select({'Lead Status': ['Hot', 'Warm', 'Customer']})
+                                                quality_leads = int(contact_cube.total('Contacts', quality_cells))
+                                                quality_pct = (quality_leads / path_leads * 100) if path_leads > 0 else 0
+                                                st.metric("Quality Leads", quality_leads, delta=f"{quality_pct:.1f}%")
+                                            
+                                            with col_pd3:
+                                                drilldown_value = selected_row['Campaign Drilldown 2'] if selected_row['Campaign Drilldown 2'] else "Not Set"
+                                                st.metric("Drill-Down 2", drilldown_value[:20])
+                                            
+                                            with col_pd4:
+                                                # 🔥 FIXED: Handle date properly (mean of the cells' summed creation times)
+                                                avg_timestamp = contact_cube.mean_created(path_cells)
+                                                if pd.notnull(avg_timestamp):
+                                                    avg_creation = avg_timestamp.strftime('%Y-%m-%d')
+                                                else:
+                                                    avg_creation = "N/A"
+                                                st.metric("Avg Creation Date", avg_creation)
+                                            
+                                            # Lead status breakdown for this path
+                                            st.markdown("**Lead Status Breakdown**")
+                                            path_status = contact_cube.value_counts('Lead Status', path_cells).reset_index()
+                                            path_status.columns = ['Lead Status', 'Count']
+                                            path_status['Percentage'] = (path_status['Count'] / path_status['Count'].sum() * 100).round(1)
+                                            st.dataframe(path_status, use_container_width=True)
+                                            
+                                            # Course distribution for this path
+                                            path_courses = contact_cube.value_counts('Course/Program', path_cells).reset_index()
+                                            if not path_courses.empty:
+                                                st.markdown("**Course Distribution**")
+                                                path_courses.columns = ['Course/Program', 'Count']
+                                                st.dataframe(path_courses.head(10), use_container_width=True)
+                                            
+                                            # Export this specific path (rows are only gathered when clicked)
+                                            st.download_button(
+                                                "📥 Download This Path's Contacts",
+                                                partial(filtered_contacts_csv, df, path_filters),
+                                                f"path_contacts_{selected_path[:50]}_{datetime.now().strftime('%Y%m%d')}.csv",
+                                                "text/csv",
+                                                use_container_width=True
+                                            )
                         
-                        # Apply filters
-                        filtered_df = campaign_df.copy()
-                        filter_messages = []
-                        
-                        if selected_sources:
-                            filtered_df = filtered_df[filtered_df['Traffic Source'].isin(selected_sources)]
-                            filter_messages.append(f"Traffic Sources: {', '.join(selected_sources)}")
-                        
-                        if selected_campaigns:
-                            filtered_df = filtered_df[filtered_df['Campaign Name'].isin(selected_campaigns)]
-                            filter_messages.append(f"Campaigns: {', '.join(selected_campaigns)}")
-                        
-                        if selected_dd2s:
-                            filtered_df = filtered_df[filtered_df['Campaign Drilldown 2'].isin(selected_dd2s)]
-                            filter_messages.append(f"Drill-Down 2s: {', '.join(selected_dd2s)}")
-                        
-                        # Show filter summary
-                        if filter_messages:
-                            st.success(f"🔍 Filtered: {', '.join(filter_messages)} - Showing {len(filtered_df)} paths")
                         else:
-                            st.info(f"Showing all {len(filtered_df)} campaign paths across {len(unique_sources)} traffic sources")
+                            st.info("No campaign performance data available (no contacts with campaign information)")
+                            
+                            # Show how many contacts have campaign info
+                            campaign_count = contact_cube.total('Has Campaign')
+                            drilldown2_count = contact_cube.total('Has Drilldown 2')
+                            
+                            if campaign_count > 0:
+                                st.info(f"Found {campaign_count} contacts with campaign information")
+                                if drilldown2_count > 0:
+                                    st.success(f"Found {drilldown2_count} contacts with Drill-Down 2 information ({drilldown2_count/campaign_count*100:.1f}% of campaigns)")
+                                else:
+                                    st.warning("No Drill-Down 2 information found (hs_analytics_source_data_2 is empty)")
+                            else:
+                                st.warning("No campaign/traffic source information found in the contacts data")
+                    else:
+                        st.info("No campaign performance analysis available")
+            
+            with tab5:  # Analytics Dashboard
+                if tab5.open:
+                    st.markdown("### 📈 Comprehensive Analytics")
+                    
+                    if st.session_state.analysis_results and st.session_state.visualizations:
+                        analysis = st.session_state.analysis_results
+                        visuals = st.session_state.visualizations
                         
-                        # Show hierarchy badges
-                        st.markdown("**Hierarchy Distribution:**")
+                        # Row 1: Lead Status and Course Distribution
+                        col_d1, col_d2 = st.columns(2)
                         
-                        # Traffic Source badges
-                        source_counts = campaign_df['Traffic Source'].value_counts()
-                        for source, count in source_counts.head(8).items():
-                            st.markdown(f'<span class="traffic-badge">{source}: {count}</span>', unsafe_allow_html=True)
+                        with col_d1:
+                            if 'lead_status_bar' in visuals:
+                                st.plotly_chart(visuals['lead_status_bar'], use_container_width=True)
                         
-                        # Drill-Down 2 badges (if applicable)
-                        if selected_sources and not filtered_df.empty:
-                            dd2_counts = filtered_df['Campaign Drilldown 2'].value_counts()
-                            if len(dd2_counts) > 0:
-                                st.markdown("**Drill-Down 2 Values:**")
-                                for dd2, count in dd2_counts.head(10).items():
-                                    if dd2:  # Skip empty
-                                        st.markdown(f'<span class="drilldown-badge">{dd2[:30]}: {count}</span>', unsafe_allow_html=True)
+                        with col_d2:
+                            if 'course_bar' in visuals:
+                                st.plotly_chart(visuals['course_bar'], use_container_width=True)
                         
-                        st.divider()
+                        # Row 2: Traffic Source and Country
+                        col_e1, col_e2 = st.columns(2)
                         
-                        # Display the COMPLETE campaign performance table
-                        st.markdown("#### 📊 Complete Campaign Performance Matrix")
+                        with col_e1:
+                            if 'traffic_source_bar' in visuals:
+                                st.plotly_chart(visuals['traffic_source_bar'], use_container_width=True)
                         
-                        # Create a copy for display with formatting
-                        display_campaign_df = filtered_df.copy()
+                        with col_e2:
+                            if 'country_bar' in visuals:
+                                st.plotly_chart(visuals['country_bar'], use_container_width=True)
                         
-                        # Define columns to format as integers
-                        int_columns = [
-                            'Cold', 'Warm', 'Hot', 'New Lead', 'Customer',
-                            'Not Connected (NC)', 'Not Interested', 'Not Qualified',
-                            'Duplicate', 'Upselling', 'Course Shifting',
-                            'Quality Leads (Hot+Warm+Customer)', 'Disqualified Leads', 'Grand Total'
-                        ]
+                        # Row 3: Pie Charts
+                        col_f1, col_f2 = st.columns(2)
                         
-                        # Format integer columns
-                        for col in int_columns:
-                            if col in display_campaign_df.columns:
-                                display_campaign_df[col] = display_campaign_df[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) else "0")
+                        with col_f1:
+                            if 'lead_status_pie' in visuals:
+                                st.plotly_chart(visuals['lead_status_pie'], use_container_width=True)
                         
-                        # Format percentage columns
-                        display_campaign_df['Quality Leads %'] = display_campaign_df['Quality Leads %'].apply(lambda x: f"{x:.1f}%")
-                        display_campaign_df['Disqualified %'] = display_campaign_df['Disqualified %'].apply(lambda x: f"{x:.1f}%")
+                        with col_f2:
+                            if 'traffic_source_pie' in visuals:
+                                st.plotly_chart(visuals['traffic_source_pie'], use_container_width=True)
                         
-                        # Display the dataframe with proper scrolling
-                        st.dataframe(
-                            display_campaign_df,
-                            use_container_width=True,
-                            height=600,
-                            column_config={
-                                "Traffic Source": st.column_config.TextColumn("Traffic Source", width="medium"),
-                                "Campaign Name": st.column_config.TextColumn("Campaign Name", width="large"),
-                                "Campaign Drilldown 2": st.column_config.TextColumn("Drill-Down 2", width="medium"),
-                                "Quality Leads %": st.column_config.TextColumn("Quality %", width="small"),
-                                "Grand Total": st.column_config.TextColumn("Total", width="small")
-                            }
-                        )
+                        # Data Tables
+                        st.markdown("### 📋 Detailed Statistics")
                         
-                        # Legend
-                        st.markdown("""
-                        <div style="background-color: #f8f9fa; padding: 1rem; border-radius: 0.5rem; margin-top: 1rem;">
-                            <strong>🎯 Campaign Performance Metrics:</strong>
-                            <ul style="margin-bottom: 0;">
-                                <li><strong>Quality Leads</strong> = Hot + Warm + Customer (high-value leads)</li>
-                                <li><strong>Disqualified Leads</strong> = Not Interested + Not Qualified</li>
-                                <li><strong>Quality Leads %</strong> = Percentage of high-quality leads</li>
-                                <li><strong>Disqualified %</strong> = Percentage of disqualified leads</li>
-                                <li><strong>Drill-Down 2</strong> = Ad name, Keyword, Placement, or specific element</li>
-                            </ul>
-                            <p style="margin-top: 0.5rem; margin-bottom: 0; font-size: 0.9rem;">
-                                <span class="campaign-good">✅ High Quality % (>50%) indicates effective campaigns</span><br>
-                                <span class="campaign-bad">⚠️ High Disqualified % (>30%) indicates poor targeting</span>
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        analysis_tabs = st.tabs(["Traffic Sources", "Courses", "Countries", "Industries", "Completeness"])
                         
-                        # Download and drill-down options
-                        st.divider()
-                        col_camp_dl1, col_camp_dl2, col_camp_dl3 = st.columns(3)
+                        with analysis_tabs[0]:
+                            if 'traffic_source_distribution' in analysis:
+                                st.dataframe(analysis['traffic_source_distribution'], use_container_width=True, height=300)
                         
-                        with col_camp_dl1:
-                            csv_campaign = filtered_df.to_csv(index=False)
-                            st.download_button(
-                                "📥 Download COMPLETE Campaign Data",
-                                csv_campaign,
-                                f"complete_campaign_performance_{datetime.now().strftime('%Y%m%d')}.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
+                        with analysis_tabs[1]:
+                            if 'course_distribution' in analysis:
+                                st.dataframe(analysis['course_distribution'], use_container_width=True, height=300)
                         
-                        with col_camp_dl2:
-                            # Show raw numeric data
-                            if st.button("📊 View Raw Campaign Data", use_container_width=True, key="view_raw_campaign"):
-                                st.dataframe(filtered_df, use_container_width=True, height=400)
+                        with analysis_tabs[2]:
+                            if 'country_distribution' in analysis:
+                                st.dataframe(analysis['country_distribution'], use_container_width=True, height=300)
                         
-                        with col_camp_dl3:
-                            # Show top 5 paths by quality
-                            if st.button("🏆 Show Top 5 Performing Paths", use_container_width=True, key="top5_paths"):
-                                top_paths = filtered_df.sort_values('Quality Leads %', ascending=False).head(5)
-                                st.dataframe(
-                                    top_paths[['Traffic Source', 'Campaign Name', 'Campaign Drilldown 2', 'Quality Leads %', 'Disqualified %', 'Grand Total']], 
-                                    use_container_width=True
-                                )
+                        with analysis_tabs[3]:
+                            if 'industry_distribution' in analysis:
+                                st.dataframe(analysis['industry_distribution'], use_container_width=True, height=300)
                         
-                        # Additional insights
-                        with st.expander("📈 Campaign Insights", expanded=False):
-                            # Find best and worst paths
-                            if not filtered_df.empty:
-                                best_path = filtered_df.loc[filtered_df['Quality Leads %'].idxmax()]
-                                worst_path = filtered_df.loc[filtered_df['Disqualified %'].idxmax()]
-                                
-                                col_ins1, col_ins2 = st.columns(2)
-                                
-                                with col_ins1:
-                                    st.markdown("**🏆 Best Performing Path**")
-                                    path_label = f"{best_path['Traffic Source']} → {best_path['Campaign Name'][:20]}"
-                                    if best_path['Campaign Drilldown 2']:
-                                        path_label += f" → {best_path['Campaign Drilldown 2'][:20]}"
-                                    st.metric(
-                                        label=path_label,
-                                        value=f"{best_path['Quality Leads %']:.1f}% Quality",
-                                        delta=f"{best_path['Grand Total']} total leads"
-                                    )
-                                
-                                with col_ins2:
-                                    st.markdown("**⚠️ Worst Performing Path**")
-                                    path_label = f"{worst_path['Traffic Source']} → {worst_path['Campaign Name'][:20]}"
-                                    if worst_path['Campaign Drilldown 2']:
-                                        path_label += f" → {worst_path['Campaign Drilldown 2'][:20]}"
-                                    st.metric(
-                                        label=path_label,
-                                        value=f"{worst_path['Disqualified %']:.1f}% Disqualified",
-                                        delta=f"{worst_path['Grand Total']} total leads"
-                                    )
-                                
-                                # Traffic source performance
-                                st.markdown("**📊 Traffic Source Performance**")
-                                source_performance = filtered_df.groupby('Traffic Source').agg({
-                                    'Grand Total': 'sum',
-                                    'Quality Leads %': 'mean',
-                                    'Disqualified %': 'mean'
-                                }).round(1).sort_values('Quality Leads %', ascending=False)
-                                
-                                st.dataframe(source_performance, use_container_width=True)
-                                
-                                # Drill-Down 2 analysis (if available)
-                                dd2_with_data = filtered_df[filtered_df['Campaign Drilldown 2'] != '']
-                                if not dd2_with_data.empty:
-                                    st.markdown("**🎯 Drill-Down 2 Performance**")
-                                    dd2_performance = dd2_with_data.groupby('Campaign Drilldown 2').agg({
-                                        'Grand Total': 'sum',
-                                        'Quality Leads %': 'mean',
-                                        'Disqualified %': 'mean'
-                                    }).round(1).sort_values('Quality Leads %', ascending=False).head(10)
-                                    
-                                    st.dataframe(dd2_performance, use_container_width=True)
-                            
-                        # 🔥 DEEP DRILL-DOWN TO SPECIFIC PATH (FIXED DATE ERROR)
-                        with st.expander("🔍 Deep Drill-Down to Specific Path", expanded=False):
-                            if not filtered_df.empty:
-                                # Create path identifiers for selection
-                                filtered_df['Path_Identifier'] = filtered_df.apply(
-                                    lambda row: f"{row['Traffic Source']} → {row['Campaign Name']}" + 
-                                    (f" → {row['Campaign Drilldown 2']}" if row['Campaign Drilldown 2'] else ""),
-                                    axis=1
-                                )
-                                
-                                path_options = filtered_df['Path_Identifier'].unique()
-                                selected_path = st.selectbox(
-                                    "Select Specific Path for Deep Analysis:",
-                                    path_options,
-                                    key="path_deep_drilldown"
-                                )
-                                
-                                if selected_path:
-                                    # Find the selected row
-                                    selected_row = filtered_df[filtered_df['Path_Identifier'] == selected_path].iloc[0]
-                                    
-                                    # Get all contacts for this specific path
-                                    path_contacts = df[
-                                        (df['Traffic Source'] == selected_row['Traffic Source']) &
-                                        (df['Campaign Name'] == selected_row['Campaign Name']) &
-                                        (df['Campaign Drilldown 2'] == selected_row['Campaign Drilldown 2'])
-                                    ].copy()
-                                    
-                                    if not path_contacts.empty:
-                                        # Path overview
-                                        col_pd1, col_pd2, col_pd3, col_pd4 = st.columns(4)
-                                        
-                                        with col_pd1:
-                                            path_leads = len(path_contacts)
-                                            st.metric("Total Leads", path_leads)
-                                        
-                                        with col_pd2:
-                                            quality_leads = path_contacts[path_contacts['Lead Status'].isin(['Hot', 'Warm', 'Customer'])].shape[0]
-                                            quality_pct = (quality_leads / path_leads * 100) if path_leads > 0 else 0
-                                            st.metric("Quality Leads", quality_leads, delta=f"{quality_pct:.1f}%")
-                                        
-                                        with col_pd3:
-                                            drilldown_value = selected_row['Campaign Drilldown 2'] if selected_row['Campaign Drilldown 2'] else "Not Set"
-                                            st.metric("Drill-Down 2", drilldown_value[:20])
-                                        
-                                        with col_pd4:
-                                            # 🔥 FIXED: Handle date properly
-                                            if not path_contacts['Created Date'].isna().all():
-                                                # Get mean as timestamp and convert to date
-                                                try:
-                                                    avg_timestamp = path_contacts['Created Date'].dropna().mean()
-                                                    if pd.notnull(avg_timestamp):
-                                                        avg_creation = avg_timestamp.strftime('%Y-%m-%d')
-                                                    else:
-                                                        avg_creation = "N/A"
-                                                except:
-                                                    avg_creation = "Error"
-                                            else:
-                                                avg_creation = "N/A"
-                                            st.metric("Avg Creation Date", avg_creation)
-                                        
-                                        # Lead status breakdown for this path
-                                        st.markdown("**Lead Status Breakdown**")
-                                        path_status = path_contacts['Lead Status'].value_counts().reset_index()
-                                        path_status.columns = ['Lead Status', 'Count']
-                                        path_status['Percentage'] = (path_status['Count'] / path_status['Count'].sum() * 100).round(1)
-                                        st.dataframe(path_status, use_container_width=True)
-                                        
-                                        # Course distribution for this path
-                                        if path_contacts['Course/Program'].notna().any():
-                                            st.markdown("**Course Distribution**")
-                                            path_courses = path_contacts['Course/Program'].value_counts().reset_index()
-                                            path_courses.columns = ['Course/Program', 'Count']
-                                            st.dataframe(path_courses.head(10), use_container_width=True)
-                                        
-                                        # Export this specific path
-                                        csv_path = path_contacts.to_csv(index=False)
-                                        st.download_button(
-                                            "📥 Download This Path's Contacts",
-                                            csv_path,
-                                            f"path_contacts_{selected_path[:50]}_{datetime.now().strftime('%Y%m%d')}.csv",
-                                            "text/csv",
-                                            use_container_width=True
-                                        )
-                                        
-                    else:
-                        st.info("No campaign performance data available (no contacts with campaign information)")
+                        with analysis_tabs[4]:
+                            if 'completeness' in analysis:
+                                st.dataframe(analysis['completeness'], use_container_width=True, height=300)
                         
-                        # Show how many contacts have campaign info
-                        campaign_count = df['Has Campaign'].sum()
-                        drilldown2_count = df['Has Drilldown 2'].sum()
+                        # 🧮 Any hierarchy × Lead Status, from the dataset's cached pivots
+                        st.markdown("### 🧮 Lead Status Breakdown")
+                        col_b1, col_b2 = st.columns([3, 1])
+                        with col_b1:
+                            breakdown = st.selectbox("Breakdown:", list(STATUS_BREAKDOWNS.keys()), key="status_breakdown")
+                        with col_b2:
+                            show_subtotals = st.checkbox("Show subtotals", value=True, key="status_breakdown_subtotals")
                         
-                        if campaign_count > 0:
-                            st.info(f"Found {campaign_count} contacts with campaign information")
-                            if drilldown2_count > 0:
-                                st.success(f"Found {drilldown2_count} contacts with Drill-Down 2 information ({drilldown2_count/campaign_count*100:.1f}% of campaigns)")
-                            else:
-                                st.warning("No Drill-Down 2 information found (hs_analytics_source_data_2 is empty)")
+                        breakdown_dimensions = STATUS_BREAKDOWNS[breakdown]
+                        breakdown_df = build_status_pivot(
+                            df, breakdown_dimensions, CAMPAIGN_QUALITY_METRICS,
+                            tuple(column for column, _, _ in breakdown_dimensions), True,
+                            contact_aggregator, subtotals=show_subtotals
+                        )
+                        if breakdown_df.empty:
+                            st.info(f"No contacts with {breakdown_dimensions[0][0]} data")
                         else:
-                            st.warning("No campaign/traffic source information found in the contacts data")
-                else:
-                    st.info("No campaign performance analysis available")
-            
-            with tab5:  # Analytics Dashboard
-                st.markdown("### 📈 Comprehensive Analytics")
-                
-                if st.session_state.analysis_results and st.session_state.visualizations:
-                    analysis = st.session_state.analysis_results
-                    visuals = st.session_state.visualizations
-                    
-                    # Row 1: Lead Status and Course Distribution
-                    col_d1, col_d2 = st.columns(2)
-                    
-                    with col_d1:
-                        if 'lead_status_bar' in visuals:
-                            st.plotly_chart(visuals['lead_status_bar'], use_container_width=True)
-                    
-                    with col_d2:
-                        if 'course_bar' in visuals:
-                            st.plotly_chart(visuals['course_bar'], use_container_width=True)
-                    
-                    # Row 2: Traffic Source and Country
-                    col_e1, col_e2 = st.columns(2)
-                    
-                    with col_e1:
-                        if 'traffic_source_bar' in visuals:
-                            st.plotly_chart(visuals['traffic_source_bar'], use_container_width=True)
-                    
-                    with col_e2:
-                        if 'country_bar' in visuals:
-                            st.plotly_chart(visuals['country_bar'], use_container_width=True)
-                    
-                    # Row 3: Pie Charts
-                    col_f1, col_f2 = st.columns(2)
-                    
-                    with col_f1:
-                        if 'lead_status_pie' in visuals:
-                            st.plotly_chart(visuals['lead_status_pie'], use_container_width=True)
-                    
-                    with col_f2:
-                        if 'traffic_source_pie' in visuals:
-                            st.plotly_chart(visuals['traffic_source_pie'], use_container_width=True)
-                    
-                    # Data Tables
-                    st.markdown("### 📋 Detailed Statistics")
-                    
-                    analysis_tabs = st.tabs(["Traffic Sources", "Courses", "Countries", "Industries", "Completeness"])
-                    
-                    with analysis_tabs[0]:
-                        if 'traffic_source_distribution' in analysis:
-                            st.dataframe(analysis['traffic_source_distribution'], use_container_width=True, height=300)
-                    
-                    with analysis_tabs[1]:
-                        if 'course_distribution' in analysis:
-                            st.dataframe(analysis['course_distribution'], use_container_width=True, height=300)
-                    
-                    with analysis_tabs[2]:
-                        if 'country_distribution' in analysis:
-                            st.dataframe(analysis['country_distribution'], use_container_width=True, height=300)
-                    
-                    with analysis_tabs[3]:
-                        if 'industry_distribution' in analysis:
-                            st.dataframe(analysis['industry_distribution'], use_container_width=True, height=300)
-                    
-                    with analysis_tabs[4]:
-                        if 'completeness' in analysis:
-                            st.dataframe(analysis['completeness'], use_container_width=True, height=300)
+                            st.dataframe(breakdown_df, use_container_width=True, height=400, hide_index=True)
             
             with tab6:  # Geographic Analysis
-                st.markdown("### 🌍 Geographic Distribution")
-                
-                if st.session_state.analysis_results:
-                    analysis = st.session_state.analysis_results
+                if tab6.open:
+                    st.markdown("### 🌍 Geographic Distribution")
                     
-                    if 'country_distribution' in analysis:
-                        country_data = analysis['country_distribution']
-                        
-                        # Create choropleth map
-                        fig = px.choropleth(
-                            country_data,
-                            locations='Country',
-                            locationmode='country names',
-                            color='Count',
-                            hover_name='Country',
-                            title='Contact Distribution by Country',
-                            color_continuous_scale='Viridis'
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
+                    if st.session_state.analysis_results:
+                        analysis = st.session_state.analysis_results
                         
-                        # Country data table
-                        st.dataframe(country_data, use_container_width=True, height=400)
+                        if 'country_distribution' in analysis:
+                            country_data = analysis['country_distribution']
+                            
+                            # Create choropleth map
+                            fig = px.choropleth(
+                                country_data,
+                                locations='Country',
+                                locationmode='country names',
+                                color='Count',
+                                hover_name='Country',
+                                title='Contact Distribution by Country',
+                                color_continuous_scale='Viridis'
+                            )
+                            st.plotly_chart(fig, use_container_width=True)
+                            
+                            # Country data table
+                            st.dataframe(country_data, use_container_width=True, height=400)
             
             with tab7:  # Email Validation
-                st.markdown("### 📧 Email Validation")
-                
-                if st.session_state.email_validation is not None:
-                    email_issues = st.session_state.email_validation
+                if tab7.open:
+                    st.markdown("### 📧 Email Validation")
+                    
+                    email_issues = get_email_validation(df, contact_aggregator)
                     
                     if not email_issues.empty:
                         col_g1, col_g2 = st.columns([3, 1])
@@ -2550,97 +5066,105 @@ def main():
                         st.success("✅ All emails appear valid!")
             
             with tab8:  # Export Data
-                st.markdown("### 📥 Export Options")
-                
-                # First row of export buttons
-                export_row1 = st.columns(3)
-                
-                with export_row1[0]:
-                    # Export Full CSV
-                    csv_data = df.to_csv(index=False)
-                    st.download_button(
-                        "📄 Download Full CSV",
-                        csv_data,
-                        f"hubspot_contacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        "text/csv",
-                        use_container_width=True
-                    )
-                
-                with export_row1[1]:
-                    # Export Excel with multiple sheets
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='All Contacts', index=False)
-                        
-                        if st.session_state.analysis_results:
-                            for key, data in st.session_state.analysis_results.items():
-                                if isinstance(data, pd.DataFrame):
-                                    sheet_name = key[:30]
-                                    data.to_excel(writer, sheet_name=sheet_name, index=False)
+                if tab8.open:
+                    st.markdown("### 📥 Export Options")
                     
-                    st.download_button(
-                        "📊 Download Excel Report",
-                        output.getvalue(),
-                        f"hubspot_analytics_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                
-                with export_row1[2]:
-                    # View raw data
-                    if st.button("👁️ View Raw Data", use_container_width=True):
-                        st.dataframe(df, use_container_width=True, height=400)
-                
-                # Export individual analyses
-                st.markdown("---")
-                st.markdown("#### Export Individual Analyses")
-                
-                if st.session_state.analysis_results:
-                    export_row2 = st.columns(4)
+                    # First row of export buttons
+                    export_row1 = st.columns(3)
                     
-                    with export_row2[0]:
-                        if 'lead_status_distribution' in st.session_state.analysis_results:
-                            csv = st.session_state.analysis_results['lead_status_distribution'].to_csv(index=False)
-                            st.download_button(
-                                "📊 Lead Status",
-                                csv,
-                                "lead_status_distribution.csv",
-                                "text/csv",
-                                use_container_width=True
+                    with export_row1[0]:
+                        # Export Full CSV (with each phone number's E.164 form next to it)
+                        export_df = df
+                        if 'Phone' in df.columns:
+                            export_df = df.copy()
+                            export_df.insert(
+                                df.columns.get_loc('Phone') + 1, 'Phone (E.164)',
+                                get_normalized_phones(df, contact_aggregator)
                             )
+                        csv_data = export_df.to_csv(index=False)
+                        st.download_button(
+                            "📄 Download Full CSV",
+                            csv_data,
+                            f"hubspot_contacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            "text/csv",
+                            use_container_width=True
+                        )
                     
-                    with export_row2[1]:
-                        if 'course_distribution' in st.session_state.analysis_results:
-                            csv = st.session_state.analysis_results['course_distribution'].to_csv(index=False)
-                            st.download_button(
-                                "📚 Courses",
-                                csv,
-                                "course_distribution.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
+                    with export_row1[1]:
+                        # Export Excel with multiple sheets
+                        output = io.BytesIO()
+                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                            df.to_excel(writer, sheet_name='All Contacts', index=False)
+                            
+                            if st.session_state.analysis_results:
+                                for key, data in st.session_state.analysis_results.items():
+                                    if isinstance(data, pd.DataFrame):
+                                        sheet_name = key[:30]
+                                        data.to_excel(writer, sheet_name=sheet_name, index=False)
+                        
+                        st.download_button(
+                            "📊 Download Excel Report",
+                            output.getvalue(),
+                            f"hubspot_analytics_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True
+                        )
                     
-                    with export_row2[2]:
-                        if 'campaign_performance' in st.session_state.analysis_results:
-                            csv = st.session_state.analysis_results['campaign_performance'].to_csv(index=False)
-                            st.download_button(
-                                "📣 Complete Campaign Data",
-                                csv,
-                                "complete_campaign_performance.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
+                    with export_row1[2]:
+                        # View raw data
+                        if st.button("👁️ View Raw Data", use_container_width=True):
+                            st.dataframe(df, use_container_width=True, height=400)
                     
-                    with export_row2[3]:
-                        if 'course_quality' in st.session_state.analysis_results:
-                            csv = st.session_state.analysis_results['course_quality'].to_csv(index=False)
-                            st.download_button(
-                                "🎯 Course Quality",
-                                csv,
-                                "course_quality_analysis.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
+                    # Export individual analyses
+                    st.markdown("---")
+                    st.markdown("#### Export Individual Analyses")
+                    
+                    if st.session_state.analysis_results:
+                        export_row2 = st.columns(4)
+                        
+                        with export_row2[0]:
+                            if 'lead_status_distribution' in st.session_state.analysis_results:
+                                csv = st.session_state.analysis_results['lead_status_distribution'].to_csv(index=False)
+                                st.download_button(
+                                    "📊 Lead Status",
+                                    csv,
+                                    "lead_status_distribution.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
+                        
+                        with export_row2[1]:
+                            if 'course_distribution' in st.session_state.analysis_results:
+                                csv = st.session_state.analysis_results['course_distribution'].to_csv(index=False)
+                                st.download_button(
+                                    "📚 Courses",
+                                    csv,
+                                    "course_distribution.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
+                        
+                        with export_row2[2]:
+                            if 'campaign_performance' in st.session_state.analysis_results:
+                                csv = st.session_state.analysis_results['campaign_performance'].to_csv(index=False)
+                                st.download_button(
+                                    "📣 Complete Campaign Data",
+                                    csv,
+                                    "complete_campaign_performance.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
+                        
+                        with export_row2[3]:
+                            if 'course_quality' in st.session_state.analysis_results:
+                                csv = st.session_state.analysis_results['course_quality'].to_csv(index=False)
+                                st.download_button(
+                                    "🎯 Course Quality",
+                                    csv,
+                                    "course_quality_analysis.csv",
+                                    "text/csv",
+                                    use_container_width=True
+                                )
             
             # Footer
             st.divider()
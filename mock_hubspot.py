@@ -0,0 +1,533 @@
+"""
+🧪 Local stand-in for the HubSpot CRM API, for offline development and load testing of dashboard.py.
+
+Serves the endpoints the dashboard uses:
+    POST /crm/v3/objects/contacts/search   (filters, sorts, property projection, paging, total, 10,000-result cap)
+    GET  /crm/v3/objects/contacts          (cursor paging, used for the connection test)
+    GET  /crm/v3/properties/contacts       (property definitions, used for property discovery)
+with realistic rate limiting (429 + Retry-After, X-HubSpot-RateLimit-* headers), latency and 5xx injection.
+Contacts are synthetic (seeded) or replayed from a recorded fixture. Synthetic dates are ISO-8601 strings,
+as the real API returns them (--date-format epoch switches to epoch milliseconds).
+
+Usage:
+    python mock_hubspot.py serve --contacts 50000 --days 120 --latency-ms 80 --jitter-ms 40
+    python mock_hubspot.py serve --fixture contacts.jsonl --error-rate 0.02
+    HUBSPOT_API_KEY=... python mock_hubspot.py record --start 2026-09-01 --end 2026-09-30 --out contacts.jsonl
+
+Then point the dashboard at it (no secrets.toml needed):
+    HUBSPOT_API_BASE=http://127.0.0.1:8765 HUBSPOT_API_KEY=mock streamlit run dashboard.py
+
+Fixtures are JSON arrays or JSON Lines of contacts shaped like search results ({"id": ..., "properties": {...}}),
+which is also what fetch checkpoints (.hubspot_store/checkpoints/*.jsonl) contain.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+SEARCH_PATH = "/crm/v3/objects/contacts/search"
+CONTACTS_PATH = "/crm/v3/objects/contacts"
+PROPERTIES_PATH = "/crm/v3/properties/contacts"
+
+SEARCH_RESULT_CAP = 10000  # Like HubSpot, paging a search past this offset is rejected with a 400
+SEARCH_MAX_LIMIT = 200
+DEFAULT_PROPERTIES = ["createdate", "email", "firstname", "hs_object_id", "lastmodifieddate", "lastname"]
+QUERY_CACHE_SIZE = 64  # Matched result lists kept per (filters, sort), so later pages are O(page)
+
+# 🔥 SYNTHETIC DATA VOCABULARY (mirrors the raw values the dashboard normalizes)
+LEAD_STATUSES = ["NEW", "OPEN", "IN_PROGRESS", "CONNECTED", "ATTEMPTED_TO_CONTACT", "Hot Prospect",
+                 "Future Prospect", "Neutral Prospect", "Not Connected", "Not Interested", "UNQUALIFIED",
+                 "BAD_TIMING", "Customer", ""]
+SUB_LEAD_STATUSES = ["", "", "Not answering", "Call back request", "Disconnected by user", "Casual enquiry",
+                     "Not interested", "Future prospect", "Connected unknowingly", "HR calls", "Wrong course enquiry"]
+TRAFFIC_SOURCES = ["PAID_SOCIAL", "ORGANIC_SEARCH", "PAID_SEARCH", "DIRECT_TRAFFIC", "SOCIAL_MEDIA",
+                   "REFERRALS", "EMAIL_MARKETING", "OFFLINE", "OTHER_CAMPAIGNS", "AI_REFERRALS"]
+CAMPAIGNS = ["", "Facebook Lead Ads", "Instagram Stories", "Google Search - Brand", "Google Search - Generic",
+             "Webinar Sept", "Referral Drive", "CRM_UI", "Integration", "Import"]
+DRILLDOWNS = ["", "Ad Set 1", "Ad Set 2", "keyword: data science course", "keyword: mba online", "Placement: feed"]
+COURSES = ["", "Data Science", "Data Science", "Full Stack Development", "Digital Marketing", "MBA",
+           "Product Management", "UI/UX Design", "Cloud Computing"]
+REASONS = ["", "", "", "Fees too high", "Looking for a job", "Will join next batch", "Course not relevant",
+           "Timing issue", "Need EMI option", "Already enrolled elsewhere"]
+EMAIL_DOMAINS = ["gmail.com", "gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "gmial.com", "yaho.com", "company.in"]
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Sneha", "Vikram", "Ananya", "Rohan", "Kavya", "Arjun", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Gupta", "Singh", "Nair", "Das", "Kapoor", "Joshi"]
+CITIES = ["Bengaluru", "Mumbai", "Delhi", "Hyderabad", "Chennai", "Pune", "Kolkata", ""]
+
+def random_phone(rnd):
+    """Phone numbers in the mix of formats HubSpot portals accumulate."""
+    number = f"{rnd.choice('6789')}{rnd.randint(0, 999999999):09d}"
+    return rnd.choice([
+        f"+91 {number[:5]} {number[5:]}", f"+91{number}", f"0{number}", number, f"91{number}",
+        f"+1 415 555 {rnd.randint(0, 9999):04d}", f"+44 20 7946 {rnd.randint(0, 9999):04d}",
+        f"+971 50 {rnd.randint(0, 9999999):07d}", "12345", ""
+    ])
+
+def format_date(timestamp_ms, date_format="iso"):
+    """A date property value as the v3 API sends it ("2024-01-15T10:00:00.000Z"), or as epoch milliseconds."""
+    if date_format == "epoch":
+        return str(timestamp_ms)
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+    return f"{moment.strftime('%Y-%m-%dT%H:%M:%S')}.{timestamp_ms % 1000:03d}Z"
+
+def generate_contacts(count, days, seed=42, end=None, date_format="iso"):
+    """
+    Seeded synthetic contacts created uniformly over the last `days` days. Dates are ISO-8601 strings
+    like the real API returns; date_format="epoch" gives epoch milliseconds instead.
+    """
+    rnd = random.Random(seed)
+    end_ms = int((end or datetime.now(timezone.utc)).timestamp() * 1000)
+    start_ms = end_ms - days * 86400000
+    
+    contacts = []
+    for i in range(count):
+        created = rnd.randint(start_ms, end_ms)
+        modified = min(end_ms, created + int(rnd.expovariate(1 / (3 * 86400000))))
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        contact_id = str(100000 + i)
+        
+        properties = {
+            "hs_object_id": contact_id,
+            "createdate": format_date(created, date_format),
+            "lastmodifieddate": format_date(modified, date_format),
+            "firstname": first,
+            "lastname": last,
+            "email": rnd.choice([f"{first}.{last}{i}@{rnd.choice(EMAIL_DOMAINS)}".lower(), f"{first}{i}@gmail.com".lower(), ""]),
+            "phone": random_phone(rnd),
+            "mobilephone": random_phone(rnd) if rnd.random() < 0.2 else "",
+            "hs_lead_status": rnd.choice(LEAD_STATUSES),
+            "sub_lead_status": rnd.choice(SUB_LEAD_STATUSES),
+            "lifecyclestage": rnd.choice(["lead", "marketingqualifiedlead", "salesqualifiedlead", "customer"]),
+            "hs_analytics_source": rnd.choice(TRAFFIC_SOURCES),
+            "hs_analytics_source_data_1": rnd.choice(CAMPAIGNS),
+            "hs_analytics_source_data_2": rnd.choice(DRILLDOWNS),
+            "course": rnd.choice(COURSES),
+            "future_prospect_reasons": rnd.choice(REASONS),
+            "not_interested_reasons": rnd.choice(REASONS),
+            "not_connected_reasons": rnd.choice(REASONS),
+            "amount": rnd.choice(["", "", "", "25000", "45,000", "$60000", "1,20,000"]),
+            "city": rnd.choice(CITIES),
+            "country": rnd.choice(["India", "India", "India", "United States", "UAE", ""])
+        }
+        contacts.append({"id": contact_id, "properties": properties})
+    
+    return contacts
+
+def load_fixture(path):
+    """Load recorded contacts from a JSON array or a JSON Lines file."""
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def to_number(value):
+    """Value compared as a number: numeric strings, and dates (ISO-8601) as epoch milliseconds like filter values."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() * 1000
+
+def matches_filter(properties, flt):
+    value = properties.get(flt["propertyName"])
+    operator = flt["operator"]
+    
+    if operator == "HAS_PROPERTY":
+        return value not in (None, "")
+    if operator == "NOT_HAS_PROPERTY":
+        return value in (None, "")
+    if value in (None, ""):
+        return False
+    
+    left, right = to_number(value), to_number(flt.get("value"))
+    if left is None or right is None:
+        left, right = str(value), str(flt.get("value"))
+    
+    if operator == "EQ":
+        return left == right
+    if operator == "NEQ":
+        return left != right
+    if operator == "GT":
+        return left > right
+    if operator == "GTE":
+        return left >= right
+    if operator == "LT":
+        return left < right
+    if operator == "LTE":
+        return left <= right
+    raise ValueError(f"Unsupported operator {operator}")
+
+class SlidingWindowLimiter:
+    """Counts requests in a sliding window, like HubSpot's per-token limits."""
+    
+    def __init__(self, max_requests, interval_ms):
+        self.max_requests = max_requests
+        self.interval = interval_ms / 1000.0
+        self.sent = []
+        self.lock = threading.Lock()
+    
+    def try_acquire(self):
+        """Return (allowed, remaining, retry_after_seconds)."""
+        with self.lock:
+            now = time.monotonic()
+            self.sent = [t for t in self.sent if now - t < self.interval]
+            if len(self.sent) >= self.max_requests:
+                return False, 0, max(1, round(self.interval - (now - self.sent[0]) + 0.5))
+            self.sent.append(now)
+            return True, self.max_requests - len(self.sent), 0
+
+class MockHubSpotAPI:
+    """
+    🔥 In-memory HubSpot contacts API.
+    Holds the contacts, the rate limiters and the fault-injection settings; MockHubSpotServer exposes it over HTTP.
+    """
+    
+    def __init__(self, contacts, api_key=None, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 search_rate=(5, 1000), default_rate=(100, 10000), seed=None):
+        self.contacts = contacts
+        self.api_key = api_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.search_limiter = SlidingWindowLimiter(*search_rate)
+        self.default_limiter = SlidingWindowLimiter(*default_rate)
+        self.property_names = sorted({name for contact in contacts for name in contact.get("properties", {})})
+        self.query_cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors_injected": 0}
+        self.stats_lock = threading.Lock()
+    
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+    
+    def inject_latency(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.random_lock:
+                delay = self.random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000.0)
+    
+    def should_fail(self):
+        with self.random_lock:
+            return self.random.random() < self.error_rate
+    
+    def handle(self, method, path, query, headers, body):
+        """Return (status, headers, payload) for one request."""
+        self.count("requests")
+        self.inject_latency()
+        
+        token = headers.get("Authorization", "")
+        if not token.startswith("Bearer "):
+            return 401, {}, {"status": "error", "message": "Authentication credentials not found.", "category": "INVALID_AUTHENTICATION"}
+        if self.api_key and token[len("Bearer "):] != self.api_key:
+            return 401, {}, {"status": "error", "message": "The OAuth token used to make this call expired or is invalid.", "category": "EXPIRED_AUTHENTICATION"}
+        
+        is_search = path == SEARCH_PATH
+        limiter = self.search_limiter if is_search else self.default_limiter
+        allowed, remaining, retry_after = limiter.try_acquire()
+        
+        # HubSpot does not report quota headers on search endpoints
+        response_headers = {} if is_search else {
+            "X-HubSpot-RateLimit-Max": str(limiter.max_requests),
+            "X-HubSpot-RateLimit-Interval-Milliseconds": str(int(limiter.interval * 1000)),
+            "X-HubSpot-RateLimit-Remaining": str(remaining)
+        }
+        
+        if not allowed:
+            self.count("rate_limited")
+            response_headers["Retry-After"] = str(retry_after)
+            return 429, response_headers, {
+                "status": "error",
+                "message": "You have reached your secondly limit." if is_search else "You have reached your ten_secondly_rolling limit.",
+                "errorType": "RATE_LIMIT",
+                "policyName": "SECONDLY" if is_search else "TEN_SECONDLY_ROLLING"
+            }
+        
+        if self.should_fail():
+            self.count("errors_injected")
+            with self.random_lock:
+                status = self.random.choice([500, 502, 503, 504])
+            return status, response_headers, {"status": "error", "message": "Injected server error", "category": "INTERNAL_ERROR"}
+        
+        if method == "POST" and is_search:
+            status, payload = self.search(body)
+        elif method == "GET" and path == CONTACTS_PATH:
+            status, payload = self.list_contacts(query)
+        elif method == "GET" and path == PROPERTIES_PATH:
+            status, payload = 200, {"results": [{"name": name, "label": name, "type": "string"} for name in self.property_names]}
+        else:
+            status, payload = 404, {"status": "error", "message": f"No route for {method} {path}", "category": "OBJECT_NOT_FOUND"}
+        
+        return status, response_headers, payload
+    
+    def project(self, contact, properties):
+        stored = contact.get("properties", {})
+        projected = {name: stored.get(name) for name in properties}
+        for name in ("hs_object_id", "createdate", "lastmodifieddate"):
+            projected[name] = stored.get(name)
+        return {
+            "id": contact["id"],
+            "properties": projected,
+            "createdAt": stored.get("createdate"),
+            "updatedAt": stored.get("lastmodifieddate"),
+            "archived": False
+        }
+    
+    def matching_contacts(self, filter_groups, sorts):
+        """Contacts matching any filter group (all filters within a group), sorted - cached per query."""
+        key = json.dumps([filter_groups, sorts], sort_keys=True)
+        with self.cache_lock:
+            if key in self.query_cache:
+                self.query_cache.move_to_end(key)
+                return self.query_cache[key]
+        
+        if filter_groups:
+            matched = [
+                contact for contact in self.contacts
+                if any(all(matches_filter(contact.get("properties", {}), flt) for flt in group.get("filters", []))
+                       for group in filter_groups)
+            ]
+        else:
+            matched = list(self.contacts)
+        
+        for sort in reversed(sorts or [{"propertyName": "hs_object_id", "direction": "ASCENDING"}]):
+            name = sort["propertyName"]
+            
+            def sort_key(contact, name=name):
+                value = contact.get("properties", {}).get(name)
+                number = to_number(value)
+                return (value in (None, ""), number if number is not None else 0.0, "" if number is not None else str(value))
+            
+            matched.sort(key=sort_key, reverse=sort.get("direction") == "DESCENDING")
+        
+        with self.cache_lock:
+            self.query_cache[key] = matched
+            if len(self.query_cache) > QUERY_CACHE_SIZE:
+                self.query_cache.popitem(last=False)
+        return matched
+    
+    def search(self, body):
+        try:
+            offset = int(body.get("after") or 0)
+            limit = int(body.get("limit", 10))
+            matched = self.matching_contacts(body.get("filterGroups", []), body.get("sorts", []))
+        except (TypeError, ValueError, KeyError) as e:
+            return 400, {"status": "error", "message": f"Invalid search request: {e}", "category": "VALIDATION_ERROR"}
+        
+        if limit > SEARCH_MAX_LIMIT:
+            return 400, {"status": "error", "message": f"limit must be <= {SEARCH_MAX_LIMIT}", "category": "VALIDATION_ERROR"}
+        if offset >= SEARCH_RESULT_CAP:
+            return 400, {"status": "error", "message": f"Paging beyond {SEARCH_RESULT_CAP} results is not supported.", "category": "VALIDATION_ERROR"}
+        
+        properties = body.get("properties") or DEFAULT_PROPERTIES
+        page = matched[offset:offset + limit]
+        payload = {"total": len(matched), "results": [self.project(contact, properties) for contact in page]}
+        if offset + limit < len(matched):
+            payload["paging"] = {"next": {"after": str(offset + limit)}}
+        return 200, payload
+    
+    def list_contacts(self, query):
+        limit = min(int(query.get("limit", ["10"])[0]), 100)
+        offset = int(query.get("after", ["0"])[0] or 0)
+        properties = ",".join(query.get("properties", [])).split(",") if query.get("properties") else DEFAULT_PROPERTIES
+        page = self.contacts[offset:offset + limit]
+        payload = {"results": [self.project(contact, [p for p in properties if p]) for contact in page]}
+        if offset + limit < len(self.contacts):
+            payload["paging"] = {"next": {"after": str(offset + limit)}}
+        return 200, payload
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    
+    def do_GET(self):
+        self.dispatch("GET")
+    
+    def do_POST(self):
+        self.dispatch("POST")
+    
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            self.send_json(400, {}, {"status": "error", "message": "Invalid JSON", "category": "VALIDATION_ERROR"})
+            return
+        
+        status, headers, payload = self.server.api.handle(method, url.path, parse_qs(url.query), self.headers, body)
+        self.send_json(status, headers, payload)
+    
+    def send_json(self, status, headers, payload):
+        data = json.dumps(payload).encode()
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            data = gzip.compress(data, compresslevel=1)
+        
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class MockHubSpotServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server around a MockHubSpotAPI.
+    Use start()/stop() to run it in the background of a benchmark or test, or serve_forever() from the CLI.
+    """
+    daemon_threads = True
+    
+    def __init__(self, api, host="127.0.0.1", port=8765, verbose=False):
+        super().__init__((host, port), MockRequestHandler)
+        self.api = api
+        self.verbose = verbose
+        self.thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def record_fixture(api_key, start_date, end_date, out_path, base_url="https://api.hubapi.com"):
+    """Record real contacts created in [start_date, end_date] to a JSON Lines fixture, one day per query."""
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+    
+    # Request every property the portal defines so the fixture is complete
+    response = session.get(f"{base_url}{PROPERTIES_PATH}", timeout=30)
+    response.raise_for_status()
+    properties = [prop["name"] for prop in response.json().get("results", [])]
+    
+    recorded = 0
+    day = start_date
+    with open(out_path, "w") as out:
+        while day <= end_date:
+            day_start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+            body = {
+                "filterGroups": [{"filters": [
+                    {"propertyName": "createdate", "operator": "GTE", "value": day_start},
+                    {"propertyName": "createdate", "operator": "LT", "value": day_start + 86400000}
+                ]}],
+                "properties": properties,
+                "limit": 100,
+                "sorts": [{"propertyName": "createdate", "direction": "ASCENDING"}]
+            }
+            
+            after = None
+            while True:
+                if after:
+                    body["after"] = after
+                response = session.post(f"{base_url}{SEARCH_PATH}", json=body, timeout=60)
+                if response.status_code == 429:
+                    time.sleep(int(response.headers.get("Retry-After", 1)))
+                    continue
+                response.raise_for_status()
+                data = response.json()
+                for contact in data.get("results", []):
+                    out.write(json.dumps({"id": contact["id"], "properties": contact["properties"]}) + "\n")
+                    recorded += 1
+                after = data.get("paging", {}).get("next", {}).get("after")
+                if not after:
+                    break
+                time.sleep(0.25)
+            
+            day += timedelta(days=1)
+    
+    return recorded
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HubSpot API stand-in for the contacts dashboard.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    serve = commands.add_parser("serve", help="Serve synthetic or recorded contacts")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--fixture", help="Recorded contacts (JSON array or JSON Lines) instead of synthetic ones")
+    serve.add_argument("--contacts", type=int, default=20000, help="Number of synthetic contacts")
+    serve.add_argument("--days", type=int, default=90, help="Synthetic contacts are created over this many past days")
+    serve.add_argument("--seed", type=int, default=42)
+    serve.add_argument("--date-format", choices=["iso", "epoch"], default="iso",
+                       help="Synthetic createdate/lastmodifieddate as ISO-8601 strings (like HubSpot) or epoch milliseconds")
+    serve.add_argument("--api-key", help="Only accept this bearer token (any token is accepted by default)")
+    serve.add_argument("--latency-ms", type=float, default=0, help="Mean added latency per request")
+    serve.add_argument("--jitter-ms", type=float, default=0, help="Latency is drawn uniformly from mean +/- jitter")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a random 5xx")
+    serve.add_argument("--search-rate", type=int, default=5, help="Search requests allowed per second")
+    serve.add_argument("--rate", type=int, default=100, help="Other requests allowed per 10 seconds")
+    serve.add_argument("--verbose", action="store_true", help="Log every request")
+    
+    record = commands.add_parser("record", help="Record real contacts to a fixture (reads HUBSPOT_API_KEY)")
+    record.add_argument("--start", required=True, help="YYYY-MM-DD (created date, UTC)")
+    record.add_argument("--end", required=True, help="YYYY-MM-DD (inclusive)")
+    record.add_argument("--out", required=True)
+    record.add_argument("--base-url", default="https://api.hubapi.com")
+    
+    args = parser.parse_args()
+    
+    if args.command == "record":
+        api_key = os.environ.get("HUBSPOT_API_KEY")
+        if not api_key:
+            parser.error("HUBSPOT_API_KEY must be set to record a fixture")
+        start = datetime.strptime(args.start, "%Y-%m-%d").date()
+        end = datetime.strptime(args.end, "%Y-%m-%d").date()
+        count = record_fixture(api_key, start, end, args.out, base_url=args.base_url)
+        print(f"✅ Recorded {count} contacts to {args.out}")
+        return
+    
+    contacts = load_fixture(args.fixture) if args.fixture else generate_contacts(
+        args.contacts, args.days, seed=args.seed, date_format=args.date_format
+    )
+    api = MockHubSpotAPI(
+        contacts, api_key=args.api_key, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, search_rate=(args.search_rate, 1000), default_rate=(args.rate, 10000), seed=args.seed
+    )
+    server = MockHubSpotServer(api, host=args.host, port=args.port, verbose=args.verbose)
+    print(f"🧪 Mock HubSpot API serving {len(contacts)} contacts at {server.base_url}")
+    print(f"   Run the dashboard with: HUBSPOT_API_BASE={server.base_url} HUBSPOT_API_KEY=mock streamlit run dashboard.py")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {api.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# dashboard.py is a Streamlit script; imported outside `streamlit run` it only warns about the missing runtime
+logging.getLogger("streamlit").setLevel(logging.ERROR)
@@ -0,0 +1,156 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+import mock_hubspot
+
+END = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def make_frame(contacts, compact):
+    df = dashboard.process_contacts_data(contacts)
+    return dashboard.compact_contacts_frame(df) if compact else df
+
+
+def edit_contacts(contacts, seed):
+    """A later read of the same contacts: some deleted, some edited (with a newer modified date), some new."""
+    rnd = random.Random(seed)
+    contacts = [{"id": c["id"], "properties": dict(c["properties"])} for c in contacts]
+    del contacts[5:15]
+    for contact in rnd.sample(contacts, 40):
+        properties = contact["properties"]
+        properties["lastmodifieddate"] = mock_hubspot.format_date(int(END.timestamp() * 1000) + rnd.randint(1, 10**6))
+        properties[rnd.choice(["hs_lead_status", "course", "hs_analytics_source", "email"])] = rnd.choice(
+            ["Brand New Status ", " Quantum X", "tiktok ads", "new@gamil.com", ""]
+        )
+        properties["phone"] = rnd.choice(["+44 20 7946 0958", f"+91 9{rnd.randint(10**8, 10**9 - 1)}", "+91-98765-43210 ext 9"])
+    fresh = mock_hubspot.generate_contacts(20, 30, seed=seed, end=END + timedelta(days=1))
+    for i, contact in enumerate(fresh):
+        contact["id"] = contact["properties"]["hs_object_id"] = str(900000 + seed * 1000 + i)
+    return contacts + fresh
+
+
+def value_counts(values):
+    """value_counts() with equal counts in first-seen order, whatever the pandas version."""
+    return values.value_counts(sort=False).sort_values(ascending=False, kind='stable')
+
+
+def reference_analysis(df):
+    """Analysis sections as the plain pandas implementation computed them, before ContactAggregator."""
+    lead_status = value_counts(df['Lead Status']).reset_index()
+    lead_status.columns = ['Lead Status', 'Count']
+    lead_status['Sort_Index'] = lead_status['Lead Status'].apply(
+        lambda x: dashboard.LEAD_STATUS_ORDER.index(x) if x in dashboard.LEAD_STATUS_ORDER else len(dashboard.LEAD_STATUS_ORDER)
+    )
+    lead_status = lead_status.sort_values('Sort_Index').drop('Sort_Index', axis=1)
+    lead_status = pd.concat([lead_status, pd.DataFrame({'Lead Status': ['Grand Total'], 'Count': [lead_status['Count'].sum()]})], ignore_index=True)
+    
+    courses = df['Course/Program'].fillna('').astype(str).str.strip()
+    course = value_counts(courses[courses != '']).reset_index()
+    course.columns = ['Course', 'Count']
+    
+    sources = df['Traffic Source']
+    traffic = value_counts(sources[sources.notna() & (sources != '') & (sources != 'Unknown')]).reset_index()
+    traffic.columns = ['Traffic Source', 'Count']
+    
+    stage = value_counts(df['Lifecycle Stage']).reset_index()
+    stage.columns = ['Lifecycle Stage', 'Count']
+    
+    monthly = df.groupby(df['Created Date'].dt.to_period('M')).size().reset_index()
+    monthly.columns = ['Month', 'Count']
+    monthly['Month'] = monthly['Month'].astype(str)
+    
+    debug = df.groupby(['Lead Status', 'Lead Status Raw']).size().reset_index(name='Count')
+    debug = debug.sort_values('Count', ascending=False).head(20)
+    
+    return {
+        'lead_status_distribution': lead_status,
+        'course_distribution': course.sort_values('Count', ascending=False),
+        'traffic_source_distribution': traffic.sort_values('Count', ascending=False),
+        'stage_distribution': stage,
+        'monthly_trend': monthly,
+        'debug_mapping': debug,
+    }
+
+
+@pytest.fixture(scope="module")
+def contacts():
+    return mock_hubspot.generate_contacts(600, 400, seed=7, end=END)
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["plain", "compact"])
+def test_analysis_matches_pandas_reference(contacts, compact):
+    plain = make_frame(contacts, compact=False)
+    analysis = dashboard.analyze_contact_data(make_frame(contacts, compact))
+    
+    for section, expected in reference_analysis(plain).items():
+        pd.testing.assert_frame_equal(
+            analysis[section].reset_index(drop=True), expected.reset_index(drop=True),
+            check_dtype=False, obj=section
+        )
+
+
+def assert_payloads_equal(df, patched, rebuilt):
+    assert list(patched["analysis_results"]) == list(rebuilt["analysis_results"])
+    for section in rebuilt["analysis_results"]:
+        expected = rebuilt["analysis_results"][section]
+        if isinstance(expected, dict):
+            assert patched["analysis_results"][section].keys() == expected.keys()
+            for name in expected:
+                pd.testing.assert_frame_equal(patched["analysis_results"][section][name], expected[name], obj=f"{section}/{name}")
+        else:
+            pd.testing.assert_frame_equal(patched["analysis_results"][section], expected, obj=section)
+    
+    pd.testing.assert_frame_equal(
+        dashboard.get_email_validation(df, patched["contact_aggregator"]),
+        dashboard.get_email_validation(df, rebuilt["contact_aggregator"])
+    )
+    pd.testing.assert_series_equal(
+        dashboard.get_normalized_phones(df, patched["contact_aggregator"]),
+        dashboard.get_normalized_phones(df, rebuilt["contact_aggregator"])
+    )
+    
+    cube, expected_cube = patched["contact_cube"], rebuilt["contact_cube"]
+    for measure in expected_cube.measures:
+        assert np.isclose(cube.total(measure), expected_cube.total(measure)), measure
+    for dimension in dashboard.CONTACT_CUBE_DIMENSIONS:
+        assert cube.values(dimension) == expected_cube.values(dimension), dimension
+        pd.testing.assert_series_equal(cube.value_counts(dimension), expected_cube.value_counts(dimension))
+    
+    # Distinct values may be ordered differently, but decode to the same column with the same dtype
+    keys, expected_keys = patched["contact_aggregator"].keys, rebuilt["contact_aggregator"].keys
+    for name in expected_keys.keys() & keys.keys():
+        (codes, uniques), (expected_codes, expected_uniques) = keys[name], expected_keys[name]
+        assert uniques.dtype == expected_uniques.dtype, name
+        pd.testing.assert_index_equal(
+            uniques.take(codes, allow_fill=True, fill_value=np.nan),
+            expected_uniques.take(expected_codes, allow_fill=True, fill_value=np.nan),
+            obj=str(name)
+        )
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["plain", "compact"])
+def test_patched_payload_matches_full_rebuild(contacts, compact):
+    df = make_frame(contacts, compact)
+    payload = dashboard.build_session_payload(df)
+    dict(payload["analysis_results"])
+    dashboard.get_email_validation(df, payload["contact_aggregator"])
+    dashboard.get_normalized_phones(df, payload["contact_aggregator"])
+    
+    for seed in range(1, 4):
+        contacts = edit_contacts(contacts, seed)
+        new_df = make_frame(contacts, compact)
+        delta = dashboard.diff_contacts(df, new_df)
+        assert len(delta["added"]) + len(delta["removed"]) <= dashboard.INCREMENTAL_ANALYSIS_MAX_DELTA_RATIO * len(new_df)
+        patched = dashboard.build_session_payload(new_df, base=(df, payload))
+        dashboard.get_analysis_cache.clear()
+        rebuilt = dashboard.build_session_payload(new_df)
+        dashboard.get_analysis_cache.clear()
+        
+        assert patched["contact_aggregator"] is not rebuilt["contact_aggregator"]
+        assert_payloads_equal(new_df, patched, rebuilt)
+        df, payload = new_df, patched
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import dashboard
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_contacts(count, iso=True):
+    """Raw search results as HubSpot sends them: ISO-8601 dates, or epoch milliseconds."""
+    contacts = []
+    for i in range(count):
+        created = START + timedelta(hours=7 * i)
+        modified = created + timedelta(days=3)
+        if iso:
+            created_value = created.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            modified_value = modified.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        else:
+            created_value = str(int(created.timestamp() * 1000))
+            modified_value = str(int(modified.timestamp() * 1000))
+        contacts.append({
+            "id": str(i + 1),
+            "properties": {"createdate": created_value, "lastmodifieddate": modified_value, "email": f"u{i}@gmail.com"},
+        })
+    return contacts
+
+
+def test_iso_and_epoch_dates_parse_to_the_same_datetimes():
+    iso = dashboard.process_contacts_data(make_contacts(50))
+    epoch = dashboard.process_contacts_data(make_contacts(50, iso=False))
+    
+    for column in ["Created Date", "Last Modified Date"]:
+        assert pd.api.types.is_datetime64_dtype(iso[column])
+        assert iso[column].dt.tz is None
+        pd.testing.assert_series_equal(iso[column], epoch[column])
+    assert iso["Created Date"].iloc[0] == pd.Timestamp("2024-01-01 00:00:00")
+
+
+def test_offsets_empty_and_junk_dates():
+    contacts = make_contacts(3)
+    contacts[0]["properties"]["createdate"] = "2024-01-15T15:30:00+05:30"
+    contacts[1]["properties"]["createdate"] = ""
+    contacts[2]["properties"]["createdate"] = "n/a"
+    
+    created = dashboard.process_contacts_data(contacts)["Created Date"]
+    assert created.iloc[0] == pd.Timestamp("2024-01-15 10:00:00")
+    assert created.iloc[1:].isna().all()
+
+
+def test_store_replace_and_read_range_with_iso_dates(tmp_path):
+    df = dashboard.process_contacts_data(make_contacts(300))
+    store = dashboard.ContactStore(str(tmp_path))
+    start_ms = int(START.timestamp() * 1000)
+    end_ms = int((START + timedelta(days=30)).timestamp() * 1000)
+    
+    store.replace_range("Created Date", start_ms, end_ms, df)
+    stored = store.read_range("Created Date", start_ms, end_ms)
+    in_range = df[df["Created Date"] <= pd.Timestamp(end_ms, unit="ms")]
+    assert sorted(stored["ID"]) == sorted(in_range["ID"])
+    
+    # Re-fetching the range drops contacts that are gone from HubSpot
+    store.replace_range("Created Date", start_ms, end_ms, df.iloc[10:])
+    assert len(store.read_range("Created Date", start_ms, end_ms)) == len(in_range) - 10
+    
+    modified = store.read_range("Last Modified Date", start_ms, end_ms)
+    assert len(modified) == (df["Last Modified Date"] <= pd.Timestamp(end_ms, unit="ms")).sum() - 10
+
+
+def test_high_water_mark_from_iso_dates():
+    contacts = make_contacts(20)
+    expected = int((START + timedelta(hours=7 * 19, days=3)).timestamp() * 1000)
+    
+    assert dashboard.get_max_lastmodified(contacts) == expected
+    assert dashboard.get_max_lastmodified(dashboard.process_contacts_data(contacts)) == expected
+    assert dashboard.get_max_lastmodified(make_contacts(20, iso=False)) == expected
+    assert dashboard.get_max_lastmodified([]) is None
+    assert dashboard.get_max_lastmodified(pd.DataFrame()) is None
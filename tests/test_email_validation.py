@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import dashboard
+
+
+@pytest.mark.parametrize("domain, popular", [
+    ("gmal.com", "gmail.com"),
+    ("gmil.com", "gmail.com"),
+    ("gamil.com", "gmail.com"),
+    ("gmail.con", "gmail.com"),
+    ("gmailcom", "gmail.com"),
+    ("hotmial.con", "hotmail.com"),
+    ("yahoo.co", "yahoo.com"),
+    ("outlok.com", "outlook.com"),
+])
+def test_typos_of_popular_domains(domain, popular):
+    assert dashboard.find_email_domain_typos([domain]) == [popular]
+
+
+@pytest.mark.parametrize("domain", [
+    "gmail.com", "protonmail.ch", "yahoo.co.id", "hotmail.co.jp", "hotmail.co.za", "outlook.cl",
+    "email.com", "cloud.com", "gmail.de", "acme.com", "",
+])
+def test_real_domains_are_no_typos(domain):
+    assert dashboard.find_email_domain_typos([domain]) == [None]
+
+
+def test_email_validation_issues():
+    df = pd.DataFrame({
+        "ID": ["1", "2", "3", "4", "5"],
+        "Email": ["Ann@Gmal.com ", "bob@protonmail.ch", None, "not-an-email", "eve@hotmail.co.za"],
+    })
+    
+    issues = dashboard.analyze_email_validation(df)
+    
+    assert issues["Record ID"].tolist() == ["1", "3", "4"]
+    assert issues["Issue"].tolist() == ["Incorrect domain: gmal.com", "Missing email", "Invalid email format"]
+    assert issues["Suggested Correction"].iloc[0] == "ann@gmail.com"
+    assert issues["Suggested Correction"].iloc[1:].isna().all()
@@ -0,0 +1,28 @@
+import os
+
+import dashboard
+
+
+def test_concurrent_fetches_do_not_share_a_checkpoint(tmp_path):
+    key = ("serial", "Created Date", 0, 1000, None, None)
+    first = dashboard.FetchCheckpoint(*key, root=str(tmp_path))
+    second = dashboard.FetchCheckpoint(*key, root=str(tmp_path))
+    
+    assert first.load() == (None, [])
+    assert second.load() == (None, [])
+    first.save([{"id": "1"}], {"after": "1", "pages": 1, "contact_count": 1})
+    second.save([{"id": "2"}], {"after": "1", "pages": 1, "contact_count": 1})
+    second.clear()
+    second.release()
+    
+    with open(first.contacts_path) as f:
+        assert f.read().splitlines() == ['{"id": "1"}']
+    
+    first.release()
+    resumed = dashboard.FetchCheckpoint(*key, root=str(tmp_path))
+    state, contacts = resumed.load()
+    assert state["after"] == "1" and contacts == [{"id": "1"}]
+    
+    resumed.clear()
+    resumed.release()
+    assert not os.path.exists(first.state_path)
@@ -0,0 +1,47 @@
+import threading
+from datetime import date
+
+import pandas as pd
+
+import dashboard
+
+
+def test_full_refetch_does_not_join_a_delta_sync():
+    registry = dashboard.FetchJobRegistry(max_workers=2)
+    release = threading.Event()
+    
+    def fetch(job, incremental):
+        release.wait(5)
+        return {"df": pd.DataFrame(), "fetched": 0, "incremental": incremental}
+    
+    keys = {
+        incremental: dashboard.get_fetch_key("Created Date", date(2024, 1, 1), date(2024, 1, 31), incremental, True, True)
+        for incremental in (True, False)
+    }
+    delta, _ = registry.submit("delta", fetch, incremental=True, key=keys[True])
+    joined, notice = registry.submit("delta", fetch, incremental=True, key=keys[True])
+    full, full_notice = registry.submit("full", fetch, incremental=False, key=keys[False])
+    release.set()
+    registry.executor.shutdown(wait=True)
+    
+    assert joined is delta and notice is not None
+    assert full is not delta and full_notice is None
+    assert full.result["incremental"] is False
+
+
+def test_failed_job_reports_its_error_and_is_not_shared():
+    registry = dashboard.FetchJobRegistry(max_workers=1)
+    key = dashboard.get_fetch_key("Created Date", date(2024, 1, 1), date(2024, 1, 31), True, True, True)
+    
+    def fetch(job):
+        job.status("📡 Fetching...")
+        raise ValueError("portal unavailable")
+    
+    failed, _ = registry.submit("failing", fetch, key=key)
+    registry.executor.shutdown(wait=True)
+    
+    assert failed.is_finished and failed.state == "failed"
+    assert failed.result is None and failed.finished_at is not None
+    assert failed.get_messages() == [("error", "❌ Unexpected error: portal unavailable")]
+    assert key not in registry.in_flight
+    assert registry.results.get(key) is None
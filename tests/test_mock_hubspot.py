@@ -0,0 +1,158 @@
+from datetime import date, datetime, timezone
+
+import pandas as pd
+import pytest
+
+import dashboard
+import mock_hubspot
+
+END = datetime(2026, 9, 30, tzinfo=timezone.utc)
+
+
+class SilentReporter:
+    """Fetch reporter that discards progress (the dashboard's reporters need a Streamlit page)."""
+    
+    def progress(self, fraction):
+        pass
+    
+    def status(self, text):
+        pass
+    
+    status_warning = info = warning = error = status
+    
+    def clear(self):
+        pass
+    
+    def check_cancelled(self):
+        pass
+
+
+@pytest.fixture
+def mock_api(tmp_path, monkeypatch):
+    """Dashboard fetches pointed at a local mock API, with the contact store and checkpoints under tmp_path."""
+    contacts = mock_hubspot.generate_contacts(600, 30, end=END)
+    api = mock_hubspot.MockHubSpotAPI(contacts, search_rate=(100, 1000))
+    server = mock_hubspot.MockHubSpotServer(api, port=0)
+    base_url = server.start()
+    
+    store = dashboard.ContactStore(str(tmp_path / "store"))
+    monkeypatch.setattr(dashboard, "get_hubspot_client", lambda api_key: dashboard.HubSpotClient(api_key, base_url=base_url))
+    monkeypatch.setattr(dashboard, "get_contact_store", lambda: store)
+    monkeypatch.setattr(dashboard.FetchCheckpoint.__init__, "__kwdefaults__", {"root": str(tmp_path / "checkpoints")})
+    yield contacts
+    server.stop()
+
+
+def test_mock_sends_iso_dates_and_filters_them_as_instants():
+    contacts = mock_hubspot.generate_contacts(50, 10, end=END)
+    assert contacts[0]["properties"]["createdate"].endswith("Z")
+    
+    api = mock_hubspot.MockHubSpotAPI(contacts)
+    start_ms = int(datetime(2026, 9, 25, tzinfo=timezone.utc).timestamp() * 1000)
+    status, payload = api.search({
+        "filterGroups": [{"filters": [{"propertyName": "createdate", "operator": "GTE", "value": start_ms}]}],
+        "sorts": [{"propertyName": "createdate", "direction": "ASCENDING"}],
+        "limit": 100
+    })
+    
+    created = pd.to_datetime([contact["properties"]["createdate"] for contact in payload["results"]], utc=True)
+    assert status == 200
+    assert payload["total"] == len(payload["results"]) > 0
+    assert created.is_monotonic_increasing
+    assert created.min() >= pd.Timestamp(start_ms, unit="ms", tz="UTC")
+
+
+def test_epoch_date_format_is_still_available():
+    contacts = mock_hubspot.generate_contacts(5, 10, end=END, date_format="epoch")
+    assert contacts[0]["properties"]["createdate"].isdigit()
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_full_and_incremental_sync_against_the_mock(mock_api, sharded):
+    start, end = date(2026, 9, 1), date(2026, 9, 30)
+    
+    df, fetched = dashboard.sync_hubspot_contacts(
+        "mock", "Created Date", start, end, incremental=False, sharded=sharded, reporter=SilentReporter()
+    )
+    assert fetched == len(df) > 0
+    assert pd.api.types.is_datetime64_dtype(df["Created Date"])
+    
+    manifest = dashboard.get_contact_store().load_manifest()
+    assert manifest["segments"]["Created Date"][0]["high_water_mark"] > 0
+    
+    # A second sync of the same range is served from the store
+    again, fetched_again = dashboard.sync_hubspot_contacts(
+        "mock", "Created Date", start, end, sharded=sharded, reporter=SilentReporter()
+    )
+    assert fetched_again == 0
+    assert sorted(again["ID"]) == sorted(df["ID"])
+
+
+def test_fetch_job_only_uses_resources_resolved_by_the_caller(mock_api, monkeypatch):
+    client, store = dashboard.get_hubspot_client("mock"), dashboard.get_contact_store()
+    analysis_cache, email_domain_cache = dashboard.get_analysis_cache(), {}
+    
+    def off_script_thread(*args, **kwargs):
+        raise AssertionError("cached resource resolved on the job thread")
+    
+    monkeypatch.setattr(dashboard, "get_hubspot_client", off_script_thread)
+    monkeypatch.setattr(dashboard, "get_contact_store", off_script_thread)
+    monkeypatch.setattr(dashboard, "get_analysis_cache", off_script_thread)
+    monkeypatch.setattr(dashboard, "get_email_domain_cache", off_script_thread)
+    
+    registry = dashboard.FetchJobRegistry(max_workers=1)
+    job, _ = registry.submit(
+        "job", dashboard.run_fetch_job, "mock", "Created Date", date(2026, 9, 1), date(2026, 9, 30),
+        sharded=True, properties=dashboard.HUBSPOT_REQUIRED_PROPERTIES, client=client, store=store,
+        analysis_cache=analysis_cache, email_domain_cache=email_domain_cache
+    )
+    registry.executor.shutdown(wait=True)
+    
+    assert job.state == "done", job.messages
+    assert len(job.result["df"]) > 0
+    assert job.result["session_payload"]["contact_cube"] is not None
+
+
+def test_every_property_the_analysis_reads_is_required(monkeypatch):
+    read = set()
+    get_property_column = dashboard.get_property_column
+    
+    def recording(raw_properties, key, size):
+        read.add(key)
+        return get_property_column(raw_properties, key, size)
+    
+    monkeypatch.setattr(dashboard, "get_property_column", recording)
+    dashboard.process_contacts_data(mock_hubspot.generate_contacts(5, 10, end=END))
+    
+    assert read <= set(dashboard.HUBSPOT_REQUIRED_PROPERTIES)
+    assert set(dashboard.HUBSPOT_REQUIRED_PROPERTIES) <= set(dashboard.HUBSPOT_CONTACT_PROPERTIES)
+
+
+def test_property_discovery_only_probes_optional_properties(monkeypatch):
+    contacts = mock_hubspot.generate_contacts(600, 30, end=END)
+    for contact in contacts:
+        contact["properties"].update(address="", hs_utm_content="")
+    # Too old for the sample page, so only a HAS_PROPERTY probe finds it
+    min(contacts, key=lambda contact: contact["properties"]["lastmodifieddate"])["properties"]["hs_utm_term"] = "spring"
+    
+    api = mock_hubspot.MockHubSpotAPI(contacts, search_rate=(100, 1000))
+    probed = []
+    search = api.search
+    
+    def recording_search(body):
+        probed.extend(flt["propertyName"] for group in body.get("filterGroups", []) for flt in group["filters"])
+        return search(body)
+    
+    api.search = recording_search
+    server = mock_hubspot.MockHubSpotServer(api, port=0)
+    base_url = server.start()
+    monkeypatch.setattr(dashboard, "get_hubspot_client", lambda api_key: dashboard.HubSpotClient(api_key, base_url=base_url))
+    dashboard.discover_populated_properties.clear()
+    try:
+        properties = dashboard.get_fetch_properties("mock")
+    finally:
+        dashboard.discover_populated_properties.clear()
+        server.stop()
+    
+    assert sorted(probed) == ["address", "hs_utm_content", "hs_utm_term"]
+    assert set(properties) == set(dashboard.HUBSPOT_REQUIRED_PROPERTIES) | {"hs_utm_term"}
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+import dashboard
+
+
+@pytest.mark.parametrize("phone, country, e164", [
+    ("+91-98765-43210", "India", "+919876543210"),
+    ("+91-98765-43210 ext 12", "India", "+919876543210"),
+    ("0091 98765 43210", "India", "+919876543210"),
+    ("098765 43210", "India (Local)", "+919876543210"),
+    ("9876543210", "India (10 digit)", "+919876543210"),
+    ("+1 (415) 555-0100 x204", "USA/Canada", "+14155550100"),
+    ("+1 415 555 0100 Ext. 7", "USA/Canada", "+14155550100"),
+    ("+44 20 7946 0958 #3", "United Kingdom", "+442079460958"),
+])
+def test_valid_numbers(phone, country, e164):
+    result = dashboard.classify_phone_numbers(pd.Series([phone]))
+    assert result.iloc[0].tolist() == [country, e164]
+
+
+@pytest.mark.parametrize("phone", ["+91 98765 4321", "+91987654321012", "9198765432101"])
+def test_indian_numbers_of_the_wrong_length_are_not_e164(phone):
+    result = dashboard.classify_phone_numbers(pd.Series([phone]))
+    assert result["Country"].iloc[0] == "India"
+    assert pd.isna(result["E.164"].iloc[0])
+
+
+def test_missing_numbers_stay_missing():
+    result = dashboard.classify_phone_numbers(pd.Series([None, "+91 98765 43210"], dtype=object))
+    assert result["Country"].isna().tolist() == [True, False]
+    assert pd.isna(result["E.164"].iloc[0]) and result["E.164"].iloc[1] == "+919876543210"
+
+
+@pytest.mark.parametrize("phone", ["(415) 555-1234", "415-555-1234", "415.555.1234"])
+def test_formatted_numbers_are_not_indian_national_numbers(phone):
+    result = dashboard.classify_phone_numbers(pd.Series([phone]))
+    assert not result["Country"].iloc[0].startswith("India")
+    assert result["E.164"].iloc[0] != "+914155551234"
+
+
+@pytest.mark.parametrize("phone", ["12345", "+1 234", "1234567890123456"])
+def test_numbers_of_no_e164_length_are_unknown(phone):
+    result = dashboard.classify_phone_numbers(pd.Series([phone]))
+    assert result["Country"].iloc[0] == "Unknown"
+    assert pd.isna(result["E.164"].iloc[0])
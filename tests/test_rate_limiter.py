@@ -0,0 +1,32 @@
+import dashboard
+
+WINDOW_HEADERS = {
+    "X-HubSpot-RateLimit-Max": "100",
+    "X-HubSpot-RateLimit-Interval-Milliseconds": "10000",
+    "X-HubSpot-RateLimit-Remaining": "60",
+    "X-HubSpot-RateLimit-Secondly": "10",
+    "X-HubSpot-RateLimit-Secondly-Remaining": "2",
+}
+
+
+def test_each_bucket_follows_the_headers_of_its_own_interval():
+    window = dashboard.TokenBucketRateLimiter(*dashboard.HUBSPOT_DEFAULT_RATE_LIMIT)
+    secondly = dashboard.TokenBucketRateLimiter(
+        *dashboard.HUBSPOT_SECONDLY_RATE_LIMIT, headers=dashboard.HUBSPOT_SECONDLY_RATE_HEADERS
+    )
+    
+    window.update_from_headers(WINDOW_HEADERS)
+    secondly.update_from_headers(WINDOW_HEADERS)
+    
+    assert (window.capacity, window.interval) == (100, 10)
+    assert 60 <= window.tokens < 61  # Not clamped to the 2 requests left this second
+    assert (secondly.capacity, secondly.interval) == (10, 1)
+    assert 2 <= secondly.tokens < 3
+
+
+def test_missing_and_malformed_headers_keep_the_bucket():
+    bucket = dashboard.TokenBucketRateLimiter(4, 1000)
+    bucket.update_from_headers({})
+    bucket.update_from_headers({"X-HubSpot-RateLimit-Remaining": "many"})
+    assert (bucket.capacity, bucket.interval) == (4, 1)
+    assert bucket.tokens > 3
@@ -0,0 +1,31 @@
+import pandas as pd
+
+import dashboard
+from test_contact_dates import make_contacts
+
+
+def test_fingerprint_of_mixed_modified_dates():
+    df = dashboard.process_contacts_data(make_contacts(10))
+    df["Last Modified Date"] = df["Last Modified Date"].astype(object)
+    df.loc[3, "Last Modified Date"] = "not a date"
+    
+    fingerprint = dashboard.get_contacts_fingerprint(df)
+    assert fingerprint == dashboard.get_contacts_fingerprint(df.copy())
+    
+    df.loc[4, "Last Modified Date"] = pd.Timestamp("2030-01-01")
+    assert dashboard.get_contacts_fingerprint(df) != fingerprint
+
+
+def test_payloads_of_different_property_selections_are_kept_apart():
+    df = dashboard.process_contacts_data(make_contacts(20))
+    projected = df.copy()
+    projected.attrs["properties"] = ("createdate", "lastmodifieddate", "email")
+    full = df.copy()
+    assert dashboard.get_contacts_fingerprint(projected) == dashboard.get_contacts_fingerprint(full)
+    
+    projected_payload = dashboard.build_session_payload(projected)
+    full_payload = dashboard.build_session_payload(full, base=(projected, projected_payload))
+    
+    assert full_payload is not projected_payload
+    assert full_payload["contact_aggregator"] is not projected_payload["contact_aggregator"]
+    assert dashboard.build_session_payload(projected.copy()) is projected_payload